@@ -0,0 +1,114 @@
+"""Tempo e memória de pico da análise de HTML nas páginas gravadas (benchmarks/fixtures).
+
+Compara, por página, a árvore completa do BeautifulSoup com 'html.parser'
+(como o knowledge_base fazia) com a extração seletiva de html_parsing, na
+própria thread e no pool de processos. A memória de pico é a do tracemalloc
+numa análise isolada: só vê alocações do Python, então para selectolax/lxml
+(em C) e para o pool (no outro processo) ela subestima o custo real.
+
+Enquanto cada método roda, uma thread acorda a cada 1 ms, como o loop de
+eventos da interface; o maior atraso dela mostra quanto a análise segurou o GIL.
+
+Uso: python benchmarks/bench_html.py [--repeticoes 30]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_parsing import BACKEND, AnalisadorHTML, extrair_perguntas, extrair_titulo
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def ler_fixture(nome):
+    with open(os.path.join(FIXTURES, nome), encoding='utf-8') as arquivo:
+        return arquivo.read()
+
+
+def perguntas_arvore_completa(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    return [{
+        'titulo': pergunta.select_one('.question-hyperlink').text,
+        'resumo': pergunta.select_one('.excerpt').text,
+        'votos': pergunta.select_one('.vote-count-post').text
+    } for pergunta in soup.select('.question-summary')][:3]
+
+
+def titulo_arvore_completa(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    return soup.title.string if soup.title else None
+
+
+class Relogio(threading.Thread):
+    """Dorme 1 ms por vez e anota o maior atraso em relação ao esperado"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.maior_atraso = 0.0
+        self.parar = threading.Event()
+
+    def run(self):
+        while not self.parar.is_set():
+            inicio = time.perf_counter()
+            time.sleep(0.001)
+            self.maior_atraso = max(self.maior_atraso, time.perf_counter() - inicio - 0.001)
+
+
+def medir(funcao, html, repeticoes):
+    funcao(html)  # Aquecimento: importações e caches
+    relogio = Relogio()
+    relogio.start()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(html)
+        tempos.append(time.perf_counter() - inicio)
+    relogio.parar.set()
+    relogio.join()
+
+    tracemalloc.start()
+    funcao(html)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(tempos), pico, relogio.maior_atraso
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=30)
+    args = parser.parse_args()
+
+    pool = AnalisadorHTML(processos=1, tamanho_minimo=0)
+    pool.preparar()
+    paginas = [
+        ("stackoverflow_busca.html", "perguntas", perguntas_arvore_completa, extrair_perguntas, pool.perguntas),
+        # O título é lido só até o fim do <head> e nunca vai para o pool
+        ("stackoverflow_busca.html", "título", titulo_arvore_completa, extrair_titulo, None),
+        ("mdn_pagina.html", "título", titulo_arvore_completa, extrair_titulo, None),
+    ]
+    print(f"backend: {BACKEND}, {args.repeticoes} repetições\n")
+    print(f"{'página':<26}{'extração':<11}{'método':<24}{'mediana':>10}{'pico mem.':>12}{'atraso UI':>11}")
+    try:
+        for nome, extracao, antigo, seletivo, no_pool in paginas:
+            html = ler_fixture(nome)
+            metodos = [("árvore completa (bs4)", antigo), (f"seletiva ({BACKEND})", seletivo)]
+            if no_pool is not None:
+                metodos.append(("seletiva no pool", no_pool))
+            for metodo, funcao in metodos:
+                mediana, pico, atraso = medir(funcao, html, args.repeticoes)
+                print(f"{nome:<26}{extracao:<11}{metodo:<24}{mediana * 1000:>8.2f} ms"
+                      f"{pico / 1024:>9.0f} KiB{atraso * 1000:>8.1f} ms")
+    finally:
+        pool.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark do MotorIntencoes: custo por mensagem conforme o número de regras e o tamanho da entrada.
+
+Compara o autômato (uma passada) com a varredura linear de substrings usada
+antes em processar_comando.
+
+Uso: python benchmarks/bench_intencoes.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intents import MotorIntencoes
+
+VOCABULARIO = [
+    "abrir", "fechar", "volume", "tocar", "musica", "lembrete", "agenda", "clima", "tempo", "cidade",
+    "arquivo", "pasta", "janela", "navegador", "email", "mensagem", "enviar", "ler", "buscar", "pesquisar",
+    "python", "codigo", "erro", "projeto", "tarefa", "reuniao", "amanha", "hoje", "semana", "noticia",
+    "filme", "serie", "livro", "foto", "video", "camera", "tela", "captura", "processo", "memoria",
+]
+
+
+def gerar_frases(quantidade, semente=42):
+    aleatorio = random.Random(semente)
+    frases = set()
+    while len(frases) < quantidade:
+        frases.add(" ".join(aleatorio.choices(VOCABULARIO, k=aleatorio.randint(2, 3))) + f" {len(frases)}")
+    return sorted(frases)
+
+
+def gerar_texto(tamanho, semente=7):
+    aleatorio = random.Random(semente)
+    palavras = []
+    while sum(len(p) + 1 for p in palavras) < tamanho:
+        palavras.append(aleatorio.choice(VOCABULARIO))
+    return " ".join(palavras)[:tamanho]
+
+
+def varredura_linear(frases, texto):
+    return [frase for frase in frases if frase in texto]
+
+
+def cronometrar(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e6
+
+
+def main():
+    tamanhos_texto = [50, 500, 5000]
+    print(f"{'regras':>8}{'texto':>8}{'autômato (µs)':>16}{'linear (µs)':>14}")
+    for quantidade in [100, 1000, 5000]:
+        frases = gerar_frases(quantidade)
+        motor = MotorIntencoes()
+        for i, frase in enumerate(frases):
+            motor.registrar(f"intencao_{i}", [frase], prioridade=i % 5)
+        motor.construir()
+        for tamanho in tamanhos_texto:
+            texto = gerar_texto(tamanho)
+            repeticoes = max(20, 20000 // tamanho)
+            automato = cronometrar(lambda: motor.analisar(texto), repeticoes)
+            linear = cronometrar(lambda: varredura_linear(frases, texto), repeticoes)
+            print(f"{quantidade:>8}{tamanho:>8}{automato:>16.1f}{linear:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Teste de carga do backend de LLM contra o servidor falso local (stub_llm_server.py).
+
+Dispara requisições com streaming a partir de várias threads e mede vazão,
+tempo até o primeiro trecho e latência total (p50/p95/p99), além de quantas
+conexões o servidor recebeu. Com --sem-reuso cada requisição cria o seu
+próprio cliente, como fazia o código antigo, para comparar.
+
+Uso: python benchmarks/bench_llm.py [--requisicoes 200] [--concorrencia 8] [--max-em-voo 4]
+                                    [--latencia 0.2] [--intervalo 0.005] [--taxa-erro 0.0] [--sem-reuso]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_backend import BackendOpenAI, LLMIndisponivel, PoliticaRetentativa
+from stub_llm_server import ServidorLLMFalso
+from tracing import HistogramaLatencia
+
+MENSAGENS = [{"role": "user", "content": "Explique list comprehension em Python."}]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requisicoes", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=8, help="threads disparando requisições")
+    parser.add_argument("--max-em-voo", type=int, default=4, help="limite de requisições em andamento no backend")
+    parser.add_argument("--latencia", type=float, default=0.2)
+    parser.add_argument("--intervalo", type=float, default=0.005)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--sem-reuso", action="store_true", help="um cliente novo por requisição")
+    args = parser.parse_args()
+
+    servidor = ServidorLLMFalso(latencia=args.latencia, intervalo=args.intervalo, taxa_erro=args.taxa_erro,
+                                semente=1).iniciar()
+
+    def criar():
+        return BackendOpenAI(api_key="teste", base_url=servidor.url, max_em_voo=args.max_em_voo,
+                             politica=PoliticaRetentativa(tentativas=4, base=0.1, maximo=1.0))
+
+    compartilhado = criar()
+    compartilhado.preparar()  # Importa o SDK fora da medição
+    primeiro_trecho = HistogramaLatencia()
+    total = HistogramaLatencia()
+    falhas = []
+
+    def requisitar(_):
+        backend = criar() if args.sem_reuso else compartilhado
+        inicio = time.perf_counter()
+        try:
+            for i, _ in enumerate(backend.transmitir(MENSAGENS)):
+                if i == 0:
+                    primeiro_trecho.registrar(time.perf_counter() - inicio)
+            total.registrar(time.perf_counter() - inicio)
+        except LLMIndisponivel as e:
+            falhas.append(str(e))
+        finally:
+            if args.sem_reuso:
+                backend.fechar()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        list(executor.map(requisitar, range(args.requisicoes)))
+    duracao = time.perf_counter() - inicio
+    estatisticas = compartilhado.estatisticas()
+    compartilhado.fechar()
+    servidor.encerrar()
+
+    print(f"{args.requisicoes} requisições, {args.concorrencia} threads, "
+          f"{'cliente novo por requisição' if args.sem_reuso else f'cliente único, até {args.max_em_voo} em voo'}")
+    print(f"vazão: {args.requisicoes / duracao:.1f} req/s em {duracao:.2f} s")
+    for nome, histograma in (("primeiro trecho", primeiro_trecho), ("total", total)):
+        resumo = histograma.resumo()
+        if resumo['contagem']:
+            print(f"{nome:<16} p50 {resumo['p50_ms']:8.1f} ms | p95 {resumo['p95_ms']:8.1f} ms "
+                  f"| p99 {resumo['p99_ms']:8.1f} ms | máx {resumo['max_ms']:8.1f} ms")
+    print(f"conexões abertas no servidor: {servidor.conexoes}")
+    print(f"erros injetados: {servidor.erros_injetados}, falhas após retentativas: {len(falhas)}")
+    if not args.sem_reuso:
+        print(f"retentativas do backend: {estatisticas['retentativas']}")
+
+
+if __name__ == "__main__":
+    main()
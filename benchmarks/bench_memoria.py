@@ -0,0 +1,109 @@
+"""Microbenchmark de MemoriaUsuario: conexão por operação (antes) x gerenciador com WAL e fila de escrita (depois).
+
+Uso: python benchmarks/bench_memoria.py [--ops 2000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import obter_gerenciador
+from user_memory import MemoriaUsuario
+
+
+class MemoriaConexaoPorOperacao:
+    """Reproduz o padrão anterior: abre, executa, faz commit e fecha a cada chamada"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # Cria as tabelas e volta ao journal padrão, como era antes
+        MemoriaUsuario(db_path)
+        obter_gerenciador(db_path).fechar()
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+
+    def atualizar_info(self, chave, valor):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            INSERT OR REPLACE INTO usuario_info (chave, valor, ultima_atualizacao)
+            VALUES (?, ?, ?)
+        """, (chave, valor, datetime.now()))
+        conn.commit()
+        conn.close()
+
+    def adicionar_interesse(self, topico, nivel_interesse=1):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            INSERT OR REPLACE INTO interesses (topico, nivel_interesse, ultima_interacao)
+            VALUES (?, ?, ?)
+        """, (topico, nivel_interesse, datetime.now()))
+        conn.commit()
+        conn.close()
+
+    def obter_perfil_completo(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT topico FROM interesses ORDER BY nivel_interesse DESC LIMIT 5")
+        interesses = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT linguagem, framework FROM conhecimento_programacao")
+        programacao = cursor.fetchall()
+        conn.close()
+        return interesses, programacao
+
+
+def medir(funcao, ops):
+    inicio = time.perf_counter()
+    funcao(ops)
+    duracao = time.perf_counter() - inicio
+    return ops / duracao
+
+
+def executar(memoria, ops, sincronizar):
+    def escritas_info(n):
+        for i in range(n):
+            memoria.atualizar_info(f"chave_{i % 50}", f"valor_{i}")
+        sincronizar()
+
+    def escritas_interesse(n):
+        for i in range(n):
+            memoria.adicionar_interesse(f"topico_{i % 50}", i % 10)
+        sincronizar()
+
+    def leituras_perfil(n):
+        for _ in range(n):
+            memoria.obter_perfil_completo()
+
+    return {
+        "atualizar_info": medir(escritas_info, ops),
+        "adicionar_interesse": medir(escritas_interesse, ops),
+        "obter_perfil_completo": medir(leituras_perfil, ops),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        antes = executar(MemoriaConexaoPorOperacao(os.path.join(pasta, "antes.db")), args.ops, lambda: None)
+
+        caminho = os.path.join(pasta, "depois.db")
+        memoria = MemoriaUsuario(caminho)
+        depois = executar(memoria, args.ops, memoria.db.aguardar_escritas)
+        obter_gerenciador(caminho).fechar()
+
+    print(f"{'operação':<24}{'antes (ops/s)':>16}{'depois (ops/s)':>16}{'ganho':>9}")
+    for operacao in antes:
+        ganho = depois[operacao] / antes[operacao]
+        print(f"{operacao:<24}{antes[operacao]:>16,.0f}{depois[operacao]:>16,.0f}{ganho:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
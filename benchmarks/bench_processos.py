@@ -0,0 +1,88 @@
+"""Benchmark do ranking de processos: custo por chamada com milhares de processos.
+
+Compara o RankingProcessos (cache de psutil.Process, heap limitado) com o
+padrão anterior de listar_processos (process_iter montando um dict por
+processo) seguido de uma ordenação completa. Para simular uma máquina cheia,
+sobe processos ociosos extras antes de medir.
+
+Uso: python benchmarks/bench_processos.py [processos_extras] [chamadas]
+"""
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+from process_ranking import RankingProcessos
+
+
+def listar_antigo(n=10):
+    """listar_processos de antes, com ordenação por memória para dar um resultado útil"""
+    processos = []
+    for proc in psutil.process_iter(['pid', 'name', 'memory_percent']):
+        try:
+            processos.append({
+                'pid': proc.info['pid'],
+                'nome': proc.info['name'],
+                'memoria': proc.info['memory_percent'] or 0.0
+            })
+        except Exception:
+            pass
+    processos.sort(key=lambda p: p['memoria'], reverse=True)
+    return processos[:n]
+
+
+def subir_processos(quantidade):
+    comando = [sys.executable, "-c", "import time; time.sleep(600)"] if os.name == 'nt' else ["sleep", "600"]
+    return [subprocess.Popen(comando, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for _ in range(quantidade)]
+
+
+def cronometrar(funcao, chamadas):
+    funcao()  # Aquece caches (e a linha de base de CPU)
+    tempos = []
+    for _ in range(chamadas):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    return tempos[len(tempos) // 2] * 1000, tempos[-1] * 1000
+
+
+def main():
+    extras = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    chamadas = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    filhos = subir_processos(extras)
+    try:
+        total = len(psutil.pids())
+        ranking = RankingProcessos()
+        print(f"processos no sistema: {total}")
+        print(f"{'método':<32}{'mediana (ms)':>14}{'pior (ms)':>12}")
+        for nome, funcao in [
+            ("process_iter + sort", listar_antigo),
+            ("ranking por memória", lambda: ranking.top(10, 'memoria')),
+            ("ranking por CPU", lambda: ranking.top(10, 'cpu')),
+        ]:
+            mediana, pior = cronometrar(funcao, chamadas)
+            print(f"{nome:<32}{mediana:>14.1f}{pior:>12.1f}")
+
+        # Metade dos processos extras sai e o mesmo tanto entra: atualização incremental
+        for filho in filhos[:extras // 2]:
+            filho.kill()
+            filho.wait()
+        filhos = filhos[extras // 2:] + subir_processos(extras // 2)
+        inicio = time.perf_counter()
+        novos, encerrados = ranking.atualizar()
+        duracao = (time.perf_counter() - inicio) * 1000
+        print(f"atualização com {novos} novos e {encerrados} encerrados: {duracao:.1f} ms")
+    finally:
+        for filho in filhos:
+            filho.kill()
+        for filho in filhos:
+            filho.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+"""Suíte de benchmarks dos caminhos quentes do assistente, sem tela, rede nem chave da OpenAI.
+
+Cobre o casamento de comandos (processar_comando), os métodos de leitura e
+escrita de MemoriaUsuario, o perfil + prompt de sistema, a extração de HTML
+da BaseConhecimento sobre páginas gravadas em benchmarks/fixtures e o ciclo
+completo de enviar_mensagem contra um LLM falso local.
+
+A janela roda na plataforma offscreen do Qt, num diretório temporário (banco
+e caches próprios), com a voz muda. O LLM é o stub_llm_server.py numa porta
+local, sem latência: o ciclo de chat passa pelo backend real (cliente HTTP,
+SSE, retentativas). Os resultados vão para um JSON e são comparados com a
+linha de base versionada em benchmarks/baseline.json:
+
+    python benchmarks/suite.py --salvar-baseline   # grava benchmarks/baseline.json
+    python benchmarks/suite.py                      # compara; sai com 1 se regrediu
+
+Uma medição regride quando a mediana passa da linha de base em mais de
+--limite (fração) e em mais de --minimo-ms (para ignorar ruído em medições
+de microssegundos). A linha de base só vale para a máquina em que foi gravada.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(RAIZ, 'benchmarks', 'fixtures')
+sys.path.insert(0, RAIZ)
+
+# Antes de qualquer import do Qt ou do main
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["ED_CACHE_RESPOSTAS"] = "0"  # Toda mensagem chega ao LLM falso
+os.environ["ED_CACHE_VOZ"] = "0"
+
+RESPOSTA_LLM = (
+    "Claro! Uma list comprehension cria a lista numa única expressão. "
+    "Ela costuma ser mais rápida que um laço com append, porque evita a busca do método a cada item. "
+    "Use quando a transformação for simples; para lógica longa, prefira o laço explícito."
+)
+
+
+def ler_fixture(nome):
+    with open(os.path.join(FIXTURES, nome), encoding='utf-8') as arquivo:
+        return arquivo.read()
+
+
+class HTTPGravado:
+    """Substitui o CacheHTTP: responde com as páginas gravadas, pelo host da URL"""
+
+    def __init__(self):
+        self.paginas = {
+            'pt.stackoverflow.com': ler_fixture('stackoverflow_busca.html'),
+            'developer.mozilla.org': ler_fixture('mdn_pagina.html'),
+            'pt.wikipedia.org': ler_fixture('wikipedia_busca.json'),
+        }
+
+    def obter(self, url, params=None, headers=None, timeout=None, sessao=None):
+        host = url.split('/')[2]
+        return self.paginas[host]
+
+
+class MotorVozMudo:
+    """Engine de voz que não fala: a fila de voz continua funcionando"""
+
+    def __init__(self):
+        self._propriedades = {'voice': 'mudo', 'rate': 180, 'volume': 1.0}
+
+    def connect(self, evento, callback):
+        pass
+
+    def getProperty(self, nome):
+        return self._propriedades.get(nome)
+
+    def setProperty(self, nome, valor):
+        self._propriedades[nome] = valor
+
+    def say(self, texto):
+        pass
+
+    def runAndWait(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def medir(funcao, repeticoes, aquecimento=3):
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        'mediana_ms': tempos[len(tempos) // 2],
+        'p95_ms': tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))],
+        'min_ms': tempos[0],
+        'repeticoes': repeticoes,
+    }
+
+
+def criar_janela():
+    from main import AssistenteIA
+
+    class AssistenteBenchmark(AssistenteIA):
+        def _criar_engine_voz(self):
+            return MotorVozMudo()
+
+    return AssistenteBenchmark()
+
+
+def popular(janela, conversas=1000, horarios=300):
+    memoria = janela.memoria
+    for i in range(conversas):
+        # Como em _ao_concluir_tarefa: a carga do índice só lê o que existia ao abrir a janela
+        usuario, resposta = f"como resolver o erro {i} em python", f"Verifique o passo {i} da documentação."
+        janela.registro.registrar(usuario, resposta)
+        janela.recuperador.adicionar_conversa(usuario, resposta)
+    agora = datetime.now()
+    for i in range(horarios):
+        memoria.adicionar_horario(f"compromisso {i}", None, agora + timedelta(hours=i + 1), notificar=False)
+    for i in range(horarios // 6):
+        memoria.adicionar_horario(f"rotina {i}", None, agora.replace(hour=i % 24, minute=0), recorrente=True,
+                                  dias_semana="seg,qua,sex", notificar=False)
+    for topico in ("python", "pyqt", "sqlite", "automação", "música"):
+        memoria.adicionar_interesse(topico, 2)
+    memoria.atualizar_conhecimento_programacao("python", "django", 3)
+    janela.registro.fila.aguardar()
+    memoria.db.aguardar_escritas()
+
+
+def casos_comandos(janela, repeticoes):
+    mensagens = {
+        'basica': "bom dia",
+        'chamada': "ei ed",
+        'sem_intencao': "qual a diferença entre uma lista e uma tupla em python quando preciso de desempenho",
+        'buscar_conversa': "buscar conversa sobre python",
+    }
+    for nome, texto in mensagens.items():
+        yield f"comando/{nome}", lambda texto=texto: janela.processar_comando(texto), repeticoes
+
+
+def casos_memoria(janela, repeticoes):
+    memoria = janela.memoria
+    quando = datetime.now() + timedelta(days=30)
+    para_remover = [memoria.adicionar_horario("temporário", None, quando, notificar=False)
+                    for _ in range(repeticoes + 3)]
+    contador = iter(range(10 ** 9))
+
+    yield "memoria/carregar_memoria", memoria.carregar_memoria, repeticoes
+    yield "memoria/atualizar_info", lambda: memoria.atualizar_info("ultima_interacao", str(next(contador))), repeticoes
+    yield "memoria/adicionar_horario", lambda: memoria.adicionar_horario("novo", None, quando, notificar=False), repeticoes
+    yield "memoria/remover_horario", lambda: memoria.remover_horario(para_remover.pop()), repeticoes
+    yield "memoria/listar_horarios", lambda: sum(1 for _ in memoria.listar_horarios(apenas_notificar=False)), repeticoes
+    yield "memoria/obter_proximos_compromissos", lambda: memoria.obter_proximos_compromissos(5), repeticoes
+    yield "memoria/adicionar_interesse", lambda: memoria.adicionar_interesse("benchmark", 1), repeticoes
+    yield ("memoria/atualizar_conhecimento_programacao",
+           lambda: memoria.atualizar_conhecimento_programacao("python", "flask", 2), repeticoes)
+    yield "memoria/obter_perfil_completo", memoria.obter_perfil_completo, repeticoes
+    yield "memoria/processar_mensagem", lambda: memoria.processar_mensagem("hoje eu uso python no trabalho"), repeticoes
+
+
+def casos_prompt(janela, repeticoes):
+    def frio():
+        # Uma escrita invalida o perfil e, com ele, o prompt montado
+        janela.memoria.atualizar_info("ultima_interacao", str(time.perf_counter()))
+        janela.montar_system_prompt(janela.memoria.obter_perfil_completo())
+
+    yield "prompt/perfil_e_system_prompt_frio", frio, repeticoes
+    yield ("prompt/perfil_e_system_prompt_quente",
+           lambda: janela.montar_system_prompt(janela.memoria.obter_perfil_completo()), repeticoes)
+
+
+def casos_historico(repeticoes):
+    from conversation_history import HistoricoConversa
+
+    # Orçamento de um turno só: cada adicionar despeja (e resume) o turno anterior
+    historico = HistoricoConversa(orcamento_tokens=20)
+    historico.adicionar("user", "como faço um laço em python")
+
+    def adicionar_e_remover():
+        turno = historico.adicionar("user", "e uma list comprehension, é mais rápida que o laço?")
+        # A troca que falha devolve o turno com remover; ele tem de ser o que acabou de entrar
+        if not historico.remover(turno):
+            raise RuntimeError("adicionar devolveu um turno que não está no histórico")
+        historico.adicionar("user", "como faço um laço em python")
+
+    yield "historico/adicionar_com_despejo_e_remover", adicionar_e_remover, repeticoes
+
+
+def casos_conhecimento(repeticoes):
+    from knowledge_base import BaseConhecimento
+    from knowledge_fanout import iniciar_consulta
+    from wikipedia_service import ServicoWikipedia
+
+    http = HTTPGravado()
+    conhecimento = BaseConhecimento()
+    conhecimento.http = http
+    wikipedia = ServicoWikipedia(cache_dir=os.path.join('cache', 'wikipedia'))
+    wikipedia.http = http
+
+    def consultar_wikipedia():
+        wikipedia._memo.clear()  # Mede a extração, não a memorização
+        return wikipedia.consultar("python")
+
+    yield "conhecimento/stackoverflow", lambda: conhecimento.pesquisar_programacao("python"), repeticoes
+    yield ("conhecimento/titulo_pagina",
+           lambda: conhecimento._obter_titulo("https://developer.mozilla.org/pt-BR/docs/Web/JavaScript"), repeticoes)
+    yield "conhecimento/wikipedia", consultar_wikipedia, repeticoes
+
+    conhecimento.wikipedia = wikipedia
+
+    def consulta_paralela():
+        wikipedia._memo.clear()
+        consulta = iniciar_consulta(lambda timeout: conhecimento, "O que é list comprehension em Python?", 5.0)
+        return consulta.coletar()
+
+    yield "conhecimento/consulta_paralela", consulta_paralela, repeticoes
+
+
+def casos_rastreamento(repeticoes):
+    from tracing import Rastreador
+
+    ligado = Rastreador(ativo=True)
+    desligado = Rastreador(ativo=False)
+
+    def trechos(rastreador):
+        def executar():
+            for _ in range(100):
+                with rastreador.trecho("benchmark"):
+                    pass
+        return executar
+
+    # Custo de 100 trechos: comparar com o ciclo de enviar_mensagem dá o overhead
+    yield "rastreamento/100_trechos_ligado", trechos(ligado), repeticoes
+    yield "rastreamento/100_trechos_desligado", trechos(desligado), repeticoes
+
+
+def casos_chat(janela, app, repeticoes):
+    from PyQt6.QtCore import QEventLoop, QTimer
+
+    contador = iter(range(10 ** 9))
+
+    def ida_e_volta():
+        loop = QEventLoop()
+        erros = []
+
+        def ao_falhar(_, erro):
+            erros.append(erro)
+            loop.quit()
+
+        # Conectados depois dos slots da janela: rodam quando a resposta já está no chat
+        janela.executor.concluida.connect(loop.quit)
+        janela.executor.erro.connect(ao_falhar)
+        QTimer.singleShot(30000, loop.quit)
+        try:
+            janela.input_field.setText(f"explique list comprehension, exemplo {next(contador)}")
+            janela.enviar_mensagem()
+            loop.exec()
+        finally:
+            janela.executor.concluida.disconnect(loop.quit)
+            janela.executor.erro.disconnect(ao_falhar)
+        # Uma falha também encerra a espera; sem isto ela seria medida como resposta
+        if erros:
+            raise RuntimeError(f"A resposta falhou: {erros[0]}")
+        if janela._tarefa_atual is not None:
+            raise RuntimeError("A resposta não chegou em 30 s")
+
+    def com_modo(streaming):
+        def executar():
+            janela.modo_streaming = streaming
+            ida_e_volta()
+        return executar
+
+    yield "chat/enviar_mensagem_streaming", com_modo(True), repeticoes
+    yield "chat/enviar_mensagem_sem_streaming", com_modo(False), repeticoes
+
+
+def executar(args):
+    from PyQt6.QtWidgets import QApplication
+    from stub_llm_server import ServidorLLMFalso
+
+    app = QApplication.instance() or QApplication([])
+    resultados = {}
+    servidor = ServidorLLMFalso(latencia=0.0, intervalo=args.atraso_trecho_ms / 1000,
+                                resposta=RESPOSTA_LLM).iniciar()
+    # Lidos por criar_backend quando a janela é criada; nunca chega à API real
+    os.environ["OPENAI_BASE_URL"] = servidor.url
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    with tempfile.TemporaryDirectory() as diretorio:
+        anterior = os.getcwd()
+        os.chdir(diretorio)
+        janela = None
+        try:
+            janela = criar_janela()
+            popular(janela)
+            app.processEvents()
+            grupos = [
+                casos_comandos(janela, args.repeticoes),
+                casos_memoria(janela, args.repeticoes),
+                casos_prompt(janela, args.repeticoes),
+                casos_historico(args.repeticoes),
+                casos_conhecimento(max(1, args.repeticoes // 4)),
+                casos_rastreamento(args.repeticoes),
+                casos_chat(janela, app, max(1, args.repeticoes // 10)),
+            ]
+            for grupo in grupos:
+                for nome, funcao, repeticoes in grupo:
+                    if args.filtro and args.filtro not in nome:
+                        continue
+                    # O assistente imprime a latência de cada resposta; fica fora do relatório
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        resultados[nome] = medir(funcao, repeticoes)
+                    print(f"{nome:<48}{resultados[nome]['mediana_ms']:>10.3f} ms")
+        finally:
+            if janela is not None:
+                janela.close()
+                app.processEvents()
+            servidor.encerrar()
+            os.chdir(anterior)
+    return resultados
+
+
+def versao_codigo():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def comparar(resultados, baseline, limite, minimo_ms):
+    """Imprime a comparação com a linha de base e retorna os nomes que regrediram"""
+    regressoes = []
+    print(f"\n{'medição':<48}{'base (ms)':>12}{'atual (ms)':>12}{'variação':>10}")
+    for nome, atual in resultados.items():
+        base = baseline.get(nome)
+        if base is None:
+            print(f"{nome:<48}{'--':>12}{atual['mediana_ms']:>12.3f}{'novo':>10}")
+            continue
+        antes, agora = base['mediana_ms'], atual['mediana_ms']
+        variacao = (agora - antes) / antes if antes else 0.0
+        regrediu = agora > antes * (1 + limite) and agora - antes > minimo_ms
+        marca = "  REGRESSÃO" if regrediu else ""
+        print(f"{nome:<48}{antes:>12.3f}{agora:>12.3f}{variacao:>+10.0%}{marca}")
+        if regrediu:
+            regressoes.append(nome)
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=200,
+                        help="repetições das medições rápidas (conhecimento usa 1/4, chat 1/10)")
+    parser.add_argument("--filtro", help="só roda as medições cujo nome contém este texto")
+    parser.add_argument("--atraso-trecho-ms", type=float, default=0.0,
+                        help="espera do LLM falso entre trechos do streaming")
+    parser.add_argument("--saida", default=os.path.join(RAIZ, 'benchmarks', 'resultados.json'))
+    parser.add_argument("--baseline", default=os.path.join(RAIZ, 'benchmarks', 'baseline.json'))
+    parser.add_argument("--salvar-baseline", action="store_true", help="grava os resultados como linha de base")
+    parser.add_argument("--limite", type=float, default=0.25, help="aumento relativo da mediana tolerado")
+    parser.add_argument("--minimo-ms", type=float, default=0.05, help="aumento absoluto abaixo do qual não há regressão")
+    args = parser.parse_args()
+
+    resultados = executar(args)
+    relatorio = {
+        'data': datetime.now().isoformat(' ', 'seconds'),
+        'codigo': versao_codigo(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'resultados': resultados,
+    }
+    destinos = [args.saida] + ([args.baseline] if args.salvar_baseline else [])
+    for destino in destinos:
+        with open(destino, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {', '.join(destinos)}")
+
+    if args.salvar_baseline or not os.path.exists(args.baseline):
+        if not args.salvar_baseline:
+            print("Sem linha de base para comparar; grave uma com --salvar-baseline")
+        return 0
+    with open(args.baseline, encoding='utf-8') as arquivo:
+        baseline = json.load(arquivo)
+    regressoes = comparar(resultados, baseline['resultados'], args.limite, args.minimo_ms)
+    if regressoes:
+        print(f"\n{len(regressoes)} medição(ões) regrediram além de {args.limite:.0%}: {', '.join(regressoes)}")
+        return 1
+    print("\nNenhuma regressão")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
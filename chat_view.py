@@ -0,0 +1,314 @@
+import html
+from collections import OrderedDict, deque
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QSize, Qt, QTimer
+from PyQt6.QtGui import QTextDocument
+from PyQt6.QtWidgets import QAbstractItemView, QListView, QStyle, QStyledItemDelegate
+
+COR_ED = "#4FC3F7"
+COR_USUARIO = "#FFFFFF"
+
+
+def formatar_mensagem(nome, mensagem):
+    cor = COR_ED if nome == "ED" else COR_USUARIO
+    return f'<div style="margin: 10px 0;"><span style="color: {cor}; font-weight: bold;">{nome}:</span> {mensagem}</div>'
+
+
+class Mensagem:
+    """Uma linha do chat; `id_conversa` liga a mensagem à tabela conversas (None se não gravada)"""
+
+    __slots__ = ('nome', 'corpo', 'id_conversa', 'versao', 'alturas')
+
+    def __init__(self, nome, corpo, id_conversa=None):
+        self.nome = nome
+        self.corpo = corpo
+        self.id_conversa = id_conversa
+        self.versao = 0
+        self.alturas = {}
+
+    def html(self):
+        return formatar_mensagem(self.nome, self.corpo)
+
+
+class ModeloChat(QAbstractListModel):
+    """Janela limitada de mensagens: guarda no máximo `capacidade` linhas.
+
+    Mensagens novas entram no fim e empurram as mais antigas para fora;
+    mensagens antigas carregadas do banco entram no começo e, se passar da
+    capacidade, saem as do fim (`fim_recortado` passa a ser True).
+    """
+
+    def __init__(self, capacidade=300, parent=None):
+        super().__init__(parent)
+        self.capacidade = capacidade
+        self._mensagens = []
+        self.fim_recortado = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._mensagens)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        mensagem = self._mensagens[index.row()]
+        if role == Qt.ItemDataRole.UserRole:
+            return mensagem
+        if role == Qt.ItemDataRole.DisplayRole:
+            return mensagem.html()
+        return None
+
+    def mensagens(self):
+        return list(self._mensagens)
+
+    def adicionar(self, mensagem):
+        linha = len(self._mensagens)
+        self.beginInsertRows(QModelIndex(), linha, linha)
+        self._mensagens.append(mensagem)
+        self.endInsertRows()
+        excesso = len(self._mensagens) - self.capacidade
+        if excesso > 0:
+            self.beginRemoveRows(QModelIndex(), 0, excesso - 1)
+            del self._mensagens[:excesso]
+            self.endRemoveRows()
+        return mensagem
+
+    def prepender(self, mensagens):
+        """Insere mensagens antigas no começo, descartando do fim o que passar da capacidade"""
+        if not mensagens:
+            return
+        mensagens = mensagens[-self.capacidade:]
+        self.beginInsertRows(QModelIndex(), 0, len(mensagens) - 1)
+        self._mensagens[:0] = mensagens
+        self.endInsertRows()
+        if len(self._mensagens) > self.capacidade:
+            # Corta o fim até uma mensagem gravada, para depois retomar pelo id dela
+            corte = self.capacidade
+            while corte > 0 and self._mensagens[corte - 1].id_conversa is None:
+                corte -= 1
+            self.beginRemoveRows(QModelIndex(), corte, len(self._mensagens) - 1)
+            del self._mensagens[corte:]
+            self.endRemoveRows()
+            self.fim_recortado = True
+
+    def apendar_gravadas(self, mensagens):
+        """Acrescenta no fim mensagens do banco que tinham sido recortadas"""
+        for mensagem in mensagens:
+            self.adicionar(mensagem)
+
+    def redefinir(self, mensagens):
+        self.beginResetModel()
+        self._mensagens = list(mensagens[-self.capacidade:])
+        self.fim_recortado = False
+        self.endResetModel()
+
+    def atualizar(self, mensagem, corpo):
+        """Troca o corpo de uma mensagem já exibida (ex.: resposta em streaming)"""
+        mensagem.corpo = corpo
+        mensagem.versao += 1
+        mensagem.alturas.clear()
+        # A mensagem atualizada quase sempre é a última
+        for linha in range(len(self._mensagens) - 1, -1, -1):
+            if self._mensagens[linha] is mensagem:
+                indice = self.index(linha)
+                self.dataChanged.emit(indice, indice)
+                return
+
+    def id_mais_antigo(self):
+        return next((m.id_conversa for m in self._mensagens if m.id_conversa is not None), None)
+
+    def id_mais_recente(self):
+        return next((m.id_conversa for m in reversed(self._mensagens) if m.id_conversa is not None), None)
+
+
+class DelegadoMensagem(QStyledItemDelegate):
+    """Desenha cada mensagem como HTML; só as linhas visíveis são desenhadas.
+
+    Os documentos montados ficam num cache LRU pequeno e a altura de cada
+    mensagem é guardada por largura, então rolar não refaz o layout.
+    """
+
+    MARGEM = 8
+
+    def __init__(self, parent=None, max_documentos=64):
+        super().__init__(parent)
+        self.max_documentos = max_documentos
+        self._documentos = OrderedDict()
+
+    def _documento(self, mensagem, largura):
+        chave = (id(mensagem), mensagem.versao, largura)
+        documento = self._documentos.get(chave)
+        if documento is not None:
+            self._documentos.move_to_end(chave)
+            return documento
+        documento = QTextDocument()
+        documento.setDocumentMargin(0)
+        documento.setDefaultStyleSheet(f"body {{ color: {COR_USUARIO}; }}")
+        documento.setHtml(mensagem.html())
+        documento.setTextWidth(largura)
+        self._documentos[chave] = documento
+        while len(self._documentos) > self.max_documentos:
+            self._documentos.popitem(last=False)
+        return documento
+
+    def _largura(self, option):
+        return max(50, option.rect.width() - 2 * self.MARGEM)
+
+    def paint(self, painter, option, index):
+        mensagem = index.data(Qt.ItemDataRole.UserRole)
+        if option.state & QStyle.StateFlag.State_Selected:
+            option.state &= ~QStyle.StateFlag.State_Selected
+        documento = self._documento(mensagem, self._largura(option))
+        painter.save()
+        painter.translate(option.rect.left() + self.MARGEM, option.rect.top())
+        documento.drawContents(painter)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        mensagem = index.data(Qt.ItemDataRole.UserRole)
+        largura = self._largura(option)
+        altura = mensagem.alturas.get(largura)
+        if altura is None:
+            altura = int(self._documento(mensagem, largura).size().height())
+            mensagem.alturas[largura] = altura
+        return QSize(largura, altura)
+
+
+class VisaoChat(QListView):
+    """Lista virtualizada do chat, com carga preguiçosa do histórico gravado.
+
+    Rolar até o topo carrega uma página de conversas anteriores de
+    `historico` (um RegistroConversas); se o fim tinha sido recortado, rolar
+    até o fim traz as mensagens seguintes de volta. As trocas desta sessão
+    ganham o id da tabela conversas sob demanda (`marcar_gravada`), na ordem
+    em que foram gravadas.
+    """
+
+    def __init__(self, historico=None, capacidade=300, pagina=25, parent=None):
+        super().__init__(parent)
+        self.historico = historico
+        self.pagina = pagina
+        self.modelo = ModeloChat(capacidade, self)
+        self.setModel(self.modelo)
+        self.setItemDelegate(DelegadoMensagem(self))
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setWordWrap(True)
+        self._sem_id = deque()
+        self._ultimo_id = (historico.ultimo_id() or 0) if historico is not None else 0
+        self._historico_esgotado = historico is None or not self._ultimo_id
+        self._carregando = False
+        self.verticalScrollBar().valueChanged.connect(self._ao_rolar)
+        if not self._historico_esgotado:
+            # Uma página das conversas mais recentes, para haver o que rolar
+            self._carregar_anteriores()
+            # O layout só fica pronto quando a janela aparece
+            QTimer.singleShot(0, self.scrollToBottom)
+
+    def adicionar(self, nome, corpo):
+        """Acrescenta uma mensagem ao fim e retorna o objeto (para atualizar depois)"""
+        if self.modelo.fim_recortado:
+            self._voltar_ao_presente()
+        no_fim = self._no_fim()
+        mensagem = self.modelo.adicionar(Mensagem(nome, corpo))
+        if no_fim:
+            self.scrollToBottom()
+        return mensagem
+
+    def atualizar(self, mensagem, corpo):
+        no_fim = self._no_fim()
+        self.modelo.atualizar(mensagem, corpo)
+        if no_fim:
+            self.scrollToBottom()
+
+    def anexar_texto(self, mensagem, texto):
+        """Acrescenta texto simples (escapado) ao corpo da mensagem"""
+        self.atualizar(mensagem, mensagem.corpo + html.escape(texto))
+
+    def marcar_gravada(self, *mensagens):
+        """Registra que as mensagens formam a próxima linha gravada em conversas"""
+        if self.historico is None:
+            return
+        self._sem_id.append(mensagens)
+        self._historico_esgotado = False
+        if len(self._sem_id) >= self.pagina:
+            # Não deixa a fila de pendentes crescer numa sessão longa
+            self._resolver_ids()
+
+    def _resolver_ids(self):
+        if not self._sem_id:
+            return
+        for id_conversa in self.historico.ids_depois_de(self._ultimo_id, len(self._sem_id)):
+            for mensagem in self._sem_id.popleft():
+                mensagem.id_conversa = id_conversa
+            self._ultimo_id = id_conversa
+
+    def _no_fim(self):
+        barra = self.verticalScrollBar()
+        return barra.value() >= barra.maximum() - 4
+
+    def wheelEvent(self, evento):
+        super().wheelEvent(evento)
+        # Com a barra já no limite (ou sem barra) o valor não muda e não há sinal
+        self._ao_rolar(self.verticalScrollBar().value())
+
+    def _ao_rolar(self, valor):
+        if self._carregando:
+            return
+        barra = self.verticalScrollBar()
+        if valor == barra.minimum() and not self._historico_esgotado:
+            self._carregar_anteriores()
+        elif valor == barra.maximum() and self.modelo.fim_recortado:
+            self._carregar_posteriores()
+
+    def _carregar_anteriores(self):
+        self._resolver_ids()
+        antes_de = self.modelo.id_mais_antigo() or self._ultimo_id + 1
+        linhas = self.historico.anteriores(antes_de, self.pagina)
+        if not linhas:
+            self._historico_esgotado = True
+            return
+        barra = self.verticalScrollBar()
+        self._carregando = True
+        try:
+            valor = barra.value()
+            mensagens = self._para_mensagens(reversed(linhas))
+            self.modelo.prepender(mensagens)
+            # Mantém na tela a mensagem que o usuário estava vendo: ela desceu
+            # exatamente a altura do que entrou acima dela
+            self.executeDelayedItemsLayout()
+            antiga_primeira = self.visualRect(self.modelo.index(len(mensagens)))
+            barra.setValue(antiga_primeira.top() + barra.value() + valor)
+        finally:
+            self._carregando = False
+
+    def _carregar_posteriores(self):
+        linhas = self.historico.posteriores(self.modelo.id_mais_recente(), self.pagina)
+        self._carregando = True
+        try:
+            if len(linhas) < self.pagina:
+                # Chegou ao presente: o que ficou de fora foi só o que não é gravado
+                self.modelo.fim_recortado = False
+            valor = self.verticalScrollBar().value()
+            self.modelo.apendar_gravadas(self._para_mensagens(linhas))
+            self.executeDelayedItemsLayout()
+            self.verticalScrollBar().setValue(valor)
+        finally:
+            self._carregando = False
+
+    def _voltar_ao_presente(self):
+        """Chegou mensagem nova com o fim recortado: recarrega as conversas mais recentes"""
+        self._resolver_ids()
+        linhas = self.historico.anteriores(self._ultimo_id + 1, self.pagina)
+        self.modelo.redefinir(self._para_mensagens(reversed(linhas)))
+        self._historico_esgotado = False
+        self.scrollToBottom()
+
+    @staticmethod
+    def _para_mensagens(linhas):
+        mensagens = []
+        for id_conversa, timestamp, usuario, resposta in linhas:
+            mensagens.append(Mensagem("Você", usuario, id_conversa))
+            mensagens.append(Mensagem("ED", resposta, id_conversa))
+        return mensagens
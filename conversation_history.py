@@ -0,0 +1,110 @@
+import re
+import threading
+from collections import deque
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Custo aproximado de cada mensagem no formato de chat (role, separadores)
+TOKENS_POR_MENSAGEM = 4
+
+
+class ContadorTokens:
+    """Conta tokens localmente: com tiktoken quando instalado, senão por estimativa"""
+
+    def __init__(self, modelo="gpt-3.5-turbo"):
+        self._codificador = None
+        if tiktoken is not None:
+            try:
+                self._codificador = tiktoken.encoding_for_model(modelo)
+            except KeyError:
+                self._codificador = tiktoken.get_encoding("cl100k_base")
+
+    def contar(self, texto):
+        if self._codificador is not None:
+            return len(self._codificador.encode(texto))
+        # Estimativa: uma unidade por palavra ou símbolo, mais uma a cada 6 letras
+        return sum(1 + len(parte) // 6 for parte in re.findall(r"\w+|[^\w\s]", texto))
+
+
+class HistoricoConversa:
+    """Janela de conversa limitada por tokens, com resumo dos turnos descartados.
+
+    Os turnos mais novos ficam dentro de `orcamento_tokens`; os que saem da
+    janela viram uma linha curta num resumo que também tem orçamento próprio.
+    A contagem de tokens de cada mensagem é feita uma única vez.
+    """
+
+    def __init__(self, orcamento_tokens=1500, orcamento_resumo=300, contador=None):
+        self.orcamento_tokens = orcamento_tokens
+        self.orcamento_resumo = orcamento_resumo
+        self.contador = contador or ContadorTokens()
+        self._turnos = deque()
+        self._tokens_turnos = 0
+        self._resumo = deque()
+        self._tokens_resumo = 0
+        self._lock = threading.Lock()
+
+    def adicionar(self, role, content):
+        """Acrescenta um turno e o devolve (para `remover`, se a troca não se completar)"""
+        tokens = self.contador.contar(content) + TOKENS_POR_MENSAGEM
+        mensagem = {"role": role, "content": content}
+        with self._lock:
+            self._turnos.append((mensagem, tokens))
+            self._tokens_turnos += tokens
+            # Mantém pelo menos a mensagem mais nova, mesmo se passar do orçamento
+            while self._tokens_turnos > self.orcamento_tokens and len(self._turnos) > 1:
+                antiga, tokens_antiga = self._turnos.popleft()
+                self._tokens_turnos -= tokens_antiga
+                self._resumir(antiga)
+        return mensagem
+
+    def remover(self, mensagem):
+        """Tira da janela um turno devolvido por `adicionar`, se ele ainda estiver nela"""
+        with self._lock:
+            for indice, (turno, tokens) in enumerate(self._turnos):
+                if turno is mensagem:
+                    del self._turnos[indice]
+                    self._tokens_turnos -= tokens
+                    return True
+            return False
+
+    def mensagens(self):
+        """Mensagens para a API: o resumo (se houver) seguido dos turnos recentes"""
+        with self._lock:
+            mensagens = [dict(mensagem) for mensagem, _ in self._turnos]
+            if self._resumo:
+                linhas = "\n".join(linha for linha, _ in self._resumo)
+                mensagens.insert(0, {
+                    "role": "system",
+                    "content": f"Resumo da conversa anterior:\n{linhas}"
+                })
+            return mensagens
+
+    def tokens(self):
+        with self._lock:
+            extra = TOKENS_POR_MENSAGEM if self._resumo else 0
+            return self._tokens_turnos + self._tokens_resumo + extra
+
+    def limpar(self):
+        with self._lock:
+            self._turnos.clear()
+            self._resumo.clear()
+            self._tokens_turnos = self._tokens_resumo = 0
+
+    def _resumir(self, mensagem):
+        """Reduz a mensagem descartada à primeira frase e junta ao resumo"""
+        autor = "Usuário" if mensagem["role"] == "user" else "ED"
+        texto = " ".join(mensagem["content"].split())
+        primeira_frase = re.split(r"(?<=[.!?])\s", texto, maxsplit=1)[0]
+        if len(primeira_frase) > 120:
+            primeira_frase = primeira_frase[:117].rstrip() + "..."
+        linha = f"- {autor}: {primeira_frase}"
+        tokens = self.contador.contar(linha)
+        self._resumo.append((linha, tokens))
+        self._tokens_resumo += tokens
+        while self._tokens_resumo > self.orcamento_resumo and len(self._resumo) > 1:
+            _, tokens_linha = self._resumo.popleft()
+            self._tokens_resumo -= tokens_linha
@@ -0,0 +1,186 @@
+import re
+import sqlite3
+from datetime import datetime
+from database import FilaEscrita, obter_gerenciador
+
+
+class RegistroConversas:
+    """Grava cada troca de mensagens e permite buscá-las por texto.
+
+    As inserções passam por uma fila própria que agrupa tudo o que chegar em
+    até um segundo numa única transação. A busca usa um índice FTS5 sobre a
+    mensagem do usuário e a resposta, mantido por triggers.
+    """
+
+    def __init__(self, db_path='assistente.db', janela_gravacao=1.0, janela_busca=100):
+        self.db = obter_gerenciador(db_path)
+        self.janela_busca = janela_busca
+        self.fts = False
+        self.setup_database()
+        self.fila = FilaEscrita(self.db, janela=janela_gravacao, max_lote=1000)
+
+    def setup_database(self):
+        with self.db.transacao() as conn:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS conversas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT,
+                usuario TEXT,
+                resposta TEXT
+            )
+            ''')
+        try:
+            with self.db.transacao() as conn:
+                existia = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'conversas_fts'"
+                ).fetchone()
+                conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS conversas_fts USING fts5(
+                    usuario, resposta,
+                    content='conversas', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+                ''')
+                conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS conversas_ai AFTER INSERT ON conversas BEGIN
+                    INSERT INTO conversas_fts (rowid, usuario, resposta)
+                    VALUES (new.id, new.usuario, new.resposta);
+                END
+                ''')
+                conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS conversas_ad AFTER DELETE ON conversas BEGIN
+                    INSERT INTO conversas_fts (conversas_fts, rowid, usuario, resposta)
+                    VALUES ('delete', old.id, old.usuario, old.resposta);
+                END
+                ''')
+                conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS conversas_au AFTER UPDATE ON conversas BEGIN
+                    INSERT INTO conversas_fts (conversas_fts, rowid, usuario, resposta)
+                    VALUES ('delete', old.id, old.usuario, old.resposta);
+                    INSERT INTO conversas_fts (rowid, usuario, resposta)
+                    VALUES (new.id, new.usuario, new.resposta);
+                END
+                ''')
+                if not existia:
+                    # Indexa as conversas gravadas antes do índice existir
+                    conn.execute("INSERT INTO conversas_fts (conversas_fts) VALUES ('rebuild')")
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            print(f"FTS5 indisponível, a busca de conversas usará LIKE: {e}")
+
+    def registrar(self, usuario, resposta):
+        """Enfileira a troca para gravação; não bloqueia quem chama"""
+        self.fila.enfileirar(
+            "INSERT INTO conversas (timestamp, usuario, resposta) VALUES (?, ?, ?)",
+            (datetime.now().isoformat(' ', 'seconds'), usuario, resposta)
+        )
+
+    def buscar(self, termo, limite=10):
+        """Retorna conversas recentes com todas as palavras do termo, das mais relevantes às menos"""
+        palavras = re.findall(r"\w+", termo.lower())
+        if not palavras:
+            return []
+        self.fila.aguardar()
+        conn = self.db.conexao()
+
+        if not self.fts:
+            filtro = " AND ".join("(usuario || ' ' || resposta) LIKE ?" for _ in palavras)
+            linhas = conn.execute(
+                f"SELECT id, timestamp, usuario, resposta FROM conversas WHERE {filtro} "
+                "ORDER BY id DESC LIMIT ?",
+                [f"%{p}%" for p in palavras] + [limite]
+            ).fetchall()
+            return [self._formatar_linha(linha, None) for linha in linhas]
+
+        # Cada palavra vira um termo exato entre aspas. Prefixo ("abc"*) expande
+        # para muitos termos e é bem mais caro, então só é tentado se não houver
+        # resultado exato
+        consulta = " ".join(f'"{p}"' for p in palavras)
+        linhas = self._buscar_fts(conn, consulta, limite)
+        if not linhas and len(palavras[-1]) >= 4:
+            linhas = self._buscar_fts(conn, consulta + "*", limite)
+        return [self._formatar_linha(linha[:4], linha[4]) for linha in linhas]
+
+    def _buscar_fts(self, conn, consulta, limite):
+        # Ordenar todo o histórico por relevância custa caro em termos comuns:
+        # pega as ocorrências mais recentes (rowid decrescente para cedo) e
+        # ordena só essas por relevância
+        return conn.execute('''
+            SELECT c.id, c.timestamp, c.usuario, c.resposta, f.trecho
+            FROM (
+                SELECT rowid, rank, snippet(conversas_fts, -1, '<b>', '</b>', '…', 12) AS trecho
+                FROM conversas_fts
+                WHERE conversas_fts MATCH ?
+                ORDER BY rowid DESC
+                LIMIT ?
+            ) f
+            JOIN conversas c ON c.id = f.rowid
+            ORDER BY f.rank
+            LIMIT ?
+        ''', (consulta, self.janela_busca, limite)).fetchall()
+
+    def todas(self, lote=1000, ate_id=None):
+        """Gera (id, usuario, resposta) das conversas até `ate_id` (todas, se None), das mais antigas às mais novas"""
+        self.fila.aguardar()
+        if ate_id is None:
+            cursor = self.db.conexao().execute("SELECT id, usuario, resposta FROM conversas ORDER BY id")
+        else:
+            cursor = self.db.conexao().execute(
+                "SELECT id, usuario, resposta FROM conversas WHERE id <= ? ORDER BY id", (ate_id,)
+            )
+        while True:
+            linhas = cursor.fetchmany(lote)
+            if not linhas:
+                return
+            yield from linhas
+
+    def ultimo_id(self):
+        self.fila.aguardar()
+        return self.db.conexao().execute("SELECT MAX(id) FROM conversas").fetchone()[0]
+
+    def anteriores(self, antes_de=None, limite=25):
+        """(id, timestamp, usuario, resposta) das conversas antes do id dado, das mais novas às mais antigas"""
+        self.fila.aguardar()
+        if antes_de is None:
+            return self.db.conexao().execute(
+                "SELECT id, timestamp, usuario, resposta FROM conversas ORDER BY id DESC LIMIT ?",
+                (limite,)
+            ).fetchall()
+        return self.db.conexao().execute(
+            "SELECT id, timestamp, usuario, resposta FROM conversas WHERE id < ? ORDER BY id DESC LIMIT ?",
+            (antes_de, limite)
+        ).fetchall()
+
+    def posteriores(self, depois_de, limite=25):
+        """(id, timestamp, usuario, resposta) das conversas depois do id dado, em ordem"""
+        self.fila.aguardar()
+        return self.db.conexao().execute(
+            "SELECT id, timestamp, usuario, resposta FROM conversas WHERE id > ? ORDER BY id LIMIT ?",
+            (depois_de or 0, limite)
+        ).fetchall()
+
+    def ids_depois_de(self, depois_de, limite):
+        """Ids das conversas gravadas depois de `depois_de`, em ordem"""
+        self.fila.aguardar()
+        linhas = self.db.conexao().execute(
+            "SELECT id FROM conversas WHERE id > ? ORDER BY id LIMIT ?", (depois_de or 0, limite)
+        ).fetchall()
+        return [linha[0] for linha in linhas]
+
+    def total(self):
+        self.fila.aguardar()
+        return self.db.conexao().execute("SELECT COUNT(*) FROM conversas").fetchone()[0]
+
+    def fechar(self):
+        self.fila.encerrar()
+
+    @staticmethod
+    def _formatar_linha(linha, trecho):
+        id_conversa, timestamp, usuario, resposta = linha
+        return {
+            'id': id_conversa,
+            'timestamp': timestamp,
+            'usuario': usuario,
+            'resposta': resposta,
+            'trecho': trecho or usuario
+        }
@@ -0,0 +1,166 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class FilaEscrita:
+    """Agrupa escritas feitas em rajada numa única transação.
+
+    Uma thread própria espera a primeira escrita, junta as que chegarem dentro
+    da janela (ou até max_lote) e grava tudo com um só commit.
+    """
+
+    def __init__(self, gerenciador, janela=0.05, max_lote=500):
+        self.gerenciador = gerenciador
+        self.janela = janela
+        self.max_lote = max_lote
+        self._fila = queue.Queue()
+        self._pendentes = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._executar, name="FilaEscrita", daemon=True)
+        self._thread.start()
+
+    def enfileirar(self, sql, params=()):
+        with self._lock:
+            self._pendentes += 1
+        self._fila.put((sql, params))
+
+    def aguardar(self, timeout=None):
+        """Bloqueia até que tudo o que foi enfileirado esteja gravado"""
+        with self._lock:
+            if not self._pendentes:
+                return True
+        marcador = threading.Event()
+        self._fila.put(marcador)
+        return marcador.wait(timeout)
+
+    def encerrar(self):
+        self.aguardar()
+        self._fila.put(None)
+        self._thread.join()
+
+    def _executar(self):
+        while True:
+            item = self._fila.get()
+            if item is None:
+                return
+            lote, marcadores, parar = [], [], False
+            limite = time.monotonic() + self.janela
+            while True:
+                if item is None:
+                    parar = True
+                    break
+                if isinstance(item, threading.Event):
+                    # Alguém está esperando: grava já, sem esperar a janela
+                    marcadores.append(item)
+                    break
+                lote.append(item)
+                restante = limite - time.monotonic()
+                if len(lote) >= self.max_lote or restante <= 0:
+                    break
+                try:
+                    item = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+            self._gravar(lote)
+            for marcador in marcadores:
+                marcador.set()
+            if parar:
+                return
+
+    def _gravar(self, lote):
+        if not lote:
+            return
+        conn = self.gerenciador.conexao()
+        try:
+            with conn:
+                for sql, params in lote:
+                    conn.execute(sql, params)
+        except sqlite3.Error as e:
+            # Uma escrita inválida não deve derrubar as outras do lote
+            print(f"Erro ao gravar lote no banco: {e}")
+            for sql, params in lote:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                except sqlite3.Error as erro:
+                    print(f"Erro ao gravar no banco: {erro}")
+        finally:
+            with self._lock:
+                self._pendentes -= len(lote)
+
+
+class GerenciadorConexoes:
+    """Mantém uma conexão SQLite por thread, em modo WAL, para um banco"""
+
+    def __init__(self, db_path, cached_statements=256):
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._conexoes = []
+        self._lock = threading.Lock()
+        self._fila = None
+
+    def conexao(self):
+        """Retorna a conexão da thread atual, criando-a na primeira vez"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                cached_statements=self.cached_statements,
+                check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._conexoes.append(conn)
+        return conn
+
+    @contextmanager
+    def transacao(self):
+        """Executa o bloco numa transação: commit no fim, rollback em caso de erro"""
+        conn = self.conexao()
+        with conn:
+            yield conn
+
+    @property
+    def fila(self):
+        with self._lock:
+            if self._fila is None:
+                self._fila = FilaEscrita(self)
+            return self._fila
+
+    def escrever(self, sql, params=()):
+        """Enfileira uma escrita para ser gravada junto com as próximas"""
+        self.fila.enfileirar(sql, params)
+
+    def aguardar_escritas(self):
+        if self._fila is not None:
+            self._fila.aguardar()
+
+    def fechar(self):
+        if self._fila is not None:
+            self._fila.encerrar()
+            self._fila = None
+        with self._lock:
+            for conn in self._conexoes:
+                conn.close()
+            self._conexoes.clear()
+        self._local = threading.local()
+
+
+_gerenciadores = {}
+_lock_gerenciadores = threading.Lock()
+
+
+def obter_gerenciador(db_path='assistente.db'):
+    """Retorna o gerenciador compartilhado de um arquivo de banco"""
+    chave = os.path.abspath(db_path)
+    with _lock_gerenciadores:
+        if chave not in _gerenciadores:
+            _gerenciadores[chave] = GerenciadorConexoes(db_path)
+        return _gerenciadores[chave]
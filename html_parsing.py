@@ -0,0 +1,211 @@
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from html.parser import HTMLParser
+
+# Backend mais rápido disponível: selectolax (lexbor, em C), lxml (libxml2) ou
+# BeautifulSoup montando só os trechos pedidos (SoupStrainer)
+try:
+    from selectolax.parser import HTMLParser as _Selectolax
+except ImportError:
+    _Selectolax = None
+try:
+    import lxml.html as _lxml_html
+except ImportError:
+    _lxml_html = None
+
+if _Selectolax is not None:
+    BACKEND = 'selectolax'
+elif _lxml_html is not None:
+    BACKEND = 'lxml'
+else:
+    BACKEND = 'beautifulsoup'
+
+# Seletores da página de busca do Stack Overflow
+CLASSE_PERGUNTA = 'question-summary'
+CAMPOS_PERGUNTA = {'titulo': 'question-hyperlink', 'resumo': 'excerpt', 'votos': 'vote-count-post'}
+# O SoupStrainer do bs4 >= 4.13 compara o atributo class inteiro; a regex casa uma das classes
+_RE_PERGUNTA = re.compile(rf'(?:^|\s){CLASSE_PERGUNTA}(?:\s|$)')
+# Início da tag de cada resultado, para recortar o documento antes de analisá-lo
+_RE_INICIO_PERGUNTA = re.compile(
+    rf"""<[a-zA-Z][^>]*?\sclass\s*=\s*["']?(?:[^"'>]*\s)?{CLASSE_PERGUNTA}(?=[\s"'>])"""
+)
+
+
+def _texto(texto):
+    return " ".join(texto.split())
+
+
+def recortar_perguntas(html, limite=3):
+    """Só o trecho do documento com os `limite` primeiros resultados ('' se não houver nenhum).
+
+    Uma busca em texto (em C) acha onde cada resultado começa; o parser só
+    precisa ler esse trecho, e não o cabeçalho, a barra lateral e os demais
+    resultados da página.
+    """
+    inicios = [casamento.start() for _, casamento in zip(range(limite + 1), _RE_INICIO_PERGUNTA.finditer(html))]
+    if not inicios:
+        return ''
+    return html[inicios[0]:inicios[limite]] if len(inicios) > limite else html[inicios[0]:]
+
+
+def extrair_perguntas(html, limite=3):
+    """[{'titulo', 'resumo', 'votos'}] dos primeiros resultados de uma busca do Stack Overflow"""
+    html = recortar_perguntas(html, limite)
+    if not html:
+        return []
+    if BACKEND == 'selectolax':
+        campos = []
+        for no in _Selectolax(html).css(f'.{CLASSE_PERGUNTA}')[:limite]:
+            encontrados = {chave: no.css_first(f'.{classe}') for chave, classe in CAMPOS_PERGUNTA.items()}
+            campos.append({chave: achado.text() if achado is not None else None
+                           for chave, achado in encontrados.items()})
+    elif BACKEND == 'lxml':
+        nos = _lxml_html.fromstring(html).xpath(_xpath_classe(CLASSE_PERGUNTA))[:limite]
+        campos = []
+        for no in nos:
+            encontrados = {chave: no.xpath('.' + _xpath_classe(classe)) for chave, classe in CAMPOS_PERGUNTA.items()}
+            campos.append({chave: achados[0].text_content() if achados else None
+                           for chave, achados in encontrados.items()})
+    else:
+        from bs4 import BeautifulSoup, SoupStrainer
+        # Só os blocos de resultado viram árvore; o resto da página é descartado na leitura
+        soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(class_=_RE_PERGUNTA))
+        campos = []
+        for no in soup.find_all(class_=CLASSE_PERGUNTA, limit=limite):
+            encontrados = {chave: no.find(class_=classe) for chave, classe in CAMPOS_PERGUNTA.items()}
+            campos.append({chave: achado.get_text() if achado is not None else None
+                           for chave, achado in encontrados.items()})
+
+    return [{chave: _texto(valor or '') for chave, valor in c.items()} for c in campos if c['titulo']]
+
+
+def _xpath_classe(classe):
+    return f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {classe} ')]"
+
+
+class _FimTitulo(Exception):
+    pass
+
+
+class _LeitorTitulo(HTMLParser):
+    """Lê o documento só até o fim do <title> (ou o início do <body>)"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.partes = None
+        self.titulo = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title' and self.partes is None:
+            self.partes = []
+        elif tag == 'body':
+            raise _FimTitulo()
+
+    def handle_data(self, dados):
+        if self.partes is not None:
+            self.partes.append(dados)
+
+    def handle_endtag(self, tag):
+        if tag == 'title' and self.partes is not None:
+            self.titulo = _texto("".join(self.partes))
+            raise _FimTitulo()
+
+
+def extrair_titulo(html, bloco=8192):
+    """Texto do <title> da página, ou None. Para de ler assim que o encontra"""
+    leitor = _LeitorTitulo()
+    try:
+        for inicio in range(0, len(html), bloco):
+            leitor.feed(html[inicio:inicio + bloco])
+        leitor.close()
+    except _FimTitulo:
+        pass
+    except Exception:
+        return None
+    return leitor.titulo or None
+
+
+def _aquecer(_):
+    # Carrega o backend no processo, para a primeira página não pagar a importação
+    extrair_perguntas('<div></div>')
+    return os.getpid()
+
+
+class AnalisadorHTML:
+    """Extrai dados de páginas, opcionalmente num pool de processos.
+
+    O recorte já deixa a análise curta: os 3 primeiros resultados de uma busca
+    do Stack Overflow são ~8 KiB, analisados em poucos ms, e o título é lido só
+    até o <head> acabar. Por isso, por padrão, tudo roda na própria thread.
+    Com `processos` > 0, trechos a partir de `tamanho_minimo` vão para um pool
+    criado só quando o primeiro trecho desse tamanho aparece. Os processos são
+    criados com spawn (fork depois que o Qt e as threads já existem não é
+    seguro), e cada um reimporta o módulo principal ao iniciar.
+    """
+
+    def __init__(self, processos=0, tamanho_minimo=16 * 1024):
+        self.processos = processos
+        self.tamanho_minimo = tamanho_minimo
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def perguntas(self, html, limite=3):
+        # O recorte é rápido e diminui o que precisa ser enviado ao outro processo
+        return self._executar(extrair_perguntas, recortar_perguntas(html, limite), limite)
+
+    def titulo(self, html):
+        return extrair_titulo(html)
+
+    def preparar(self):
+        """Cria os processos antes da primeira página (usado pelos benchmarks)"""
+        pool = self._obter_pool()
+        if pool is not None:
+            list(pool.map(_aquecer, range(self.processos)))
+
+    def fechar(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _obter_pool(self):
+        if self.processos <= 0:
+            return None
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processos,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _executar(self, funcao, html, *args):
+        if len(html) < self.tamanho_minimo:
+            return funcao(html, *args)
+        pool = self._obter_pool()
+        if pool is None:
+            return funcao(html, *args)
+        try:
+            return pool.submit(funcao, html, *args).result()
+        except BrokenProcessPool as e:
+            # Um processo morreu: o próximo uso recria o pool; esta página é analisada aqui
+            print(f"Pool de análise HTML reiniciado: {e}")
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            return funcao(html, *args)
+
+
+_analisador = None
+_lock_analisador = threading.Lock()
+
+
+def obter_analisador():
+    """Retorna o analisador compartilhado (ED_HTML_PROCESSOS processos; padrão 0, na própria thread)"""
+    global _analisador
+    with _lock_analisador:
+        if _analisador is None:
+            _analisador = AnalisadorHTML(processos=int(os.getenv("ED_HTML_PROCESSOS", "0")))
+        return _analisador
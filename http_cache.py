@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import requests
+
+
+class CacheHTTP:
+    """Cache em disco de respostas HTTP, endereçado por conteúdo.
+
+    Os corpos ficam em objetos/<sha256 do conteúdo> e os metadados de cada URL
+    (ETag, Last-Modified, validade) em indice/<sha256 da URL>.json. Entradas
+    vencidas são revalidadas com requisições condicionais e o total em disco
+    respeita um orçamento de bytes, removendo as URLs menos usadas.
+    """
+
+    def __init__(self, cache_dir='cache', orcamento_bytes=50 * 1024 * 1024, validade_padrao=600,
+                 sessao=None, timeout=None):
+        self.dir_objetos = os.path.join(cache_dir, 'http', 'objetos')
+        self.dir_indice = os.path.join(cache_dir, 'http', 'indice')
+        os.makedirs(self.dir_objetos, exist_ok=True)
+        os.makedirs(self.dir_indice, exist_ok=True)
+        self.orcamento_bytes = orcamento_bytes
+        self.validade_padrao = validade_padrao
+        self.sessao = sessao or requests
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._indice = {}
+        self.carregar_indice()
+
+    def carregar_indice(self):
+        """Lê os metadados do disco para memória"""
+        for nome in os.listdir(self.dir_indice):
+            if not nome.endswith('.json'):
+                continue
+            caminho = os.path.join(self.dir_indice, nome)
+            try:
+                with open(caminho, encoding='utf-8') as f:
+                    meta = json.load(f)
+                meta['ultimo_acesso'] = os.path.getmtime(caminho)
+                self._indice[nome[:-5]] = meta
+            except (OSError, ValueError):
+                # Arquivo ilegível: descarta a entrada
+                self._remover_arquivo(caminho)
+
+    def obter(self, url, params=None, headers=None, timeout=None, sessao=None):
+        """Retorna o texto da URL, usando o cache sempre que possível"""
+        sessao = sessao or self.sessao
+        timeout = timeout or self.timeout
+        url_completa = requests.Request('GET', url, params=params).prepare().url
+        chave = hashlib.sha256(url_completa.encode('utf-8')).hexdigest()
+        headers = dict(headers or {})
+
+        with self._lock:
+            meta = self._indice.get(chave)
+        corpo = self._ler_objeto(meta) if meta else None
+
+        if corpo is not None:
+            if time.time() - meta['salvo_em'] < meta['validade']:
+                self._tocar(chave)
+                return self._decodificar(corpo, meta)
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        resposta = sessao.get(url_completa, headers=headers, timeout=timeout)
+
+        if resposta.status_code == 304 and corpo is not None:
+            meta = dict(meta, salvo_em=time.time(), validade=self._validade(resposta, meta['validade']))
+            self._gravar_meta(chave, meta)
+            return self._decodificar(corpo, meta)
+
+        if resposta.status_code == 200 and 'no-store' not in resposta.headers.get('Cache-Control', ''):
+            self._guardar(chave, url_completa, resposta)
+        return resposta.text
+
+    def tamanho_total(self):
+        with self._lock:
+            return self._bytes_referenciados()
+
+    def limpar(self):
+        with self._lock:
+            chaves = list(self._indice)
+        for chave in chaves:
+            self._remover_entrada(chave)
+
+    def _guardar(self, chave, url, resposta):
+        corpo = resposta.content
+        hash_corpo = hashlib.sha256(corpo).hexdigest()
+        caminho_objeto = os.path.join(self.dir_objetos, hash_corpo)
+        if not os.path.exists(caminho_objeto):
+            self._escrever_atomico(caminho_objeto, corpo)
+        meta = {
+            'url': url,
+            'hash': hash_corpo,
+            'tamanho': len(corpo),
+            'encoding': resposta.encoding,
+            'etag': resposta.headers.get('ETag'),
+            'last_modified': resposta.headers.get('Last-Modified'),
+            'salvo_em': time.time(),
+            'validade': self._validade(resposta, self.validade_padrao)
+        }
+        self._gravar_meta(chave, meta)
+        self._aplicar_orcamento()
+
+    def _gravar_meta(self, chave, meta):
+        meta = dict(meta, ultimo_acesso=time.time())
+        dados = json.dumps({k: v for k, v in meta.items() if k != 'ultimo_acesso'})
+        self._escrever_atomico(os.path.join(self.dir_indice, chave + '.json'), dados.encode('utf-8'))
+        with self._lock:
+            self._indice[chave] = meta
+
+    def _aplicar_orcamento(self):
+        """Remove as URLs usadas há mais tempo até caber no orçamento"""
+        with self._lock:
+            if self._bytes_referenciados() <= self.orcamento_bytes:
+                return
+            por_acesso = sorted(self._indice, key=lambda c: self._indice[c]['ultimo_acesso'])
+        for chave in por_acesso:
+            self._remover_entrada(chave)
+            with self._lock:
+                if self._bytes_referenciados() <= self.orcamento_bytes:
+                    return
+
+    def _remover_entrada(self, chave):
+        with self._lock:
+            meta = self._indice.pop(chave, None)
+            if meta is None:
+                return
+            # O mesmo conteúdo pode estar referenciado por outra URL
+            em_uso = any(m['hash'] == meta['hash'] for m in self._indice.values())
+        self._remover_arquivo(os.path.join(self.dir_indice, chave + '.json'))
+        if not em_uso:
+            self._remover_arquivo(os.path.join(self.dir_objetos, meta['hash']))
+
+    def _bytes_referenciados(self):
+        return sum({m['hash']: m['tamanho'] for m in self._indice.values()}.values())
+
+    def _ler_objeto(self, meta):
+        try:
+            with open(os.path.join(self.dir_objetos, meta['hash']), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _tocar(self, chave):
+        agora = time.time()
+        with self._lock:
+            if chave in self._indice:
+                self._indice[chave]['ultimo_acesso'] = agora
+        try:
+            os.utime(os.path.join(self.dir_indice, chave + '.json'), (agora, agora))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _validade(resposta, padrao):
+        """Lê o max-age do Cache-Control, se houver"""
+        cache_control = resposta.headers.get('Cache-Control', '')
+        if 'no-cache' in cache_control:
+            return 0
+        encontrado = re.search(r'max-age=(\d+)', cache_control)
+        return int(encontrado.group(1)) if encontrado else padrao
+
+    @staticmethod
+    def _decodificar(corpo, meta):
+        return corpo.decode(meta.get('encoding') or 'utf-8', errors='replace')
+
+    @staticmethod
+    def _escrever_atomico(caminho, dados):
+        """Escreve em um arquivo temporário e renomeia, para ninguém ler pela metade"""
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+        try:
+            with os.fdopen(descritor, 'wb') as f:
+                f.write(dados)
+            os.replace(temporario, caminho)
+        except OSError:
+            CacheHTTP._remover_arquivo(temporario)
+            raise
+
+    @staticmethod
+    def _remover_arquivo(caminho):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+
+# (conexão, leitura) em segundos
+TIMEOUT_PADRAO = (3.05, 10)
+
+
+def criar_sessao(max_hosts=20, conexoes_por_host=10):
+    """Cria uma sessão HTTP com pool de conexões keep-alive por host"""
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=conexoes_por_host)
+    sessao.mount('http://', adaptador)
+    sessao.mount('https://', adaptador)
+    sessao.headers['User-Agent'] = 'Mozilla/5.0 (ED Assistente Pessoal)'
+    return sessao
+
+
+def buscar_em_paralelo(funcao, itens, prazo, max_paralelo=8):
+    """Executa funcao(item) em paralelo e gera (item, resultado) na ordem em que terminam.
+
+    Para de esperar quando o prazo (em segundos) acaba; itens que falharem ou
+    não terminarem a tempo são ignorados.
+    """
+    itens = list(itens)
+    if not itens:
+        return
+    executor = ThreadPoolExecutor(max_workers=min(max_paralelo, len(itens)))
+    futuros = {executor.submit(funcao, item): item for item in itens}
+    try:
+        for futuro in as_completed(futuros, timeout=max(prazo, 0)):
+            try:
+                yield futuros[futuro], futuro.result()
+            except Exception:
+                continue
+    except TimeoutError:
+        pass
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,146 @@
+import unicodedata
+from collections import deque, namedtuple
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def _dobrar_caractere(c):
+    """Remove o acento de um caractere mantendo um caractere por posição"""
+    return unicodedata.normalize('NFKD', c)[0] if c else c
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos, com o mesmo comprimento do texto original"""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    return "".join(c if c < '\x80' else _dobrar_caractere(c) for c in texto)
+
+
+class AutomatoAhoCorasick:
+    """Encontra todas as ocorrências de um conjunto de frases numa única passada"""
+
+    def __init__(self):
+        self._transicoes = [{}]
+        self._falhas = [0]
+        self._saidas = [[]]
+        self._construido = False
+
+    def adicionar(self, frase, valor):
+        estado = 0
+        for c in frase:
+            proximo = self._transicoes[estado].get(c)
+            if proximo is None:
+                proximo = len(self._transicoes)
+                self._transicoes[estado][c] = proximo
+                self._transicoes.append({})
+                self._falhas.append(0)
+                self._saidas.append([])
+            estado = proximo
+        self._saidas[estado].append((len(frase), valor))
+        self._construido = False
+
+    def construir(self):
+        """Calcula os links de falha (BFS) e junta as saídas dos sufixos"""
+        fila = deque(self._transicoes[0].values())
+        for estado in fila:
+            self._falhas[estado] = 0
+        while fila:
+            estado = fila.popleft()
+            for c, proximo in self._transicoes[estado].items():
+                fila.append(proximo)
+                falha = self._falhas[estado]
+                while falha and c not in self._transicoes[falha]:
+                    falha = self._falhas[falha]
+                destino = self._transicoes[falha].get(c, 0)
+                self._falhas[proximo] = destino if destino != proximo else 0
+                self._saidas[proximo] = self._saidas[proximo] + self._saidas[self._falhas[proximo]]
+        self._construido = True
+
+    def buscar(self, texto):
+        """Gera (inicio, fim, valor) para cada ocorrência encontrada"""
+        if not self._construido:
+            self.construir()
+        transicoes, falhas, saidas = self._transicoes, self._falhas, self._saidas
+        estado = 0
+        for posicao, c in enumerate(texto):
+            while estado and c not in transicoes[estado]:
+                estado = falhas[estado]
+            estado = transicoes[estado].get(c, 0)
+            for tamanho, valor in saidas[estado]:
+                yield posicao + 1 - tamanho, posicao + 1, valor
+
+
+Intencao = namedtuple('Intencao', 'nome prioridade resposta argumento')
+Correspondencia = namedtuple('Correspondencia', 'intencao gatilho inicio fim argumento termos chamada')
+
+
+class MotorIntencoes:
+    """Reconhece intenções, palavras de chamada e verbos de comando numa só passada.
+
+    As frases só casam em limites de palavra. A intenção vencedora é a de
+    menor prioridade; empates vão para a que aparece antes e, depois, para a
+    frase mais longa. Intenções registradas com prioridade None não vencem,
+    mas aparecem em `termos` (ex.: "aumentar" junto de "volume").
+    """
+
+    _CHAMADA = 'chamada'
+
+    def __init__(self):
+        self._automato = AutomatoAhoCorasick()
+        self._intencoes = {}
+
+    def registrar(self, nome, gatilhos, prioridade=0, resposta=None, argumento=False):
+        self._intencoes[nome] = Intencao(nome, prioridade, resposta, argumento)
+        for gatilho in gatilhos:
+            self._automato.adicionar(normalizar(gatilho), nome)
+        return self
+
+    def registrar_chamadas(self, palavras):
+        """Palavras de chamada (ex.: "ei ed") aceitas no começo da mensagem"""
+        return self.registrar(self._CHAMADA, palavras, prioridade=None)
+
+    def construir(self):
+        self._automato.construir()
+        return self
+
+    def analisar(self, texto):
+        """Retorna a Correspondencia vencedora para o texto, ou None"""
+        normalizado = normalizar(texto)
+        inicio_texto = len(normalizado) - len(normalizado.lstrip())
+        ocorrencias = [
+            (inicio, fim, nome) for inicio, fim, nome in self._automato.buscar(normalizado)
+            if self._em_limite(normalizado, inicio, fim)
+        ]
+
+        # Palavra de chamada no começo: o resto da mensagem é o comando
+        fim_chamada = max(
+            (fim for inicio, fim, nome in ocorrencias if nome == self._CHAMADA and inicio == inicio_texto),
+            default=None
+        )
+        if fim_chamada is not None:
+            ocorrencias = [o for o in ocorrencias if o[0] >= fim_chamada]
+
+        termos = frozenset(nome for _, _, nome in ocorrencias)
+        candidatas = [o for o in ocorrencias if self._intencoes[o[2]].prioridade is not None]
+        if not candidatas:
+            if fim_chamada is None:
+                return None
+            resto = texto[fim_chamada:].strip(" ,.!?")
+            return Correspondencia(self._intencoes.get(self._CHAMADA), None, inicio_texto, fim_chamada,
+                                   resto, termos, True)
+
+        inicio, fim, nome = min(
+            candidatas,
+            key=lambda o: (self._intencoes[o[2]].prioridade, o[0], o[0] - o[1])
+        )
+        intencao = self._intencoes[nome]
+        argumento = texto[fim:].strip() if intencao.argumento else None
+        return Correspondencia(intencao, texto[inicio:fim], inicio, fim, argumento, termos,
+                               fim_chamada is not None)
+
+    @staticmethod
+    def _em_limite(texto, inicio, fim):
+        antes = texto[inicio - 1] if inicio > 0 else ' '
+        depois = texto[fim] if fim < len(texto) else ' '
+        return not antes.isalnum() and not depois.isalnum() and antes != '_' and depois != '_'
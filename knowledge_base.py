@@ -1,72 +1,64 @@
-import requests
-from bs4 import BeautifulSoup
-from googlesearch import search
-import wikipedia
 import json
 import os
+import time
+from http_cache import CacheHTTP
+from html_parsing import obter_analisador
+from http_client import TIMEOUT_PADRAO, buscar_em_paralelo, criar_sessao
+from wikipedia_service import obter_servico_wikipedia
 
 class BaseConhecimento:
     def __init__(self):
-        wikipedia.set_lang('pt')
+        self.wikipedia = obter_servico_wikipedia()
         self.cache_dir = 'cache'
         os.makedirs(self.cache_dir, exist_ok=True)
+        self.sessao = criar_sessao()
+        self.http = CacheHTTP(self.cache_dir, sessao=self.sessao, timeout=TIMEOUT_PADRAO)
+        self.html = obter_analisador()
     
-    def pesquisar_programacao(self, query):
+    def pesquisar_programacao(self, query, prazo=8.0):
         """Pesquisa específica sobre programação"""
+        return list(self.pesquisar_programacao_parcial(query, prazo))
+
+    def pesquisar_programacao_parcial(self, query, prazo=8.0):
+        """Gera os resultados da pesquisa de programação conforme ficam prontos"""
+        limite = time.monotonic() + prazo
+
         # Tenta primeiro no Stack Overflow em português
         try:
-            url = f"https://pt.stackoverflow.com/search?q={query}"
-            response = requests.get(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            resultados = []
-            
-            for pergunta in soup.select('.question-summary'):
-                titulo = pergunta.select_one('.question-hyperlink').text
-                resumo = pergunta.select_one('.excerpt').text
-                votos = pergunta.select_one('.vote-count-post').text
-                resultados.append({
-                    'titulo': titulo,
-                    'resumo': resumo,
-                    'votos': votos,
-                    'fonte': 'Stack Overflow PT'
-                })
-            
-            return resultados[:3]  # Retorna os 3 melhores resultados
-        except:
+            html = self.http.obter("https://pt.stackoverflow.com/search", params={'q': query})
+            # Só os 3 melhores resultados são extraídos, fora do processo da interface
+            resultados = [dict(pergunta, fonte='Stack Overflow PT') for pergunta in self.html.perguntas(html, limite=3)]
+            if resultados:
+                yield from resultados
+                return
+        except Exception:
             pass
         
         # Se não encontrar no SO-PT, pesquisa no Google
         try:
+            from googlesearch import search
             sites_tech = ['developer.mozilla.org', 'github.com', 'stackoverflow.com', 'medium.com']
-            resultados = []
-            
-            for url in search(f"{query} programming", num_results=5):
-                if any(site in url for site in sites_tech):
-                    response = requests.get(url)
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    titulo = soup.title.string if soup.title else url
-                    resultados.append({
-                        'titulo': titulo,
-                        'url': url,
-                        'fonte': 'Google'
-                    })
-            
-            return resultados
-        except:
-            return None
+            urls = [url for url in search(f"{query} programming", num_results=5)
+                    if any(site in url for site in sites_tech)]
+
+            # Baixa todas as páginas ao mesmo tempo, dentro do prazo total
+            for url, titulo in buscar_em_paralelo(self._obter_titulo, urls, limite - time.monotonic()):
+                yield {
+                    'titulo': titulo,
+                    'url': url,
+                    'fonte': 'Google'
+                }
+        except Exception:
+            return
+
+    def _obter_titulo(self, url):
+        return self.html.titulo(self.http.obter(url)) or url
     
     def pesquisar_wikipedia(self, query):
         """Pesquisa na Wikipedia em português"""
         try:
-            resultados = wikipedia.search(query)
-            if resultados:
-                page = wikipedia.page(resultados[0])
-                return {
-                    'titulo': page.title,
-                    'resumo': wikipedia.summary(resultados[0], sentences=3),
-                    'url': page.url
-                }
-        except:
+            return self.wikipedia.consultar(query, lang='pt')
+        except Exception:
             return None
     
     def pesquisar_documentacao(self, tecnologia):
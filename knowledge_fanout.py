@@ -0,0 +1,195 @@
+import re
+import threading
+import time
+from collections import Counter
+from intents import normalizar
+from tracing import rastreador
+
+# Tecnologias reconhecidas na pergunta -> chave em BaseConhecimento.pesquisar_documentacao
+TECNOLOGIAS = {
+    'python': 'python', 'javascript': 'javascript', 'js': 'javascript', 'typescript': 'javascript',
+    'node': 'javascript', 'nodejs': 'javascript', 'react': 'react', 'django': 'django',
+    'flask': 'flask', 'html': 'html', 'css': 'css', 'java': None, 'sql': None, 'git': None,
+    'docker': None, 'rust': None, 'kotlin': None, 'php': None, 'c#': None, 'c++': None,
+}
+
+# Termos que só aparecem em conversa de programação. Palavras comuns do dia a dia
+# (lista, erro, programa, código, função, classe...) ficam de fora: "lista de
+# compras" ou "erro no carro" não devem disparar uma busca no Stack Overflow
+PALAVRAS_PROGRAMACAO = frozenset("""
+exception excecao traceback bug debug depurar debugar compilar compilador framework api array arrays
+regex sintaxe import pip npm algoritmo recursao ponteiro script variavel variaveis stacktrace
+""".split())
+# Sem uma tecnologia citada, é preciso pelo menos este número de termos distintos
+MIN_PALAVRAS_PROGRAMACAO = 2
+
+# Perguntas de enciclopédia: o trecho capturado em `termo` é o que vai para a Wikipedia
+_ENCICLOPEDICA = re.compile(
+    r"^(?:ed[,:]?\s+)?(?:me\s+)?(?:"
+    r"o\s+que\s+(?:e|sao|foi|foram|significa)|quem\s+(?:e|foi|era|sao|foram|inventou|criou|descobriu)"
+    r"|quando\s+(?:foi|nasceu|morreu|aconteceu|comecou|terminou)|onde\s+(?:fica|e|nasceu)"
+    r"|qual\s+(?:e\s+)?(?:a\s+)?(?:capital|populacao|origem|historia)\s+d[eoa]s?"
+    r"|(?:fale|conte|explique)(?:-me)?\s+sobre|historia\s+d[eoa]s?|significado\s+d[eoa]s?|defina"
+    r")\s+(?:(?:o|a|os|as|um|uma)\s+)?(?P<termo>.+?)[\s?!.]*$"
+)
+
+# Fontes que ainda têm tantas threads penduradas de consultas anteriores não são disparadas
+MAX_ATRASADAS = 2
+_atrasadas = Counter()
+_lock_atrasadas = threading.Lock()
+
+
+def classificar_pergunta(texto):
+    """Tipos da pergunta ('programacao', 'enciclopedica'), tecnologias citadas e termo para a Wikipedia"""
+    normalizado = normalizar(texto).strip()
+    palavras = re.findall(r"[\w#+]+", normalizado)
+    tecnologias = list(dict.fromkeys(p for p in palavras if p in TECNOLOGIAS))
+    tipos = set()
+    termos = PALAVRAS_PROGRAMACAO.intersection(palavras)
+    if tecnologias or len(termos) >= MIN_PALAVRAS_PROGRAMACAO:
+        tipos.add('programacao')
+    termo = None
+    casamento = _ENCICLOPEDICA.match(normalizado)
+    if casamento:
+        tipos.add('enciclopedica')
+        # normalizar preserva as posições: o termo sai do texto original, com acentos
+        termo = texto.strip()[casamento.start('termo'):casamento.end('termo')]
+    return tipos, tecnologias, termo
+
+
+class ConsultaConhecimento:
+    """Fontes de conhecimento consultadas em threads daemon, sob um prazo fixo.
+
+    As fontes começam a rodar quando a consulta é criada, em paralelo entre
+    si; quem chama só a cria depois de saber que vai chamar a API (o cache de
+    respostas não acertou). `coletar()` espera no máximo até o prazo
+    (contado da criação) e devolve o que já chegou, inclusive os resultados
+    parciais de uma fonte que ainda não terminou. O que passar do prazo é
+    cancelado: a thread é abandonada e descarta o que ainda produzir.
+    """
+
+    def __init__(self, fontes, prazo):
+        self.prazo = prazo
+        self.limite = time.monotonic() + prazo
+        self._resultados = {nome: [] for nome, _ in fontes}
+        self._pendentes = len(fontes)
+        self._cancelada = False
+        self._condicao = threading.Condition()
+        for nome, funcao in fontes:
+            threading.Thread(target=self._executar, args=(nome, funcao),
+                             name=f"conhecimento-{nome}", daemon=True).start()
+
+    def restante(self):
+        return max(0.0, self.limite - time.monotonic())
+
+    @property
+    def cancelada(self):
+        return self._cancelada
+
+    def coletar(self):
+        """{fonte: [resultados]} do que chegou dentro do prazo; as demais fontes são canceladas"""
+        with self._condicao:
+            self._condicao.wait_for(lambda: not self._pendentes, self.restante())
+            self._cancelada = True
+            return {nome: itens for nome, itens in self._resultados.items() if itens}
+
+    def cancelar(self):
+        with self._condicao:
+            self._cancelada = True
+
+    def _executar(self, nome, funcao):
+        with _lock_atrasadas:
+            _atrasadas[nome] += 1
+        inicio = time.perf_counter()
+        try:
+            for item in funcao(self):
+                with self._condicao:
+                    if self._cancelada:
+                        return
+                    if item:
+                        self._resultados[nome].append(item)
+        except Exception as e:
+            print(f"Erro ao consultar {nome}: {e}")
+        finally:
+            rastreador.registrar(f"conhecimento/{nome}", inicio, time.perf_counter())
+            with _lock_atrasadas:
+                _atrasadas[nome] -= 1
+            with self._condicao:
+                self._pendentes -= 1
+                self._condicao.notify_all()
+
+
+def _fonte_programacao(obter_base, texto):
+    def consultar(consulta):
+        base = obter_base(consulta.restante())
+        if base is None or consulta.cancelada:
+            return
+        # Gera cada resultado assim que fica pronto: o que chegar antes do prazo é aproveitado
+        yield from base.pesquisar_programacao_parcial(texto[:120], prazo=consulta.restante())
+    return consultar
+
+
+def _fonte_wikipedia(obter_base, termo):
+    def consultar(consulta):
+        base = obter_base(consulta.restante())
+        if base is not None and not consulta.cancelada:
+            yield base.pesquisar_wikipedia(termo)
+    return consultar
+
+
+def _fonte_documentacao(obter_base, tecnologias):
+    def consultar(consulta):
+        base = obter_base(consulta.restante())
+        if base is None:
+            return
+        for tecnologia in tecnologias:
+            url = base.pesquisar_documentacao(tecnologia)
+            if url:
+                yield {'tecnologia': tecnologia, 'url': url}
+    return consultar
+
+
+def iniciar_consulta(obter_base, texto, prazo=1.5):
+    """Dispara as fontes adequadas à pergunta; None se ela não pede consulta.
+
+    `obter_base(timeout)` devolve a BaseConhecimento (ou None), esperando no
+    máximo `timeout` segundos pela inicialização em segundo plano.
+    """
+    if prazo <= 0:
+        return None
+    tipos, tecnologias, termo = classificar_pergunta(texto)
+    fontes = []
+    if 'programacao' in tipos:
+        fontes.append(('programacao', _fonte_programacao(obter_base, texto)))
+        documentadas = list(dict.fromkeys(TECNOLOGIAS[t] for t in tecnologias if TECNOLOGIAS[t]))
+        if documentadas:
+            fontes.append(('documentacao', _fonte_documentacao(obter_base, documentadas)))
+    if 'enciclopedica' in tipos and termo:
+        fontes.append(('wikipedia', _fonte_wikipedia(obter_base, termo)))
+    with _lock_atrasadas:
+        # Uma fonte travada não acumula threads: fica de fora até as anteriores terminarem
+        fontes = [(nome, funcao) for nome, funcao in fontes if _atrasadas[nome] < MAX_ATRASADAS]
+    if not fontes:
+        return None
+    return ConsultaConhecimento(fontes, prazo)
+
+
+def formatar_contexto(resultados, max_resumo=300):
+    """Texto a anexar ao prompt de sistema com os resultados da consulta ('' se não houver)"""
+    linhas = []
+    for pagina in resultados.get('wikipedia', ()):
+        resumo = " ".join(pagina.get('resumo', '').split())[:max_resumo]
+        linhas.append(f"- Wikipedia, {pagina['titulo']}: {resumo} ({pagina['url']})")
+    for res in resultados.get('programacao', ()):
+        linha = f"- {res['fonte']}: {' '.join(str(res['titulo']).split())}"
+        if res.get('resumo'):
+            linha += f" — {' '.join(res['resumo'].split())[:max_resumo]}"
+        if res.get('url'):
+            linha += f" ({res['url']})"
+        linhas.append(linha)
+    for doc in resultados.get('documentacao', ()):
+        linhas.append(f"- Documentação oficial de {doc['tecnologia']}: {doc['url']}")
+    if not linhas:
+        return ""
+    return ("\n\nInformações encontradas agora nas fontes (use se forem úteis e cite os links):\n"
+            + "\n".join(linhas))
@@ -0,0 +1,278 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+# Códigos HTTP que valem outra tentativa: limite de taxa, timeout e falhas do servidor
+CODIGOS_TEMPORARIOS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMIndisponivel(Exception):
+    """A requisição ao modelo falhou depois de todas as tentativas (ou não houve vaga)"""
+
+
+class PoliticaRetentativa:
+    """Espera exponencial com jitter completo: uniforme entre 0 e min(maximo, base * 2^n).
+
+    O jitter espalha as retentativas de várias requisições que falharam juntas
+    (ex.: um 429), em vez de mandá-las de volta todas ao mesmo tempo. Um
+    Retry-After do servidor é respeitado, limitado a `maximo`.
+    """
+
+    def __init__(self, tentativas=3, base=0.5, maximo=8.0, aleatorio=None):
+        self.tentativas = tentativas
+        self.base = base
+        self.maximo = maximo
+        self._aleatorio = aleatorio or random.Random()
+
+    def espera(self, tentativa, retry_after=None):
+        if retry_after is not None:
+            return min(max(0.0, retry_after), self.maximo)
+        return self._aleatorio.uniform(0, min(self.maximo, self.base * 2 ** tentativa))
+
+
+class BackendLLM:
+    """Interface dos backends de modelo de linguagem.
+
+    Cuida do que é comum a todos: limita as requisições em andamento com um
+    semáforo (quem passa do limite espera até `espera_vaga` segundos) e repete
+    as falhas temporárias conforme a política. Subclasses implementam
+    `_requisitar(messages, stream)` e `_temporaria(erro)`.
+
+    Com streaming, só a abertura da resposta é repetida: depois do primeiro
+    trecho, repetir duplicaria o texto já entregue.
+    """
+
+    def __init__(self, max_em_voo=4, espera_vaga=30.0, politica=None):
+        self.max_em_voo = max_em_voo
+        self.espera_vaga = espera_vaga
+        self.politica = politica or PoliticaRetentativa()
+        self._vagas = VagasFifo(max_em_voo)
+        self._lock = threading.Lock()
+        self._estatisticas = {'requisicoes': 0, 'retentativas': 0, 'falhas': 0, 'em_voo': 0}
+
+    def completar(self, messages):
+        """Texto completo da resposta"""
+        with self._vaga():
+            return self._com_retentativas(lambda: self._requisitar(messages, stream=False))
+
+    def transmitir(self, messages):
+        """Gerador com os trechos da resposta conforme chegam"""
+        with self._vaga():
+            trechos = self._com_retentativas(lambda: self._requisitar(messages, stream=True))
+            try:
+                yield from trechos
+            finally:
+                fechar = getattr(trechos, "close", None)
+                if fechar is not None:
+                    fechar()
+
+    def preparar(self):
+        """Deixa o cliente pronto antes da primeira requisição (opcional)"""
+
+    def fechar(self):
+        """Libera conexões e recursos do cliente"""
+
+    def estatisticas(self):
+        with self._lock:
+            return dict(self._estatisticas)
+
+    def _requisitar(self, messages, stream):
+        raise NotImplementedError
+
+    def _temporaria(self, erro):
+        """(vale repetir?, segundos do Retry-After ou None)"""
+        return False, None
+
+    def _vaga(self):
+        return _Vaga(self)
+
+    def _contar(self, chave, quantidade=1):
+        with self._lock:
+            self._estatisticas[chave] += quantidade
+
+    def _com_retentativas(self, funcao):
+        tentativa = 0
+        while True:
+            self._contar('requisicoes')
+            try:
+                return funcao()
+            except Exception as erro:
+                repetir, retry_after = self._temporaria(erro)
+                if not repetir or tentativa + 1 >= self.politica.tentativas:
+                    self._contar('falhas')
+                    raise LLMIndisponivel(f"Falha ao consultar o modelo: {erro}") from erro
+                self._contar('retentativas')
+                time.sleep(self.politica.espera(tentativa, retry_after))
+                tentativa += 1
+
+
+class VagasFifo:
+    """Semáforo justo: as vagas são entregues na ordem de chegada.
+
+    No threading.Semaphore quem acabou de liberar pode pegar a vaga de volta
+    antes da thread acordada, e sob carga algumas requisições esperam para
+    sempre. Aqui quem libera passa a vaga direto para o primeiro da fila.
+    """
+
+    def __init__(self, quantidade):
+        self._livres = quantidade
+        self._esperando = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        with self._lock:
+            if self._livres and not self._esperando:
+                self._livres -= 1
+                return True
+            evento = threading.Event()
+            self._esperando.append(evento)
+        if evento.wait(timeout):
+            return True
+        with self._lock:
+            if evento.is_set():
+                return True  # Recebeu a vaga enquanto desistia
+            self._esperando.remove(evento)
+            return False
+
+    def release(self):
+        with self._lock:
+            if self._esperando:
+                self._esperando.popleft().set()
+            else:
+                self._livres += 1
+
+
+class _Vaga:
+    __slots__ = ('backend',)
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __enter__(self):
+        if not self.backend._vagas.acquire(timeout=self.backend.espera_vaga):
+            raise LLMIndisponivel(f"Mais de {self.backend.max_em_voo} requisições em andamento")
+        self.backend._contar('em_voo')
+
+    def __exit__(self, *exc):
+        self.backend._contar('em_voo', -1)
+        self.backend._vagas.release()
+        return False
+
+
+class BackendOpenAI(BackendLLM):
+    """API de chat da OpenAI (SDK >= 1.17) ou qualquer servidor compatível (`base_url`).
+
+    Um único cliente vive enquanto o backend existir, com um pool de conexões
+    keep-alive e timeouts explícitos de conexão e leitura. As retentativas do
+    SDK ficam desligadas: quem repete é a política com jitter do BackendLLM.
+    """
+
+    def __init__(self, api_key=None, base_url=None, modelo="gpt-3.5-turbo", temperatura=0.7, max_tokens=500,
+                 timeout_conexao=5.0, timeout_leitura=30.0, max_conexoes=10, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.modelo = modelo
+        self.temperatura = temperatura
+        self.max_tokens = max_tokens
+        self.timeout_conexao = timeout_conexao
+        self.timeout_leitura = timeout_leitura
+        self.max_conexoes = max_conexoes
+        self._cliente = None
+        self._lock_cliente = threading.Lock()
+
+    def preparar(self):
+        self._obter_cliente()
+
+    def fechar(self):
+        with self._lock_cliente:
+            cliente, self._cliente = self._cliente, None
+        if cliente is not None:
+            cliente.close()
+
+    def _obter_cliente(self):
+        with self._lock_cliente:
+            if self._cliente is None:
+                # Importado aqui: o SDK leva quase um segundo para carregar
+                import openai
+                # Limits e Timeout vêm do mesmo httpx que o SDK usa, sem depender dele diretamente
+                limites = type(openai.DEFAULT_CONNECTION_LIMITS)(
+                    max_connections=self.max_conexoes,
+                    max_keepalive_connections=self.max_conexoes,
+                    keepalive_expiry=60
+                )
+                timeout = openai.Timeout(self.timeout_leitura, connect=self.timeout_conexao)
+                self._cliente = openai.OpenAI(
+                    api_key=self.api_key or os.getenv("OPENAI_API_KEY") or "sem-chave",
+                    base_url=self.base_url or None,
+                    timeout=timeout,
+                    max_retries=0,
+                    http_client=openai.DefaultHttpxClient(limits=limites, timeout=timeout)
+                )
+            return self._cliente
+
+    def _requisitar(self, messages, stream):
+        completions = self._obter_cliente().chat.completions
+        parametros = dict(model=self.modelo, messages=messages, temperature=self.temperatura,
+                          max_tokens=self.max_tokens)
+        if not stream:
+            resposta = completions.create(**parametros)
+            return resposta.choices[0].message.content or ""
+        # O Stream do SDK para de ler no [DONE] e a conexão é descartada em vez
+        # de voltar ao pool; lendo os eventos até o fim ela é reaproveitada.
+        # Erros HTTP (429, 5xx) aparecem aqui, antes do primeiro trecho
+        contexto = completions.with_streaming_response.create(stream=True, **parametros)
+        return self._trechos(contexto, contexto.__enter__())
+
+    @staticmethod
+    def _trechos(contexto, resposta):
+        try:
+            for linha in resposta.iter_lines():
+                if not linha.startswith("data:"):
+                    continue
+                dados = linha[5:].strip()
+                if dados == "[DONE]":
+                    continue
+                evento = json.loads(dados)
+                if evento.get("error"):
+                    raise LLMIndisponivel(f"Erro no meio da resposta: {evento['error']}")
+                for escolha in evento.get("choices") or ():
+                    conteudo = (escolha.get("delta") or {}).get("content")
+                    if conteudo:
+                        yield conteudo
+        finally:
+            contexto.__exit__(None, None, None)
+
+    def _temporaria(self, erro):
+        import openai
+        if isinstance(erro, openai.APIConnectionError):  # Inclui APITimeoutError
+            return True, None
+        if isinstance(erro, openai.APIStatusError) and erro.status_code in CODIGOS_TEMPORARIOS:
+            try:
+                retry_after = float(erro.response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+            return True, retry_after
+        return False, None
+
+
+BACKENDS = {'openai': BackendOpenAI}
+
+
+def criar_backend(nome=None, **opcoes):
+    """Cria o backend escolhido em ED_LLM_BACKEND (padrão: openai), configurado pelo ambiente.
+
+    OPENAI_BASE_URL aponta para um servidor compatível (ex.: stub_llm_server.py);
+    ED_LLM_MAX_EM_VOO, ED_LLM_TIMEOUT e ED_LLM_TENTATIVAS ajustam os limites.
+    """
+    nome = nome or os.getenv("ED_LLM_BACKEND", "openai")
+    if nome not in BACKENDS:
+        raise ValueError(f"Backend de LLM desconhecido: {nome}")
+    opcoes.setdefault("base_url", os.getenv("OPENAI_BASE_URL") or None)
+    opcoes.setdefault("max_em_voo", int(os.getenv("ED_LLM_MAX_EM_VOO", "4")))
+    opcoes.setdefault("timeout_leitura", float(os.getenv("ED_LLM_TIMEOUT", "30")))
+    opcoes.setdefault("politica", PoliticaRetentativa(tentativas=int(os.getenv("ED_LLM_TENTATIVAS", "3"))))
+    return BACKENDS[nome](**opcoes)
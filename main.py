@@ -1,120 +1,224 @@
+from startup_profiler import perfil_inicializacao
 import sys
-import openai
 from dotenv import load_dotenv
 import os
 import time
-from threading import Thread
+from datetime import datetime, timedelta
+import threading
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                          QHBoxLayout, QTextEdit, QLineEdit, QPushButton, QLabel)
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QThread
-from PyQt6.QtGui import QFont, QColor, QPalette, QIcon
-from PyQt6.QtWebEngineWidgets import QWebEngineView
-import sqlite3
-import json
-import psutil
-import pyttsx3
-from typing import Optional
-import random
-from system_commands import SystemController
+                          QHBoxLayout, QLineEdit, QPushButton, QLabel)
+from PyQt6.QtCore import Qt, QTimer, QObject, QEvent, pyqtSignal
+# openai, pyttsx3 e a base de conhecimento são importados fora do caminho de
+# abertura da janela (no primeiro uso ou na inicialização em segundo plano)
+from system_commands import SystemController, CONFIRMACOES
+from system_metrics import obter_servico_metricas
 from user_memory import MemoriaUsuario
-from knowledge_base import BaseConhecimento
+from scheduler import AgendadorLembretes
+from speech import DivisorFrases, TrabalhadorVoz
+from tts_cache import CacheAudio, reproducao_disponivel
+from workers import ExecutorRequisicoes
+from response_cache import CacheRespostas
+from database import obter_gerenciador
+from intents import MotorIntencoes
+from conversation_history import HistoricoConversa, TOKENS_POR_MENSAGEM
+from conversation_log import RegistroConversas
+from retrieval import RecuperadorContexto
+from chat_view import VisaoChat
+from tracing import rastreador
+from llm_backend import criar_backend
+from knowledge_fanout import iniciar_consulta, formatar_contexto
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
-# Configuração da API OpenAI
-openai.api_key = os.getenv("OPENAI_API_KEY")
+perfil_inicializacao.marcar("módulos importados")
 
-class MonitorThread(QThread):
+# Respostas básicas sem usar API
+RESPOSTAS_BASICAS = {
+    "oi": "Olá! Como posso ajudar?",
+    "olá": "Oi! Como posso ajudar?",
+    "tudo bem": "Tudo ótimo! Como posso ajudar você hoje?",
+    "tudo bem?": "Tudo ótimo! Como posso ajudar você hoje?",
+    "como vai": "Estou muito bem, obrigado por perguntar! Como posso ajudar?",
+    "como você está": "Estou funcionando perfeitamente! Como posso ajudar?",
+    "bom dia": "Bom dia! Como posso ajudar?",
+    "boa tarde": "Boa tarde! Como posso ajudar?",
+    "boa noite": "Boa noite! Como posso ajudar?"
+}
+
+SAUDACAO = "Olá! Eu sou o ED, seu assistente pessoal. Como posso ajudar?"
+RESPOSTA_CHAMADA = "Estou aqui! Como posso ajudar?"
+
+class PonteMetricas(QObject):
+    """Repassa as notificações do serviço de métricas para a thread da interface"""
     update_signal = pyqtSignal(dict)
-    
-    def run(self):
-        while True:
-            try:
-                info = {
-                    'cpu': psutil.cpu_percent(),
-                    'ram': psutil.virtual_memory().percent,
-                    'disk': psutil.disk_usage('/').percent
-                }
-                self.update_signal.emit(info)
-                time.sleep(1)
-            except Exception as e:
-                print(f"Erro no monitoramento: {e}")
-                time.sleep(5)
 
-class VoiceThread(QThread):
-    def __init__(self, engine, text):
-        super().__init__()
-        self.engine = engine
-        self.text = text
-    
-    def run(self):
-        try:
-            self.engine.say(self.text)
-            self.engine.runAndWait()
-        except Exception as e:
-            print(f"Erro na síntese de voz: {e}")
+    def __init__(self, servico, parent=None):
+        super().__init__(parent)
+        self.servico = servico
+
+    def iniciar(self):
+        self.servico.assinar(self._notificar)
+
+    def encerrar(self):
+        self.servico.cancelar_assinatura(self._notificar)
+
+    def _notificar(self, info):
+        # Chamado na thread do serviço; o sinal chega à interface pela fila de eventos
+        self.update_signal.emit(info)
+
+class RotuloRastreio(QLabel):
+    """p50/p95 da mensagem inteira; a dica com cada etapa só é montada ao passar o mouse"""
+
+    def atualizar(self):
+        percentis = rastreador.percentis("mensagem")
+        if percentis is not None:
+            p50, p95 = percentis
+            self.setText(f"P50: {p50:.2f}s | P95: {p95:.2f}s")
+
+    def event(self, evento):
+        if evento.type() == QEvent.Type.ToolTip:
+            linhas = [
+                f"{etapa}: p50 {resumo['p50_ms']:.1f} ms | p95 {resumo['p95_ms']:.1f} ms ({resumo['contagem']}x)"
+                for etapa, resumo in rastreador.resumo().items()
+            ]
+            self.setToolTip("\n".join(linhas) or "Nenhuma mensagem medida ainda")
+        return super().event(evento)
+
 
 class AssistenteIA(QMainWindow):
+    lembrete_disparado = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
-        self.system = SystemController()
-        self.memoria = MemoriaUsuario()
-        self.conhecimento = BaseConhecimento()
+        perfil = perfil_inicializacao
+        with perfil.fase("memória do usuário"):
+            self.memoria = MemoriaUsuario()
+        # Os horários são lidos do banco na própria thread do agendador
+        self.agendador = AgendadorLembretes(self.memoria, self._ao_disparar_lembrete)
+        self.system = SystemController(agendador=self.agendador)
+        # Criada em segundo plano; use obter_conhecimento()
+        self.conhecimento = None
+        self._conhecimento_pronto = threading.Event()
+        # Tempo máximo que uma pergunta espera pelas fontes de conhecimento (0 desliga)
+        self.prazo_conhecimento = float(os.getenv("ED_CONHECIMENTO_PRAZO", "1.5"))
+        with perfil.fase("cache de respostas"):
+            self.cache_respostas = CacheRespostas(ativo=os.getenv("ED_CACHE_RESPOSTAS", "1") != "0")
+        self.janela_cache = 4
+        self._system_prompt = (None, None, 0)
         self.nome_chamada = ["ed", "ei ed", "ed?", "ed está aí", "ed está ai", "ia ai ed"]
-        self.setup_database()
-        self.setup_voz()
-        self.setup_interface()
-        self.historico_conversa = []
-        self.max_historico = 10
+        with perfil.fase("intenções"):
+            self.setup_intencoes()
+        with perfil.fase("banco de conversas"):
+            self.setup_database()
+        self.recuperador = RecuperadorContexto(self.registro)
+        with perfil.fase("voz"):
+            self.setup_voz()
+        with perfil.fase("interface"):
+            self.setup_interface()
+        self.historico = HistoricoConversa(orcamento_tokens=int(os.getenv("ED_ORCAMENTO_TOKENS", "1500")))
+        self.tokens_ultimo_prompt = None
+        self.modo_streaming = os.getenv("ED_STREAMING", "1") != "0"
+        self._tarefa_atual = None
+        self._resposta_atual = None
+        # Um só cliente do LLM, com conexões reaproveitadas; o SDK só é importado em segundo plano
+        self.llm = criar_backend()
+        self.executor = ExecutorRequisicoes(max_tarefas=2, parent=self)
+        self.executor.trecho.connect(self._ao_receber_trecho)
+        self.executor.concluida.connect(self._ao_concluir_tarefa)
+        self.executor.erro.connect(self._ao_falhar_tarefa)
+        self.lembrete_disparado.connect(self._mostrar_lembrete)
+        self.agendador.iniciar()
         self.show()
+        perfil.marcar("janela visível")
+        # Roda assim que o loop de eventos começar, com a janela já desenhada
+        QTimer.singleShot(0, self._iniciar_segundo_plano)
 
-    def setup_voz(self):
-        """Configura o sistema de voz"""
+    def _iniciar_segundo_plano(self):
+        perfil_inicializacao.marcar("janela interativa")
+        threading.Thread(target=self._inicializar_em_segundo_plano, name="inicializacao", daemon=True).start()
+
+    def _inicializar_em_segundo_plano(self):
+        """Carrega o que não é necessário para a janela abrir"""
+        perfil = perfil_inicializacao
         try:
-            self.engine = pyttsx3.init()
-            voices = self.engine.getProperty('voices')
-            
-            # Debug para ver as vozes disponíveis
-            print("Vozes disponíveis:")
-            for idx, voice in enumerate(voices):
-                print(f"{idx}: {voice.name} ({voice.id}) - Línguas: {voice.languages}")
-            
-            # Tenta encontrar uma voz em português
-            voz_pt = None
-            for voice in voices:
-                if "portuguese" in voice.name.lower() or "brazil" in voice.name.lower():
-                    voz_pt = voice
-                    break
-            
-            # Se não encontrar voz em português, usa a primeira disponível
-            if voz_pt:
-                print(f"Usando voz em português: {voz_pt.name}")
-                self.engine.setProperty('voice', voz_pt.id)
-            else:
-                print("Voz em português não encontrada, usando voz padrão")
-                self.engine.setProperty('voice', voices[0].id)
-            
-            self.engine.setProperty('rate', 180)  # Velocidade normal
-            self.engine.setProperty('volume', 1.0)  # Volume máximo
-            
-            # Testa a voz
-            print("Testando voz...")
-            self.engine.say("Teste de voz do assistente ED")
-            self.engine.runAndWait()
-            
+            with perfil.fase("base de conhecimento"):
+                from knowledge_base import BaseConhecimento
+                self.conhecimento = BaseConhecimento()
         except Exception as e:
-            print(f"Erro ao configurar voz: {e}")
-            self.engine = None
-
-    def falar(self, texto):
-        """Fala o texto usando síntese de voz"""
-        if self.engine:
+            print(f"Erro ao iniciar a base de conhecimento: {e}")
+        finally:
+            self._conhecimento_pronto.set()
+        with perfil.fase("índice de conversas"):
+            self.recuperador.carregar()
+        # Deixa o cliente da API criado antes da primeira mensagem
+        with perfil.fase("cliente openai"):
             try:
-                thread = VoiceThread(self.engine, texto)
-                thread.start()
+                self.llm.preparar()
             except Exception as e:
-                print(f"Erro ao falar: {e}")
+                print(f"Erro ao preparar o cliente do LLM: {e}")
+        print(perfil.relatorio())
+
+    def _ao_disparar_lembrete(self, lembrete, instante):
+        # Thread do agendador: a mensagem vai para a interface por sinal
+        texto = lembrete.titulo if not lembrete.descricao else f"{lembrete.titulo} - {lembrete.descricao}"
+        if datetime.now() - instante > timedelta(minutes=1):
+            # Venceu enquanto o assistente estava fechado
+            texto += f" (era para {instante.strftime('%d/%m %H:%M')})"
+        self.lembrete_disparado.emit(texto)
+
+    def _mostrar_lembrete(self, texto):
+        self.adicionar_mensagem("ED", f"Lembrete: {texto}")
+
+    def obter_conhecimento(self, timeout=None):
+        """Retorna a base de conhecimento, esperando a inicialização em segundo plano"""
+        self._conhecimento_pronto.wait(timeout)
+        return self.conhecimento
+
+    def setup_voz(self):
+        """Inicia a thread de voz; o engine é configurado dentro dela"""
+        # Tocar o áudio pré-renderizado depende do winsound; sem ele o cache não ajuda
+        cache_audio = None
+        if reproducao_disponivel() and os.getenv("ED_CACHE_VOZ", "1") != "0":
+            cache_audio = CacheAudio()
+        self.voz = TrabalhadorVoz(self._criar_engine_voz, cache_audio=cache_audio, parent=self)
+        self.voz.metricas_atualizadas.connect(self.atualizar_metricas_voz)
+        self.voz.start()
+        # Frases fixas são renderizadas em segundo plano quando a voz estiver ociosa
+        self.voz.aquecer([SAUDACAO, RESPOSTA_CHAMADA, *RESPOSTAS_BASICAS.values(), *CONFIRMACOES.values()])
+
+    def _criar_engine_voz(self):
+        """Cria e configura o engine de voz (executado na thread de voz)"""
+        import pyttsx3
+        with perfil_inicializacao.fase("engine de voz"):
+            engine = pyttsx3.init()
+            return self._configurar_engine_voz(engine)
+
+    def _configurar_engine_voz(self, engine):
+        voices = engine.getProperty('voices')
+
+        # Tenta encontrar uma voz em português
+        voz_pt = None
+        for voice in voices:
+            if "portuguese" in voice.name.lower() or "brazil" in voice.name.lower():
+                voz_pt = voice
+                break
+
+        # Se não encontrar voz em português, usa a primeira disponível
+        if voz_pt:
+            print(f"Usando voz em português: {voz_pt.name}")
+            engine.setProperty('voice', voz_pt.id)
+        else:
+            print("Voz em português não encontrada, usando voz padrão")
+            engine.setProperty('voice', voices[0].id)
+
+        engine.setProperty('rate', 180)  # Velocidade normal
+        engine.setProperty('volume', 1.0)  # Volume máximo
+        return engine
+
+    def falar(self, texto):
+        """Acrescenta o texto, frase a frase, à fala da resposta atual"""
+        self.voz.falar(texto, interromper=False)
 
     def setup_interface(self):
         # Configuração da janela principal
@@ -128,7 +232,7 @@ class AssistenteIA(QMainWindow):
                 background-color: #1a1a1a;
                 color: #ffffff;
             }
-            QTextEdit {
+            QListView {
                 background-color: #2d2d2d;
                 border: 2px solid #0288D1;
                 border-radius: 10px;
@@ -181,14 +285,19 @@ class AssistenteIA(QMainWindow):
         self.ram_label = QLabel("RAM: 0%")
         self.disk_label = QLabel("DISK: 0%")
         
-        for label in [self.cpu_label, self.ram_label, self.disk_label]:
+        self.latencia_label = QLabel("TTFT: -- | TOTAL: --")
+        self.voz_label = QLabel("VOZ: -- | FILA: 0")
+        self.rastreio_label = RotuloRastreio("P50: -- | P95: --")
+        
+        for label in [self.cpu_label, self.ram_label, self.disk_label, self.latencia_label, self.voz_label,
+                      self.rastreio_label]:
             header_layout.addWidget(label)
         
         layout.addWidget(header)
 
-        # Área de chat
-        self.chat_area = QTextEdit()
-        self.chat_area.setReadOnly(True)
+        # Área de chat: só as mensagens visíveis são desenhadas e o histórico
+        # gravado é carregado aos poucos ao rolar para cima
+        self.chat_area = VisaoChat(self.registro)
         layout.addWidget(self.chat_area)
 
         # Área de entrada
@@ -208,56 +317,292 @@ class AssistenteIA(QMainWindow):
         
         layout.addWidget(input_container)
 
-        # Inicia o monitoramento em uma thread separada
-        self.monitor_thread = MonitorThread()
-        self.monitor_thread.update_signal.connect(self.atualizar_monitor)
-        self.monitor_thread.start()
+        # Recebe as métricas do serviço compartilhado só quando elas mudam
+        self.monitor = PonteMetricas(obter_servico_metricas(), parent=self)
+        self.monitor.update_signal.connect(self.atualizar_monitor)
+        self.monitor.iniciar()
 
         # Mensagem inicial
-        self.adicionar_mensagem("ED", "Olá! Eu sou o ED, seu assistente pessoal. Como posso ajudar?")
+        self.adicionar_mensagem("ED", SAUDACAO)
 
     def atualizar_monitor(self, info):
         self.cpu_label.setText(f"CPU: {info['cpu']}%")
         self.ram_label.setText(f"RAM: {info['ram']}%")
         self.disk_label.setText(f"DISK: {info['disk']}%")
+        # Resumo dos últimos 5 minutos, direto do histórico do serviço
+        servico = self.monitor.servico
+        for label, metrica in ((self.cpu_label, 'cpu'), (self.ram_label, 'ram')):
+            resumo = servico.estatisticas(metrica, minutos=5)
+            if resumo:
+                p95 = servico.percentil(metrica, 95, minutos=5)
+                label.setToolTip(f"Últimos 5 min: mín {resumo['min']:.0f}% | média {resumo['media']:.0f}% "
+                                 f"| máx {resumo['max']:.0f}% | p95 {p95:.0f}%")
+
+    def atualizar_latencia(self, primeiro_trecho, total):
+        """Mostra o tempo até o primeiro trecho e a latência total da resposta"""
+        ttft = f"{primeiro_trecho:.2f}s" if primeiro_trecho is not None else "--"
+        tokens = self.tokens_ultimo_prompt if self.tokens_ultimo_prompt is not None else "--"
+        self.latencia_label.setText(f"TTFT: {ttft} | TOTAL: {total:.2f}s | TOKENS: {tokens}")
+        print(f"Latência da resposta - primeiro trecho: {ttft}, total: {total:.2f}s, tokens no prompt: {tokens}")
+
+    def exportar_rastreamento(self):
+        """Grava o resumo (JSON) e os trechos no formato do Chrome em rastreamento/"""
+        base = os.path.join("rastreamento", time.strftime("%Y%m%d-%H%M%S"))
+        try:
+            resumo = rastreador.exportar_json(base + ".json")
+            trace = rastreador.exportar_chrome(base + ".trace.json")
+        except OSError as e:
+            return f"Não consegui exportar o rastreamento: {e}"
+        return f"Rastreamento exportado para {resumo} e {trace} (abra este no chrome://tracing)."
+
+    def atualizar_metricas_voz(self, metricas):
+        """Mostra o tempo até o primeiro áudio, quantas frases esperam na fila de voz
+        e quantas foram descartadas por uma nova resposta"""
+        primeiro_audio = metricas["primeiro_audio"]
+        ttfa = f"{primeiro_audio:.2f}s" if primeiro_audio is not None else "--"
+        texto = f"VOZ: {ttfa} | FILA: {metricas['fila']}"
+        if metricas["descartadas"]:
+            texto += f" | DESCARTADAS: {metricas['descartadas']}"
+        self.voz_label.setText(texto)
+
+    def adicionar_mensagem(self, nome, mensagem, com_voz=True):
+        with rastreador.trecho("interface/adicionar_mensagem"):
+            item = self.chat_area.adicionar(nome, mensagem)
+        if nome == "ED" and com_voz:
+            with rastreador.trecho("voz/falar"):
+                self.falar(mensagem)
+        return item
+
+    def iniciar_mensagem_ed(self):
+        """Abre uma mensagem do ED que recebe o texto aos poucos"""
+        self._mensagem_ed = self.chat_area.adicionar("ED", "")
+        return self._mensagem_ed
 
-    def adicionar_mensagem(self, nome, mensagem):
-        cor = "#4FC3F7" if nome == "ED" else "#FFFFFF"
-        formato = f'<div style="margin: 10px 0;"><span style="color: {cor}; font-weight: bold;">{nome}:</span> {mensagem}</div>'
-        self.chat_area.append(formato)
-        if nome == "ED":
-            self.falar(mensagem)
+    def anexar_trecho_ed(self, trecho):
+        """Acrescenta um trecho à mensagem aberta por iniciar_mensagem_ed"""
+        self.chat_area.anexar_texto(self._mensagem_ed, trecho)
+
+    def finalizar_mensagem_ed(self, mensagem):
+        """Substitui o texto parcial pela mensagem completa formatada"""
+        with rastreador.trecho("interface/finalizar_mensagem"):
+            self.chat_area.atualizar(self._mensagem_ed, mensagem)
+        return self._mensagem_ed
 
     def enviar_mensagem(self):
         mensagem = self.input_field.text().strip()
         if mensagem:
             self.input_field.clear()
-            self.adicionar_mensagem("Você", mensagem)
-            
-            # Processa a mensagem e obtém resposta
-            try:
-                resposta = self.processar_comando(mensagem)
-                if not resposta:
-                    resposta = self.gerar_resposta(mensagem)
-                
-                self.adicionar_mensagem("ED", resposta)
-            except Exception as e:
-                self.adicionar_mensagem("ED", f"Desculpe, ocorreu um erro: {str(e)}")
+            # Uma nova mensagem cancela a resposta que ainda estiver em andamento
+            self.cancelar_resposta_atual()
+            # e interrompe a fala anterior; o tempo até o primeiro áudio conta daqui
+            self.voz.nova_resposta()
+            item_usuario = self.adicionar_mensagem("Você", mensagem)
+
+            # Processa a mensagem fora da thread da interface
+            self._resposta_atual = {
+                "mensagem": mensagem,
+                "item_usuario": item_usuario,
+                "inicio": time.perf_counter(),
+                "primeiro_trecho": None,
+                "partes": [],
+                "divisor": DivisorFrases()
+            }
+            self._tarefa_atual = self.executor.submeter(
+                lambda tarefa: self.processar_mensagem(mensagem, tarefa)
+            )
+
+    def processar_mensagem(self, mensagem, tarefa):
+        """Executado no pool: responde com um comando local ou com a IA.
+
+        Devolve (resposta, da_ia); só as trocas com a IA são gravadas e indexadas.
+        """
+        self.tokens_ultimo_prompt = None
+        with rastreador.trecho("processar_comando"):
+            resposta = self.processar_comando(mensagem)
+        if resposta:
+            return resposta, False
+        tarefa.verificar_cancelamento()
+        ao_receber_trecho = tarefa.emitir_trecho if self.modo_streaming else None
+        resposta = self.gerar_resposta(mensagem, ao_receber_trecho=ao_receber_trecho,
+                                       verificar_cancelamento=tarefa.verificar_cancelamento)
+        return resposta, True
+
+    def cancelar_resposta_atual(self):
+        """Cancela a tarefa em andamento e fecha o bloco parcial, se houver"""
+        if self._tarefa_atual is None:
+            return
+        self.executor.cancelar(self._tarefa_atual)
+        self._tarefa_atual = None
+        if self._resposta_atual["primeiro_trecho"] is not None:
+            parcial = "".join(self._resposta_atual["partes"])
+            self.finalizar_mensagem_ed(f"{parcial} <i>(interrompido)</i>")
+        self._resposta_atual = None
+
+    def _ao_receber_trecho(self, id_tarefa, trecho):
+        if id_tarefa != self._tarefa_atual:
+            return
+        estado = self._resposta_atual
+        if estado["primeiro_trecho"] is None:
+            estado["primeiro_trecho"] = time.perf_counter() - estado["inicio"]
+            self.iniciar_mensagem_ed()
+        estado["partes"].append(trecho)
+        self.anexar_trecho_ed(trecho)
+        for frase in estado["divisor"].adicionar(trecho):
+            self.voz.enfileirar(frase)
 
-    def gerar_resposta(self, mensagem):
+    def _ao_concluir_tarefa(self, id_tarefa, resultado):
+        if id_tarefa != self._tarefa_atual:
+            return
+        resposta, da_ia = resultado
+        estado = self._resposta_atual
+        self._tarefa_atual = None
+        self._resposta_atual = None
+
+        if estado["primeiro_trecho"] is None:
+            # Resposta chegou inteira (comando ou modo sem streaming)
+            item_ed = self.adicionar_mensagem("ED", resposta)
+        else:
+            for frase in estado["divisor"].finalizar():
+                self.voz.enfileirar(frase)
+            item_ed = self.finalizar_mensagem_ed(resposta)
+        fim = time.perf_counter()
+        self.atualizar_latencia(estado["primeiro_trecho"], fim - estado["inicio"])
+        rastreador.registrar("mensagem", estado["inicio"], fim)
+        if estado["primeiro_trecho"] is not None:
+            rastreador.registrar("mensagem/primeiro_trecho", estado["inicio"], estado["inicio"] + estado["primeiro_trecho"])
+        self.rastreio_label.atualizar()
+        if not da_ia:
+            # Respostas de comandos locais (busca nas conversas, exportar rastreamento...)
+            # não são gravadas: a próxima busca acharia a resposta da anterior
+            return
+        self.registro.registrar(estado["mensagem"], resposta)
+        self.chat_area.marcar_gravada(estado["item_usuario"], item_ed)
+        # Só trocas concluídas chegam aqui: as canceladas são descartadas pelo id da
+        # tarefa e as que falharam vão para _ao_falhar_tarefa
+        self.recuperador.adicionar_conversa(estado["mensagem"], resposta)
+
+    def _ao_falhar_tarefa(self, id_tarefa, erro):
+        """Mostra o erro sem gravá-lo: não entra em conversas, na busca nem no índice"""
+        if id_tarefa != self._tarefa_atual:
+            return
+        estado = self._resposta_atual
+        self._tarefa_atual = None
+        self._resposta_atual = None
+        texto = f"Desculpe, ocorreu um erro ao processar sua mensagem: {erro}"
+        if estado["primeiro_trecho"] is None:
+            self.adicionar_mensagem("ED", texto)
+        else:
+            parcial = "".join(estado["partes"])
+            self.finalizar_mensagem_ed(f"{parcial} <i>({texto})</i>")
+
+    def closeEvent(self, event):
+        self.executor.encerrar()
+        self.llm.fechar()
+        if self.conhecimento is not None:
+            self.conhecimento.html.fechar()
+        self.monitor.encerrar()
+        self.agendador.encerrar()
+        self.voz.encerrar()
+        self.cache_respostas.fechar()
+        self.registro.fechar()
+        self.db.fechar()
+        super().closeEvent(event)
+
+    def gerar_resposta(self, mensagem, ao_receber_trecho=None, verificar_cancelamento=None):
+        consulta = None
+        turno_usuario = None
         try:
             # Prepara o contexto para a OpenAI
-            perfil = self.memoria.obter_perfil_completo()
+            with rastreador.trecho("obter_perfil_completo"):
+                perfil = self.memoria.obter_perfil_completo()
             
-            # Adiciona a mensagem ao histórico
-            self.historico_conversa.append({"role": "user", "content": mensagem})
-            if len(self.historico_conversa) > self.max_historico * 2:
-                self.historico_conversa = self.historico_conversa[-self.max_historico * 2:]
+            # Adiciona a mensagem ao histórico (limitado por tokens)
+            turno_usuario = self.historico.adicionar("user", mensagem)
+            historico = self.historico.mensagens()
 
             # Sistema de mensagens com contexto personalizado
-            system_message = {
-                "role": "system",
-                "content": f"""Você é ED, um assistente pessoal em português do Brasil.
+            with rastreador.trecho("montar_system_prompt"):
+                conteudo = self.montar_system_prompt(perfil)
+            tokens_sistema = self._system_prompt[2]
+
+            # Só os trechos antigos relevantes para esta mensagem entram no prompt
+            with rastreador.trecho("recuperar_contexto"):
+                trechos = self.recuperador.contexto(mensagem)
+            if trechos:
+                extra = "\n\nTrechos relevantes de conversas anteriores:\n"
+                extra += "\n".join(f"- {trecho}" for trecho in trechos)
+                conteudo += extra
+                tokens_sistema += self.historico.contador.contar(extra)
+            self.tokens_ultimo_prompt = tokens_sistema + self.historico.tokens()
+
+            # Perguntas repetidas são respondidas pelo cache, sem chamar a API.
+            # A chave usa o prompt base: os trechos recuperados mudam a cada troca
+            chave_cache = self.cache_respostas.gerar_chave(
+                mensagem, self._system_prompt[1], historico[:-1][-self.janela_cache:]
+            )
+            resposta = self.cache_respostas.obter(chave_cache)
+            if resposta is not None:
+                if ao_receber_trecho is not None:
+                    ao_receber_trecho(resposta)
+                if verificar_cancelamento is not None:
+                    verificar_cancelamento()
+                self.historico.adicionar("assistant", resposta)
+                return resposta
+
+            # Perguntas de programação ou enciclopédia consultam as fontes só quando
+            # a API vai ser chamada; a espera nunca passa do prazo
+            consulta = iniciar_consulta(self.obter_conhecimento, mensagem, self.prazo_conhecimento)
+            if consulta is not None:
+                with rastreador.trecho("conhecimento"):
+                    extra = formatar_contexto(consulta.coletar())
+                if extra:
+                    conteudo += extra
+                    self.tokens_ultimo_prompt += self.historico.contador.contar(extra)
+
+            # Prepara todas as mensagens
+            system_message = {"role": "system", "content": conteudo}
+            messages = [system_message] + historico
+
+            # Faz a chamada para a API
+            inicio_llm = time.perf_counter()
+            if ao_receber_trecho is None:
+                resposta = self._chamar_llm(messages)
+            else:
+                partes = []
+                for trecho in self._chamar_llm(messages, stream=True):
+                    if not partes:
+                        rastreador.registrar("llm/primeiro_trecho", inicio_llm, time.perf_counter())
+                    partes.append(trecho)
+                    ao_receber_trecho(trecho)
+                resposta = "".join(partes)
+            rastreador.registrar("llm", inicio_llm, time.perf_counter())
+
+            # Sem streaming nada é emitido durante a chamada: uma resposta que
+            # chegou depois do cancelamento não vai para o cache nem para o histórico
+            if verificar_cancelamento is not None:
+                verificar_cancelamento()
+            self.cache_respostas.guardar(chave_cache, resposta)
+            self.historico.adicionar("assistant", resposta)
+            return resposta
+
+        except Exception:
+            # Cancelada (TarefaCancelada) ou com erro: sem resposta, a pergunta não
+            # fica no histórico, senão o próximo prompt teria dois turnos do usuário
+            # seguidos. O erro segue para _ao_falhar_tarefa, que só o mostra na tela
+            if turno_usuario is not None:
+                self.historico.remover(turno_usuario)
+            raise
+        finally:
+            if consulta is not None:
+                consulta.cancelar()
+
+    def montar_system_prompt(self, perfil):
+        """Monta o prompt de sistema, reaproveitando-o enquanto o perfil não mudar"""
+        versao, prompt, _ = self._system_prompt
+        if versao == perfil['versao']:
+            return prompt
+
+        prompt = f"""Você é ED, um assistente pessoal em português do Brasil.
                 
                 Informações do usuário:
                 - Nome: {perfil['info_pessoal'].get('nome', 'Usuário')}
@@ -274,87 +619,108 @@ class AssistenteIA(QMainWindow):
                 4. Aproveite o conhecimento prévio em programação
                 5. Seja conciso e direto nas respostas
                 """
-            }
-
-            # Prepara todas as mensagens
-            messages = [system_message] + self.historico_conversa
-
-            # Faz a chamada para a API
-            resposta = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                temperature=0.7,
-                max_tokens=500
-            )
-
-            return resposta.choices[0].message.content
+        tokens = self.historico.contador.contar(prompt) + TOKENS_POR_MENSAGEM
+        self._system_prompt = (perfil['versao'], prompt, tokens)
+        return prompt
 
-        except Exception as e:
-            return f"Desculpe, ocorreu um erro ao processar sua mensagem: {str(e)}"
+    def _chamar_llm(self, messages, stream=False):
+        """Chama o backend de LLM; com stream=True retorna um gerador de trechos"""
+        if not stream:
+            return self.llm.completar(messages)
+        return self.llm.transmitir(messages)
 
     def setup_database(self):
-        self.conn = sqlite3.connect('assistente.db')
-        self.cursor = self.conn.cursor()
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS conversas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            usuario TEXT,
-            resposta TEXT
+        self.db = obter_gerenciador('assistente.db')
+        # Cria a tabela conversas e o índice de busca; grava em segundo plano
+        self.registro = RegistroConversas('assistente.db')
+
+    def setup_intencoes(self):
+        """Compila uma única vez todos os gatilhos de comandos e palavras de chamada"""
+        self.intencoes = MotorIntencoes()
+        self.intencoes.registrar(
+            "buscar_conversa",
+            ["buscar conversa", "buscar conversas", "buscar nas conversas", "procurar conversa",
+             "procurar nas conversas", "histórico de conversas"],
+            prioridade=-1, argumento=True
+        )
+        self.intencoes.registrar(
+            "exportar_rastreamento",
+            ["exportar rastreamento", "exportar rastreio", "exportar latências", "exportar latencias"],
+            prioridade=-1
         )
-        ''')
-        self.conn.commit()
+        for pergunta, resposta in RESPOSTAS_BASICAS.items():
+            self.intencoes.registrar(f"basica:{pergunta}", [pergunta], prioridade=0, resposta=resposta)
+        self.intencoes.registrar("abrir", ["abrir"], prioridade=1, argumento=True)
+        self.intencoes.registrar("fechar", ["fechar"], prioridade=2, argumento=True)
+        self.intencoes.registrar("volume", ["volume"], prioridade=3)
+        self.intencoes.registrar("pesquisar", ["pesquisar"], prioridade=4, argumento=True)
+        # Modificadores: não vencem sozinhos, só complementam outra intenção
+        self.intencoes.registrar("aumentar", ["aumentar", "aumenta", "subir"], prioridade=None)
+        self.intencoes.registrar("diminuir", ["diminuir", "diminui", "abaixar"], prioridade=None)
+        self.intencoes.registrar("mudo", ["mudo", "mutar"], prioridade=None)
+        self.intencoes.registrar_chamadas(self.nome_chamada)
+        self.intencoes.construir()
+
+    def buscar_conversas(self, termo):
+        """Busca no histórico gravado e formata os resultados para o chat"""
+        termo = termo.strip(" :,.?!")
+        if not termo:
+            return "Diga o que devo procurar, por exemplo: buscar conversa sobre python."
+        if termo.startswith("sobre "):
+            termo = termo[len("sobre "):]
+        resultados = self.registro.buscar(termo, limite=5)
+        if not resultados:
+            return f"Não encontrei conversas sobre '{termo}'."
+        linhas = [f"Encontrei {len(resultados)} conversa(s) sobre '{termo}':"]
+        for res in resultados:
+            linhas.append(f"• [{res['timestamp']}] {res['trecho']}")
+        return "<br>".join(linhas)
 
     def processar_comando(self, texto):
         """Processa comandos do usuário"""
-        texto = texto.lower()
+        resultado = self.intencoes.analisar(texto.lower())
+        if resultado is None:
+            return None
+
+        nome = resultado.intencao.nome
+        if nome == "chamada":
+            # Só chamou o ED; se veio uma pergunta junto, ela vai para a IA
+            return None if resultado.argumento else RESPOSTA_CHAMADA
 
         # Respostas básicas sem usar API
-        respostas_basicas = {
-            "oi": "Olá! Como posso ajudar?",
-            "olá": "Oi! Como posso ajudar?",
-            "tudo bem": "Tudo ótimo! Como posso ajudar você hoje?",
-            "tudo bem?": "Tudo ótimo! Como posso ajudar você hoje?",
-            "como vai": "Estou muito bem, obrigado por perguntar! Como posso ajudar?",
-            "como você está": "Estou funcionando perfeitamente! Como posso ajudar?",
-            "bom dia": "Bom dia! Como posso ajudar?",
-            "boa tarde": "Boa tarde! Como posso ajudar?",
-            "boa noite": "Boa noite! Como posso ajudar?"
-        }
-
-        # Verifica se é uma resposta básica
-        for pergunta, resposta in respostas_basicas.items():
-            if pergunta in texto:
-                return resposta
+        if resultado.intencao.resposta:
+            return resultado.intencao.resposta
         
         # Comandos do sistema
-        if "abrir" in texto:
-            app = texto.split("abrir")[-1].strip()
-            return self.system.abrir_aplicativo(app)
+        if nome == "abrir":
+            return self.system.abrir_aplicativo(resultado.argumento)
             
-        elif "fechar" in texto:
-            app = texto.split("fechar")[-1].strip()
-            return self.system.fechar_aplicativo(app)
+        elif nome == "fechar":
+            return self.system.fechar_aplicativo(resultado.argumento)
             
-        elif "volume" in texto:
-            if "aumentar" in texto:
-                return self.system.controlar_volume("aumentar")
-            elif "diminuir" in texto:
-                return self.system.controlar_volume("diminuir")
-            elif "mudo" in texto:
-                return self.system.controlar_volume("mudo")
+        elif nome == "volume":
+            for acao in ("aumentar", "diminuir", "mudo"):
+                if acao in resultado.termos:
+                    return self.system.controlar_volume(acao)
                 
-        elif "pesquisar" in texto:
-            termo = texto.split("pesquisar")[-1].strip()
-            return self.system.pesquisar_web(termo)
+        elif nome == "pesquisar":
+            return self.system.pesquisar_web(resultado.argumento)
+
+        elif nome == "buscar_conversa":
+            return self.buscar_conversas(resultado.argumento)
+
+        elif nome == "exportar_rastreamento":
+            return self.exportar_rastreamento()
             
         # Outros comandos...
         return None
 
 if __name__ == "__main__":
     try:
-        app = QApplication(sys.argv)
-        assistente = AssistenteIA()
+        with perfil_inicializacao.fase("QApplication"):
+            app = QApplication(sys.argv)
+        with perfil_inicializacao.fase("janela principal"):
+            assistente = AssistenteIA()
         sys.exit(app.exec())
     except Exception as e:
         print(f"Erro ao iniciar o assistente: {str(e)}")
@@ -0,0 +1,111 @@
+import heapq
+import threading
+import psutil
+
+CRITERIOS = ('memoria', 'cpu')
+
+
+class RankingProcessos:
+    """Ranking dos N processos que mais usam memória ou CPU.
+
+    Os objetos psutil.Process ficam guardados por PID entre as chamadas, então
+    o uso de CPU é a diferença real desde a leitura anterior. A cada chamada
+    só os PIDs novos viram objetos e os que saíram são descartados. De todos
+    os processos é lida só a métrica do critério; a seleção usa um heap
+    limitado a N itens, e o nome, a outra métrica e a checagem de reuso de PID
+    (pela hora de criação) só são feitos para os vencedores.
+    """
+
+    def __init__(self):
+        self._processos = {}
+        self._memoria_total = psutil.virtual_memory().total
+        self._lock = threading.Lock()
+
+    def atualizar(self):
+        """Sincroniza o cache com os PIDs atuais; retorna (novos, encerrados)"""
+        atuais = set(psutil.pids())
+        conhecidos = self._processos.keys()
+        encerrados = conhecidos - atuais
+        novos = atuais - conhecidos
+        for pid in encerrados:
+            del self._processos[pid]
+        for pid in novos:
+            self._adicionar(pid)
+        return len(novos), len(encerrados)
+
+    def top(self, n=10, por='memoria'):
+        """Lista de dicts com pid, nome, memória e CPU dos n maiores pelo critério"""
+        if por not in CRITERIOS:
+            raise ValueError(f"Critério inválido: {por}")
+        with self._lock:
+            self.atualizar()
+            ler = self._ler_memoria if por == 'memoria' else self._ler_cpu
+            leituras = []
+            for pid, proc in list(self._processos.items()):
+                valor = ler(proc)
+                if valor is None:
+                    self._processos.pop(pid, None)
+                else:
+                    leituras.append((valor, pid, proc))
+
+            resultado = []
+            # Pega alguns a mais para repor vencedores descartados por reuso de PID
+            for valor, pid, proc in heapq.nlargest(n + 5, leituras, key=lambda l: l[0]):
+                if len(resultado) == n:
+                    break
+                info = self._descrever(pid, proc, por, valor)
+                if info is not None:
+                    resultado.append(info)
+            return resultado
+
+    def _adicionar(self, pid):
+        try:
+            proc = psutil.Process(pid)
+            proc.cpu_percent(None)  # Linha de base: a primeira leitura real vem na próxima chamada
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return
+        self._processos[pid] = proc
+
+    # Só a métrica do critério é lida de todos os processos; a outra, só dos vencedores
+
+    @staticmethod
+    def _ler_memoria(proc):
+        try:
+            return proc.memory_info().rss
+        except psutil.AccessDenied:
+            return 0
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return None
+
+    @staticmethod
+    def _ler_cpu(proc):
+        try:
+            return proc.cpu_percent(None)
+        except psutil.AccessDenied:
+            return 0.0
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return None
+
+    def _descrever(self, pid, proc, por, valor):
+        if por == 'memoria':
+            rss, cpu = valor, self._ler_cpu(proc) or 0.0
+        else:
+            rss, cpu = self._ler_memoria(proc) or 0, valor
+        try:
+            if not proc.is_running():
+                # PID reaproveitado por outro processo: a leitura era do antigo
+                self._processos.pop(pid, None)
+                self._adicionar(pid)
+                return None
+            nome = proc.name()
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            self._processos.pop(pid, None)
+            return None
+        except psutil.AccessDenied:
+            nome = "?"
+        return {
+            'pid': pid,
+            'nome': nome,
+            'memoria': rss / self._memoria_total * 100,
+            'cpu': cpu
+        }
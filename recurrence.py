@@ -0,0 +1,140 @@
+import bisect
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from intents import normalizar
+
+# Segunda = 0, como em datetime.weekday()
+DIAS = {
+    'seg': 0, 'segunda': 0, 'segunda-feira': 0,
+    'ter': 1, 'terca': 1, 'terca-feira': 1,
+    'qua': 2, 'quarta': 2, 'quarta-feira': 2,
+    'qui': 3, 'quinta': 3, 'quinta-feira': 3,
+    'sex': 4, 'sexta': 4, 'sexta-feira': 4,
+    'sab': 5, 'sabado': 5,
+    'dom': 6, 'domingo': 6,
+}
+ABREVIACOES = ('seg', 'ter', 'qua', 'qui', 'sex', 'sab', 'dom')
+
+
+def interpretar_dias(dias_semana):
+    """Converte "0,2,4", "seg, qua, sex" ou uma lista em um frozenset de dias (0 a 6).
+
+    Vazio ou None significa todos os dias.
+    """
+    if not dias_semana:
+        return frozenset()
+    if isinstance(dias_semana, str):
+        return _dias_de_texto(dias_semana)
+    return _interpretar_partes([str(parte) for parte in dias_semana])
+
+
+@lru_cache(maxsize=256)
+def _dias_de_texto(texto):
+    # Poucas combinações distintas se repetem em milhares de horários
+    return _interpretar_partes(re.split(r'[\s,;/]+', normalizar(texto).strip()))
+
+
+def _interpretar_partes(partes):
+    dias = set()
+    for parte in partes:
+        parte = normalizar(parte).strip().rstrip('.')
+        if not parte:
+            continue
+        if parte.isdigit() and int(parte) < 7:
+            dias.add(int(parte))
+        elif parte in DIAS:
+            dias.add(DIAS[parte])
+        else:
+            raise ValueError(f"Dia da semana inválido: {parte}")
+    return frozenset(dias)
+
+
+def formatar_dias(dias):
+    """Texto guardado na coluna dias_semana (ex.: "seg,qua,sex")"""
+    return ",".join(ABREVIACOES[dia] for dia in sorted(dias)) or None
+
+
+def interpretar_data_hora(valor):
+    """Aceita datetime ou o texto gravado no SQLite"""
+    if isinstance(valor, datetime):
+        return valor
+    return datetime.fromisoformat(str(valor).strip())
+
+
+def proxima_ocorrencia(inicio, recorrente, dias, depois):
+    """Primeira ocorrência estritamente depois de `depois`, ou None.
+
+    Um horário recorrente repete no horário de `inicio`, nos dias da semana
+    em `dias` (todos, se vazio), a partir da data de `inicio`.
+    """
+    if not recorrente:
+        return inicio if inicio > depois else None
+    if inicio > depois and (not dias or inicio.weekday() in dias):
+        return inicio
+    candidato = datetime.combine(max(inicio.date(), depois.date()), inicio.time())
+    if candidato <= depois:
+        candidato += timedelta(days=1)
+    for _ in range(7):
+        if not dias or candidato.weekday() in dias:
+            return candidato
+        candidato += timedelta(days=1)
+    return None
+
+
+def ocorrencias(inicio, recorrente, dias, depois, ate=None):
+    """Gera, sob demanda, as ocorrências depois de `depois` (e até `ate`, se dado)"""
+    proxima = proxima_ocorrencia(inicio, recorrente, dias, depois)
+    while proxima is not None and (ate is None or proxima <= ate):
+        yield proxima
+        if not recorrente:
+            return
+        proxima = proxima_ocorrencia(inicio, recorrente, dias, proxima)
+
+
+class ExpansorRecorrencias:
+    """Gera em ordem as ocorrências de muitas regras recorrentes.
+
+    Cada regra entra numa lista por dia da semana, ordenada pelo horário.
+    Uma consulta percorre os dias a partir de `depois` e só visita as
+    entradas que de fato saem, então as próximas K ocorrências custam
+    O(log R + K) em vez de calcular a próxima ocorrência de todas as R
+    regras. Regras que ainda não começaram são puladas até a data de início.
+    """
+
+    def __init__(self, regras):
+        """`regras`: iterável de (inicio, dias, item)"""
+        por_dia = [[] for _ in range(7)]
+        for sequencia, (inicio, dias, item) in enumerate(regras):
+            for dia in (dias or range(7)):
+                por_dia[dia].append((inicio.time(), sequencia, inicio, item))
+        for lista in por_dia:
+            lista.sort(key=lambda entrada: (entrada[0], entrada[1]))
+        self._por_dia = por_dia
+        self._horarios = [[entrada[0] for entrada in lista] for lista in por_dia]
+        self._total = sum(len(lista) for lista in por_dia)
+
+    def __len__(self):
+        return self._total
+
+    def ocorrencias(self, depois, ate=None):
+        """Gera (quando, item) estritamente depois de `depois`, em ordem, até `ate`"""
+        if not self._total:
+            return
+        data = depois.date()
+        primeiro_dia = True
+        while True:
+            dia = data.weekday()
+            lista = self._por_dia[dia]
+            primeira = bisect.bisect_right(self._horarios[dia], depois.time()) if primeiro_dia else 0
+            for posicao in range(primeira, len(lista)):
+                horario, _, inicio, item = lista[posicao]
+                quando = datetime.combine(data, horario)
+                if ate is not None and quando > ate:
+                    return
+                if quando >= inicio:
+                    yield quando, item
+            if ate is not None and datetime.combine(data, datetime.min.time()) > ate:
+                return
+            data += timedelta(days=1)
+            primeiro_dia = False
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from database import obter_gerenciador
+
+
+class CacheRespostas:
+    """Cache persistente (SQLite) de respostas da IA com LRU e TTL"""
+
+    def __init__(self, db_path='assistente.db', max_entradas=500, ttl_segundos=24 * 3600, ativo=True):
+        self.db_path = db_path
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.ativo = ativo
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Espelho em memória das entradas válidas, na ordem de uso (LRU)
+        self._entradas = OrderedDict()
+        # Chaves lidas desde a última escrita; o acesso é gravado em lote
+        self._acessadas = {}
+        self.db = obter_gerenciador(db_path)
+        self.setup_database()
+        self.carregar()
+
+    def setup_database(self):
+        with self.db.transacao() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache_respostas (
+                    chave TEXT PRIMARY KEY,
+                    resposta TEXT,
+                    criado_em REAL,
+                    expira_em REAL,
+                    ultimo_acesso REAL
+                )
+            ''')
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_respostas_acesso ON cache_respostas (ultimo_acesso)"
+            )
+
+    def carregar(self):
+        """Remove entradas vencidas e carrega as demais em ordem de uso"""
+        agora = time.time()
+        with self._lock, self.db.transacao() as conn:
+            conn.execute("DELETE FROM cache_respostas WHERE expira_em <= ?", (agora,))
+            linhas = conn.execute(
+                "SELECT chave, resposta, expira_em FROM cache_respostas ORDER BY ultimo_acesso"
+            ).fetchall()
+            for chave, resposta, expira_em in linhas:
+                self._entradas[chave] = (resposta, expira_em)
+            self._remover_excedentes(conn)
+
+    @staticmethod
+    def normalizar(texto):
+        """Normaliza caixa, acentos, espaços e pontuação final da mensagem"""
+        texto = unicodedata.normalize('NFKD', texto.lower())
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+        texto = re.sub(r'\s+', ' ', texto).strip()
+        return texto.rstrip('?!.… ')
+
+    def gerar_chave(self, mensagem, system_prompt, historico):
+        """Chave a partir da mensagem, do prompt de sistema e da janela de histórico"""
+        hash_prompt = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()
+        janela = [(m["role"], m["content"]) for m in historico]
+        bruto = json.dumps([self.normalizar(mensagem), hash_prompt, janela], ensure_ascii=False)
+        return hashlib.sha256(bruto.encode('utf-8')).hexdigest()
+
+    def obter(self, chave):
+        """Retorna a resposta em cache ou None"""
+        if not self.ativo:
+            return None
+        agora = time.time()
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None or entrada[1] <= agora:
+                if entrada is not None:
+                    del self._entradas[chave]
+                    self._acessadas.pop(chave, None)
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self._acessadas[chave] = agora
+            self.hits += 1
+            return entrada[0]
+
+    def guardar(self, chave, resposta, ttl_segundos=None):
+        """Armazena uma resposta, removendo as menos usadas se passar do limite"""
+        if not self.ativo:
+            return
+        agora = time.time()
+        expira_em = agora + (ttl_segundos or self.ttl_segundos)
+        with self._lock, self.db.transacao() as conn:
+            self._entradas[chave] = (resposta, expira_em)
+            self._entradas.move_to_end(chave)
+            self._acessadas.pop(chave, None)
+            conn.execute("""
+                INSERT OR REPLACE INTO cache_respostas (chave, resposta, criado_em, expira_em, ultimo_acesso)
+                VALUES (?, ?, ?, ?, ?)
+            """, (chave, resposta, agora, expira_em, agora))
+            self._remover_excedentes(conn)
+            self._gravar_acessos(conn)
+
+    def limpar(self):
+        """Apaga todo o cache"""
+        with self._lock, self.db.transacao() as conn:
+            self._entradas.clear()
+            self._acessadas.clear()
+            conn.execute("DELETE FROM cache_respostas")
+
+    def fechar(self):
+        """Grava os acessos pendentes; a conexão é do gerenciador do banco"""
+        with self._lock, self.db.transacao() as conn:
+            self._gravar_acessos(conn)
+
+    def estatisticas(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entradas": len(self._entradas),
+            "taxa_acerto": self.hits / total if total else 0.0
+        }
+
+    def _remover_excedentes(self, conn):
+        excedentes = []
+        while len(self._entradas) > self.max_entradas:
+            chave, _ = self._entradas.popitem(last=False)
+            self._acessadas.pop(chave, None)
+            excedentes.append((chave,))
+        if excedentes:
+            conn.executemany("DELETE FROM cache_respostas WHERE chave = ?", excedentes)
+
+    def _gravar_acessos(self, conn):
+        if self._acessadas:
+            conn.executemany(
+                "UPDATE cache_respostas SET ultimo_acesso = ? WHERE chave = ?",
+                [(acesso, chave) for chave, acesso in self._acessadas.items()]
+            )
+            self._acessadas.clear()
@@ -0,0 +1,148 @@
+import heapq
+import math
+import re
+import threading
+from array import array
+from collections import Counter, deque
+from intents import normalizar
+
+STOPWORDS = frozenset("""
+a ao aos as ate com como da das de dela dele deles do dos e ela elas ele eles em entre era eram essa esse
+esta estao estar este eu foi for isso isto ja la lhe mais mas me mesmo meu minha muito na nao nas nem no
+nos nossa nosso num numa o os ou para pela pelas pelo pelos por pra qual quando que quem se sem ser seu
+sua so sobre sua tambem te tem tinha tu tua um uma umas uns voce voces vou vai sim oi ola ed
+""".split())
+
+
+def tokenizar(texto):
+    """Palavras em minúsculas, sem acentos e sem stopwords"""
+    return [t for t in re.findall(r"\w+", normalizar(texto)) if len(t) > 1 and t not in STOPWORDS]
+
+
+class IndiceBM25:
+    """Índice invertido incremental com pontuação BM25.
+
+    As listas de postings são arrays compactos (id do documento, frequência),
+    então adicionar um documento custa O(tokens do documento). Termos que
+    aparecem em mais de `max_df` dos documentos são ignorados na consulta
+    quando há termos mais raros, e de cada lista só os `max_postings`
+    documentos mais novos são pontuados, o que limita o custo da busca em
+    índices grandes.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, max_df=0.05, max_postings=4000):
+        self.k1 = k1
+        self.b = b
+        self.max_df = max_df
+        self.max_postings = max_postings
+        self._postings = {}
+        self._tamanhos = array('i')
+        self._itens = []
+        self._soma_tamanhos = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def adicionar(self, item, texto):
+        """Indexa o texto e associa o documento ao item; retorna o id interno"""
+        contagem = Counter(tokenizar(texto))
+        with self._lock:
+            doc = len(self._itens)
+            self._itens.append(item)
+            tamanho = sum(contagem.values())
+            self._tamanhos.append(tamanho)
+            self._soma_tamanhos += tamanho
+            for termo, frequencia in contagem.items():
+                postings = self._postings.get(termo)
+                if postings is None:
+                    postings = self._postings[termo] = (array('i'), array('H'))
+                postings[0].append(doc)
+                postings[1].append(min(frequencia, 65535))
+        return doc
+
+    def buscar(self, consulta, k=3, ignorar=()):
+        """Retorna até k pares (item, pontuação), do mais relevante ao menos"""
+        termos = set(tokenizar(consulta))
+        with self._lock:
+            total = len(self._itens)
+            if not total or not termos:
+                return []
+            media = self._soma_tamanhos / total or 1.0
+            listas = [(termo, self._postings[termo]) for termo in termos if termo in self._postings]
+            if not listas:
+                return []
+            if total >= 1000:
+                raras = [(t, p) for t, p in listas if len(p[0]) <= self.max_df * total]
+                listas = raras or [min(listas, key=lambda tp: len(tp[1][0]))]
+
+            k1, b, tamanhos = self.k1, self.b, self._tamanhos
+            pontos = {}
+            for _, (docs, frequencias) in listas:
+                df = len(docs)
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                if df > self.max_postings:
+                    docs, frequencias = docs[-self.max_postings:], frequencias[-self.max_postings:]
+                for doc, tf in zip(docs, frequencias):
+                    norma = k1 * (1 - b + b * tamanhos[doc] / media)
+                    pontos[doc] = pontos.get(doc, 0.0) + idf * tf * (k1 + 1) / (tf + norma)
+            for doc in ignorar:
+                pontos.pop(doc, None)
+            melhores = heapq.nlargest(k, pontos.items(), key=lambda dp: dp[1])
+            return [(self._itens[doc], pontos_doc) for doc, pontos_doc in melhores]
+
+
+# Respostas que não são respostas: erros gravados por versões anteriores e
+# trocas interrompidas. Não entram no índice, senão voltariam ao prompt como contexto
+MARCAS_FALHA = ("Desculpe, ocorreu um erro", "<i>(interrompido)</i>")
+
+
+def troca_valida(resposta):
+    return bool(resposta) and not any(marca in resposta for marca in MARCAS_FALHA)
+
+
+class RecuperadorContexto:
+    """Escolhe trechos de conversas antigas relevantes para a mensagem.
+
+    Tudo é local: as conversas gravadas são indexadas uma vez na carga e cada
+    nova troca entra no índice assim que termina. Nome, horário, interesses e
+    linguagens do usuário não entram: já estão no prompt de sistema.
+    """
+
+    def __init__(self, registro, k=3, tamanho_trecho=240, ignorar_recentes=3):
+        self.registro = registro
+        self.k = k
+        self.tamanho_trecho = tamanho_trecho
+        self.conversas = IndiceBM25()
+        # Conversas gravadas antes desta sessão: só elas vêm de `carregar`. As trocas
+        # novas entram por adicionar_conversa, mesmo durante a carga, e ganham ids
+        # maiores (AUTOINCREMENT); sem o limite, uma troca gravada antes de a carga
+        # ler o fim da tabela seria indexada duas vezes
+        self._ultimo_id_anterior = registro.ultimo_id() or 0
+        # Trocas desta sessão que ainda estão no histórico enviado à API
+        self._recentes = deque(maxlen=ignorar_recentes)
+
+    def carregar(self):
+        """Indexa as conversas gravadas antes desta sessão (rodar fora da thread da interface)"""
+        for _, usuario, resposta in self.registro.todas(ate_id=self._ultimo_id_anterior):
+            if troca_valida(resposta):
+                self.conversas.adicionar(self._trecho(usuario, resposta), f"{usuario} {resposta}")
+
+    def adicionar_conversa(self, usuario, resposta):
+        """Indexa uma troca concluída; erros e respostas interrompidas ficam de fora"""
+        if not troca_valida(resposta):
+            return
+        doc = self.conversas.adicionar(self._trecho(usuario, resposta), f"{usuario} {resposta}")
+        self._recentes.append(doc)
+
+    def contexto(self, mensagem):
+        """Retorna os k trechos mais relevantes para a mensagem"""
+        resultados = self.conversas.buscar(mensagem, self.k, ignorar=tuple(self._recentes))
+        return [trecho for trecho, _ in resultados]
+
+    def _trecho(self, usuario, resposta):
+        texto = f"Usuário: {usuario} / ED: {resposta}"
+        texto = " ".join(texto.split())
+        if len(texto) > self.tamanho_trecho:
+            texto = texto[:self.tamanho_trecho - 3].rstrip() + "..."
+        return texto
@@ -0,0 +1,170 @@
+import heapq
+import itertools
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from recurrence import formatar_dias, interpretar_data_hora, interpretar_dias, proxima_ocorrencia
+
+Lembrete = namedtuple('Lembrete', 'id titulo descricao inicio recorrente dias')
+
+
+class AgendadorLembretes:
+    """Dispara os lembretes da tabela horarios a partir de uma única thread.
+
+    Os próximos disparos ficam num heap (instante, sequência, id); a thread
+    dorme até o mais próximo e é acordada quando entra um lembrete novo.
+    Lembretes recorrentes voltam ao heap com a próxima ocorrência (O(log n))
+    e cancelamentos são preguiçosos: a entrada antiga é ignorada ao sair do
+    heap. `ao_disparar(lembrete, instante)` roda na thread do agendador.
+
+    Um lembrete único que venceu com o programa fechado dispara logo depois da
+    carga, se não passou de `TOLERANCIA_ATRASO`; `instante` é então o horário
+    original. Depois de disparado, ele é marcado em horarios (notificar = 0)
+    para não disparar de novo no próximo início.
+    """
+
+    # Reavalia o heap pelo menos uma vez por minuto, caso o relógio do sistema mude
+    ESPERA_MAXIMA = 60.0
+    # Até quanto tempo depois do horário um lembrete único perdido ainda é avisado
+    TOLERANCIA_ATRASO = timedelta(hours=12)
+
+    def __init__(self, memoria, ao_disparar):
+        self.memoria = memoria
+        self.ao_disparar = ao_disparar
+        self._heap = []
+        self._ativos = {}
+        self._sequencia = itertools.count()
+        self._condicao = threading.Condition()
+        self._encerrado = False
+        self._thread = None
+
+    def iniciar(self):
+        """Carrega os horários do banco e começa a disparar"""
+        self._thread = threading.Thread(target=self._executar, name="lembretes", daemon=True)
+        self._thread.start()
+        return self
+
+    def encerrar(self):
+        with self._condicao:
+            self._encerrado = True
+            self._condicao.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def agendar(self, titulo, data_hora, descricao=None, recorrente=False, dias_semana=None):
+        """Grava o lembrete em horarios e o coloca no heap; retorna o id"""
+        dias = interpretar_dias(dias_semana)
+        id_horario = self.memoria.adicionar_horario(
+            titulo, descricao, data_hora, recorrente=recorrente,
+            dias_semana=formatar_dias(dias), notificar=True
+        )
+        lembrete = Lembrete(id_horario, titulo, descricao, interpretar_data_hora(data_hora), bool(recorrente), dias)
+        self._inserir(lembrete, datetime.now())
+        return id_horario
+
+    def cancelar(self, id_horario):
+        with self._condicao:
+            self._ativos.pop(id_horario, None)
+        self.memoria.remover_horario(id_horario)
+
+    def pendentes(self):
+        with self._condicao:
+            return len(self._ativos)
+
+    def proximos(self, limite=5):
+        """Os próximos (instante, lembrete), em ordem"""
+        with self._condicao:
+            validos = (
+                (datetime.fromtimestamp(instante), self._ativos[id_horario][0])
+                for instante, sequencia, id_horario in self._heap
+                if self._ativos.get(id_horario, (None, None))[1] == sequencia
+            )
+            return heapq.nsmallest(limite, validos, key=lambda par: par[0])
+
+    def carregar(self):
+        """Lê os horários com notificação e agenda a próxima ocorrência de cada um.
+
+        Lembretes únicos vencidos há menos de TOLERANCIA_ATRASO entram no heap
+        com o horário original, então disparam assim que a thread acorda.
+        """
+        agora = datetime.now()
+        entradas = []
+        for id_horario, titulo, descricao, data_hora, recorrente, dias_semana in self.memoria.listar_horarios():
+            try:
+                lembrete = Lembrete(id_horario, titulo, descricao, interpretar_data_hora(data_hora),
+                                    bool(recorrente), interpretar_dias(dias_semana))
+            except (TypeError, ValueError) as e:
+                print(f"Horário {id_horario} ignorado: {e}")
+                continue
+            proxima = proxima_ocorrencia(lembrete.inicio, lembrete.recorrente, lembrete.dias, agora)
+            if proxima is None and not lembrete.recorrente and agora - lembrete.inicio <= self.TOLERANCIA_ATRASO:
+                proxima = lembrete.inicio  # Venceu com o programa fechado
+            if proxima is not None:
+                entradas.append((lembrete, proxima))
+        with self._condicao:
+            for lembrete, proxima in entradas:
+                sequencia = next(self._sequencia)
+                self._ativos[lembrete.id] = (lembrete, sequencia)
+                self._heap.append((proxima.timestamp(), sequencia, lembrete.id))
+            heapq.heapify(self._heap)  # O(n) para a carga inteira
+            self._condicao.notify()
+        return len(entradas)
+
+    def _inserir(self, lembrete, depois):
+        proxima = proxima_ocorrencia(lembrete.inicio, lembrete.recorrente, lembrete.dias, depois)
+        with self._condicao:
+            if proxima is None:
+                self._ativos.pop(lembrete.id, None)
+                return
+            sequencia = next(self._sequencia)
+            self._ativos[lembrete.id] = (lembrete, sequencia)
+            heapq.heappush(self._heap, (proxima.timestamp(), sequencia, lembrete.id))
+            # Só precisa acordar a thread se este virou o próximo disparo
+            if self._heap[0][1] == sequencia:
+                self._condicao.notify()
+
+    def _executar(self):
+        try:
+            self.carregar()
+        except Exception as e:
+            print(f"Erro ao carregar lembretes: {e}")
+
+        while True:
+            with self._condicao:
+                while True:
+                    if self._encerrado:
+                        return
+                    if not self._heap:
+                        self._condicao.wait()
+                        continue
+                    instante, sequencia, id_horario = self._heap[0]
+                    ativo = self._ativos.get(id_horario)
+                    if ativo is None or ativo[1] != sequencia:
+                        heapq.heappop(self._heap)  # Cancelado ou reagendado
+                        continue
+                    espera = instante - datetime.now().timestamp()
+                    if espera <= 0:
+                        heapq.heappop(self._heap)
+                        break
+                    self._condicao.wait(min(espera, self.ESPERA_MAXIMA))
+
+            lembrete = ativo[0]
+            disparo = datetime.fromtimestamp(instante)
+            try:
+                self.ao_disparar(lembrete, disparo)
+            except Exception as e:
+                print(f"Erro ao disparar lembrete: {e}")
+            with self._condicao:
+                if self._ativos.get(lembrete.id, (None, None))[1] != sequencia:
+                    continue  # Cancelado durante o disparo
+                if not lembrete.recorrente:
+                    del self._ativos[lembrete.id]
+            if not lembrete.recorrente:
+                # Gravado para não disparar de novo no próximo início
+                try:
+                    self.memoria.marcar_notificado(lembrete.id)
+                except Exception as e:
+                    print(f"Erro ao marcar lembrete como notificado: {e}")
+                continue
+            # Depois de uma suspensão, pula as ocorrências perdidas em vez de disparar todas
+            self._inserir(lembrete, max(disparo, datetime.now()))
@@ -0,0 +1,240 @@
+import html
+import queue
+import re
+import threading
+import time
+from collections import deque
+from PyQt6.QtCore import QThread, pyqtSignal
+from tracing import rastreador
+from tts_cache import duracao_wav, parar_reproducao, tocar_wav
+
+
+class DivisorFrases:
+    """Acumula trechos de texto e devolve frases completas assim que terminam"""
+
+    # Fim de frase: pontuação seguida de espaço, ou quebra de linha
+    _FIM_FRASE = re.compile(r'[.!?…]+["\')\]]*\s+|\n+')
+
+    def __init__(self, min_caracteres=12):
+        self.min_caracteres = min_caracteres
+        self._buffer = ""
+
+    def adicionar(self, trecho):
+        """Adiciona um trecho e retorna as frases que ficaram completas"""
+        self._buffer += trecho
+        frases = []
+        inicio = 0
+        for fim in self._FIM_FRASE.finditer(self._buffer):
+            frase = self._buffer[inicio:fim.end()].strip()
+            # Fragmentos curtos ("1.", "Sr.") são juntados com a próxima frase
+            if len(frase) < self.min_caracteres:
+                continue
+            frases.append(frase)
+            inicio = fim.end()
+        self._buffer = self._buffer[inicio:]
+        return frases
+
+    def finalizar(self):
+        """Retorna o texto restante no buffer como última frase"""
+        resto = self._buffer.strip()
+        self._buffer = ""
+        return [resto] if resto else []
+
+
+def dividir_frases(texto):
+    """Divide um texto completo em frases"""
+    divisor = DivisorFrases()
+    return divisor.adicionar(texto) + divisor.finalizar()
+
+
+def limpar_para_fala(texto):
+    """Remove marcação HTML para o texto não ser lido em voz alta"""
+    texto = re.sub(r'<br\s*/?>', '\n', texto)
+    texto = re.sub(r'<[^>]+>', '', texto)
+    return re.sub(r'[ \t]+', ' ', html.unescape(texto))
+
+
+class TrabalhadorVoz(QThread):
+    """Thread única de síntese de voz, com fila por resposta e interrupção (barge-in).
+
+    O engine é criado dentro da própria thread por `criar_engine`. Cada
+    resposta é dividida em frases, então a primeira começa a ser falada logo;
+    uma nova resposta descarta as frases pendentes da anterior e interrompe a
+    que estiver tocando. A fila não tem limite: uma resposta longa é falada
+    inteira, sem buracos, e só a próxima resposta a esvazia (as frases que
+    ficaram sem falar contam em `descartadas`). Com um `cache_audio`, frases
+    fixas são renderizadas em arquivo nos momentos ociosos e depois tocadas
+    direto do disco.
+    """
+
+    metricas_atualizadas = pyqtSignal(dict)
+
+    def __init__(self, criar_engine, cache_audio=None, parent=None):
+        super().__init__(parent)
+        self.criar_engine = criar_engine
+        self.cache_audio = cache_audio
+        self.engine = None
+        self._parametros_voz = None
+        self._frases_fixas = set()
+        self._aquecer = deque()
+        self._interrupcao = threading.Event()
+        self._reproduzindo = False
+        self._renderizando = False
+        self._fila = queue.Queue()
+        self._geracao = 0
+        self._lock = threading.Lock()
+        self._falando = False
+        self._inicio_resposta = None
+        self.tempo_primeiro_audio = None
+        self.descartadas = 0
+
+    def nova_resposta(self):
+        """Descarta as frases pendentes e interrompe a fala atual"""
+        with self._lock:
+            self._geracao += 1
+            self._inicio_resposta = time.perf_counter()
+        descartadas = 0
+        while True:
+            try:
+                _, frase = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if frase:
+                descartadas += 1
+        if descartadas:
+            # Frases da resposta anterior que não chegaram a ser faladas
+            self.descartadas += descartadas
+            self._publicar_metricas()
+        if self._reproduzindo:
+            self._interrupcao.set()
+            parar_reproducao()
+        if self.engine is not None and self._falando:
+            try:
+                self.engine.stop()
+            except Exception as e:
+                print(f"Erro ao interromper a fala: {e}")
+
+    def falar(self, texto, interromper=True):
+        """Fala um texto inteiro; por padrão interrompe a resposta anterior"""
+        if interromper:
+            self.nova_resposta()
+        for frase in dividir_frases(limpar_para_fala(texto)):
+            self.enfileirar(frase)
+
+    def aquecer(self, textos):
+        """Agenda a renderização das frases fixas para quando a voz estiver ociosa"""
+        if self.cache_audio is None:
+            return
+        for texto in textos:
+            for frase in dividir_frases(limpar_para_fala(texto)):
+                if frase not in self._frases_fixas:
+                    self._frases_fixas.add(frase)
+                    self._aquecer.append(frase)
+        # Acorda a thread se ela estiver parada esperando frases
+        self._fila.put_nowait((None, ""))
+
+    def enfileirar(self, frase):
+        """Acrescenta uma frase à resposta atual"""
+        frase = limpar_para_fala(frase).strip()
+        if not frase:
+            return
+        self._fila.put_nowait((self._geracao, frase))
+        self._publicar_metricas()
+
+    def profundidade_fila(self):
+        return self._fila.qsize()
+
+    def metricas(self):
+        return {
+            "fila": self._fila.qsize(),
+            "primeiro_audio": self.tempo_primeiro_audio,
+            "descartadas": self.descartadas
+        }
+
+    def encerrar(self):
+        self.nova_resposta()
+        self._fila.put((None, None))
+        self.wait(2000)
+
+    def run(self):
+        try:
+            self.engine = self.criar_engine()
+        except Exception as e:
+            print(f"Erro ao configurar voz: {e}")
+            self.engine = None
+        if self.engine is None:
+            return
+        self.engine.connect('started-utterance', self._ao_iniciar_fala)
+        self._parametros_voz = tuple(self.engine.getProperty(p) for p in ('voice', 'rate', 'volume'))
+
+        while True:
+            try:
+                geracao, frase = self._fila.get(timeout=0 if self._aquecer else None)
+            except queue.Empty:
+                self._aquecer_proxima()
+                continue
+            if frase is None:
+                break
+            if not frase or geracao != self._geracao:
+                continue  # Aviso de aquecimento ou frase de uma resposta já substituída
+            try:
+                self._falar_frase(frase)
+            except Exception as e:
+                print(f"Erro na síntese de voz: {e}")
+            finally:
+                self._falando = False
+            self._publicar_metricas()
+
+    def _falar_frase(self, frase):
+        if self.cache_audio is not None:
+            chave = self.cache_audio.chave(frase, *self._parametros_voz)
+            caminho = self.cache_audio.obter(chave)
+            if caminho is not None and self._tocar_arquivo(caminho):
+                return
+            if frase in self._frases_fixas:
+                # Foi removida pelo orçamento: renderiza de novo quando sobrar tempo
+                self._aquecer.append(frase)
+        self._falando = True
+        self.engine.say(frase)
+        self.engine.runAndWait()
+
+    def _tocar_arquivo(self, caminho):
+        duracao = duracao_wav(caminho)
+        if duracao is None:
+            return False
+        self._interrupcao.clear()
+        self._reproduzindo = True
+        try:
+            self._ao_iniciar_fala(None)
+            tocar_wav(caminho)
+            self._interrupcao.wait(duracao)
+        finally:
+            self._reproduzindo = False
+        return True
+
+    def _aquecer_proxima(self):
+        frase = self._aquecer.popleft()
+        chave = self.cache_audio.chave(frase, *self._parametros_voz)
+        if self.cache_audio.contem(chave):
+            return
+        self._renderizando = True
+        try:
+            self.cache_audio.renderizar(self.engine, frase, chave)
+        except Exception as e:
+            print(f"Erro ao renderizar áudio para o cache: {e}")
+        finally:
+            self._renderizando = False
+
+    def _ao_iniciar_fala(self, name):
+        if self._renderizando:
+            return
+        with self._lock:
+            if self._inicio_resposta is not None:
+                agora = time.perf_counter()
+                self.tempo_primeiro_audio = agora - self._inicio_resposta
+                rastreador.registrar("voz/primeiro_audio", self._inicio_resposta, agora)
+                self._inicio_resposta = None
+        self._publicar_metricas()
+
+    def _publicar_metricas(self):
+        self.metricas_atualizadas.emit(self.metricas())
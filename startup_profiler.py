@@ -0,0 +1,55 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Marca o início do processo o mais cedo possível: main.py importa este módulo primeiro
+_INICIO = time.perf_counter()
+
+
+class PerfilInicializacao:
+    """Mede quanto tempo cada fase da inicialização leva.
+
+    `fase(nome)` cronometra um bloco; `marcar(nome)` registra um instante
+    (ex.: janela visível) em relação ao início do processo. Fases que rodam em
+    segundo plano também podem ser registradas, de qualquer thread.
+    """
+
+    def __init__(self, inicio=None):
+        self.inicio = _INICIO if inicio is None else inicio
+        self._fases = []
+        self._marcos = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def fase(self, nome):
+        comeco = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - comeco
+            with self._lock:
+                self._fases.append((nome, comeco - self.inicio, duracao, threading.current_thread().name))
+
+    def marcar(self, nome):
+        with self._lock:
+            self._marcos.append((nome, time.perf_counter() - self.inicio))
+
+    def fases(self):
+        with self._lock:
+            return list(self._fases)
+
+    def relatorio(self):
+        """Texto com as fases em ordem de início e os marcos"""
+        with self._lock:
+            fases = sorted(self._fases, key=lambda f: f[1])
+            marcos = list(self._marcos)
+        linhas = ["Inicialização:"]
+        for nome, comeco, duracao, thread in fases:
+            origem = "" if thread == "MainThread" else f" [{thread}]"
+            linhas.append(f"  {nome:<28} {duracao * 1000:8.1f} ms (em {comeco * 1000:.0f} ms){origem}")
+        for nome, instante in marcos:
+            linhas.append(f"  >> {nome:<25} {instante * 1000:8.1f} ms")
+        return "\n".join(linhas)
+
+
+perfil_inicializacao = PerfilInicializacao()
@@ -0,0 +1,197 @@
+"""Servidor local compatível com a API de chat da OpenAI, para testes de carga sem rede.
+
+Responde POST /v1/chat/completions com ou sem streaming (SSE), com latência
+configurável até o primeiro trecho e entre trechos, e pode devolver erros
+429/503 numa fração das requisições para exercitar as retentativas.
+
+Uso: python stub_llm_server.py [--porta 8765] [--latencia 0.3] [--intervalo 0.02]
+Depois aponte o assistente para ele com OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPOSTA_PADRAO = (
+    "Claro! Aqui vai uma resposta de teste do servidor local. Ela chega em trechos, "
+    "como a API real, para medir o tempo até o primeiro trecho e a latência total."
+)
+
+
+class ServidorLLMFalso:
+    """Servidor em segundo plano; `url` é a base_url para o cliente (termina em /v1)"""
+
+    def __init__(self, host="127.0.0.1", porta=0, latencia=0.3, variacao=0.0, intervalo=0.02,
+                 resposta=RESPOSTA_PADRAO, taxa_erro=0.0, semente=None):
+        self.latencia = latencia
+        self.variacao = variacao
+        self.intervalo = intervalo
+        self.resposta = resposta
+        self.taxa_erro = taxa_erro
+        self._aleatorio = random.Random(semente)
+        self._lock = threading.Lock()
+        self.requisicoes = 0
+        self.erros_injetados = 0
+        self.conexoes = 0
+        self._servidor = ThreadingHTTPServer((host, porta), self._criar_manipulador())
+        self._servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}/v1"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name="llm-falso", daemon=True)
+        self._thread.start()
+        return self
+
+    def encerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def servir(self):
+        """Roda no thread atual até Ctrl+C"""
+        try:
+            self._servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._servidor.server_close()
+
+    def _sortear(self):
+        """(espera até o primeiro trecho, código de erro ou None)"""
+        with self._lock:
+            self.requisicoes += 1
+            espera = max(0.0, self.latencia + self._aleatorio.uniform(-self.variacao, self.variacao))
+            erro = None
+            if self.taxa_erro and self._aleatorio.random() < self.taxa_erro:
+                self.erros_injetados += 1
+                erro = self._aleatorio.choice((429, 503))
+            return espera, erro
+
+    def _trechos(self):
+        # Palavra a palavra, com o espaço junto, como os tokens da API real
+        palavras = self.resposta.split(" ")
+        return [palavra + (" " if i < len(palavras) - 1 else "") for i, palavra in enumerate(palavras)]
+
+    def _criar_manipulador(self):
+        servidor = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            # HTTP/1.1 mantém a conexão aberta entre requisições, como a API real
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with servidor._lock:
+                    servidor.conexoes += 1
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (ConnectionResetError, BrokenPipeError):
+                    pass  # Cliente fechou a conexão keep-alive
+
+            def log_message(self, formato, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._json(200, {"object": "list", "data": [{"id": "falso", "object": "model"}]})
+                else:
+                    self._json(404, {"error": {"message": "não encontrado", "type": "invalid_request_error"}})
+
+            def do_POST(self):
+                tamanho = int(self.headers.get("Content-Length", 0))
+                try:
+                    corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+                except ValueError:
+                    self._json(400, {"error": {"message": "JSON inválido", "type": "invalid_request_error"}})
+                    return
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._json(404, {"error": {"message": "não encontrado", "type": "invalid_request_error"}})
+                    return
+
+                espera, erro = servidor._sortear()
+                time.sleep(espera)
+                if erro is not None:
+                    self._json(erro, {"error": {"message": "erro injetado pelo servidor falso",
+                                                "type": "rate_limit_error" if erro == 429 else "server_error"}},
+                               {"Retry-After": "0"})
+                    return
+
+                modelo = corpo.get("model", "falso")
+                identificador = f"chatcmpl-{servidor.requisicoes}"
+                if corpo.get("stream"):
+                    self._transmitir(identificador, modelo)
+                else:
+                    self._json(200, {
+                        "id": identificador,
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": modelo,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": servidor.resposta}}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": len(servidor._trechos()),
+                                  "total_tokens": len(servidor._trechos())}
+                    })
+
+            def _json(self, codigo, dados, cabecalhos=None):
+                conteudo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(conteudo)))
+                for nome, valor in (cabecalhos or {}).items():
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(conteudo)
+
+            def _transmitir(self, identificador, modelo):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                # Tamanho desconhecido: chunked mantém a conexão reaproveitável
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                base = {"id": identificador, "object": "chat.completion.chunk",
+                        "created": int(time.time()), "model": modelo}
+                for i, trecho in enumerate(servidor._trechos()):
+                    if i:
+                        time.sleep(servidor.intervalo)
+                    delta = {"content": trecho} if i else {"role": "assistant", "content": trecho}
+                    self._evento({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                self._evento({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                self._enviar_bloco(b"data: [DONE]\n\n")
+                self._enviar_bloco(b"")
+
+            def _evento(self, dados):
+                self._enviar_bloco(f"data: {json.dumps(dados, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+            def _enviar_bloco(self, dados):
+                self.wfile.write(f"{len(dados):X}\r\n".encode("ascii") + dados + b"\r\n")
+                self.wfile.flush()
+
+        return Manipulador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local compatível com /v1/chat/completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.3, help="segundos até o primeiro trecho")
+    parser.add_argument("--variacao", type=float, default=0.0, help="variação aleatória (±) da latência")
+    parser.add_argument("--intervalo", type=float, default=0.02, help="segundos entre trechos do streaming")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração das requisições que recebe 429/503")
+    args = parser.parse_args()
+    servidor = ServidorLLMFalso(args.host, args.porta, args.latencia, args.variacao, args.intervalo,
+                                taxa_erro=args.taxa_erro)
+    print(f"Servidor LLM falso em {servidor.url} (Ctrl+C para sair)")
+    servidor.servir()
+
+
+if __name__ == "__main__":
+    main()
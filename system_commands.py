@@ -1,24 +1,37 @@
 import os
 import subprocess
-import pyautogui
-import psutil
-import keyboard
-import json
-import requests
-from bs4 import BeautifulSoup
-from googlesearch import search
-import wikipedia
 import webbrowser
-from datetime import datetime
-import win32gui
-import win32con
-import win32process
-import time
+from datetime import datetime, timedelta
+from system_metrics import obter_servico_metricas
+from process_ranking import RankingProcessos
+
+# pyautogui, requests e o serviço da Wikipedia são importados no primeiro uso:
+# carregá-los na inicialização atrasava a abertura da janela
+
+# Confirmações fixas dos comandos (também pré-renderizadas no cache de voz)
+CONFIRMACOES = {
+    "aumentar": "Aumentando o volume...",
+    "diminuir": "Diminuindo o volume...",
+    "mudo": "Alternando mudo...",
+    "minimizar": "Minimizando todas as janelas...",
+    "alternar": "Alternando janelas..."
+}
 
 class SystemController:
-    def __init__(self):
+    def __init__(self, agendador=None):
+        # Lembretes são gravados e disparados pelo AgendadorLembretes
+        self.agendador = agendador
         self.app_paths = self.load_app_paths()
         self.weather_api_key = os.getenv('WEATHER_API_KEY')
+        self._wikipedia = None
+        self._ranking = None
+
+    @property
+    def wikipedia(self):
+        if self._wikipedia is None:
+            from wikipedia_service import obter_servico_wikipedia
+            self._wikipedia = obter_servico_wikipedia()
+        return self._wikipedia
         
     def load_app_paths(self):
         """Carrega os caminhos dos aplicativos comuns"""
@@ -65,29 +78,30 @@ class SystemController:
 
     def controlar_volume(self, acao):
         """Controla o volume do sistema"""
+        import pyautogui
         if acao == "aumentar":
             pyautogui.press("volumeup", 5)
-            return "Aumentando o volume..."
+            return CONFIRMACOES["aumentar"]
         elif acao == "diminuir":
             pyautogui.press("volumedown", 5)
-            return "Diminuindo o volume..."
+            return CONFIRMACOES["diminuir"]
         elif acao == "mudo":
             pyautogui.press("volumemute")
-            return "Alternando mudo..."
+            return CONFIRMACOES["mudo"]
 
     def obter_info_sistema(self):
         """Obtém informações do sistema"""
-        cpu = psutil.cpu_percent()
-        memoria = psutil.virtual_memory().percent
-        disco = psutil.disk_usage('/').percent
+        # Lê do serviço compartilhado: chamar cpu_percent() aqui zeraria a linha de base dele
+        info = obter_servico_metricas().atual()
         return {
-            'cpu': cpu,
-            'memoria': memoria,
-            'disco': disco
+            'cpu': info['cpu'],
+            'memoria': info['ram'],
+            'disco': info['disk']
         }
 
     def capturar_tela(self, nome_arquivo=None):
         """Captura a tela atual"""
+        import pyautogui
         if not nome_arquivo:
             nome_arquivo = f"captura_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
         screenshot = pyautogui.screenshot()
@@ -96,6 +110,7 @@ class SystemController:
 
     def controlar_midia(self, acao):
         """Controla reprodução de mídia"""
+        import pyautogui
         acoes = {
             "play": "playpause",
             "pause": "playpause",
@@ -109,12 +124,13 @@ class SystemController:
 
     def pesquisar_wikipedia(self, query, lang='pt'):
         """Pesquisa um termo na Wikipedia"""
-        wikipedia.set_lang(lang)
         try:
-            resultado = wikipedia.summary(query, sentences=3)
-            return resultado
-        except:
-            return "Não encontrei informações sobre isso na Wikipedia."
+            resultado = self.wikipedia.consultar(query, lang=lang)
+            if resultado:
+                return resultado['resumo']
+        except Exception:
+            pass
+        return "Não encontrei informações sobre isso na Wikipedia."
 
     def obter_clima(self, cidade):
         if not self.weather_api_key:
@@ -129,6 +145,7 @@ class SystemController:
         }
         
         try:
+            import requests
             response = requests.get(base_url, params=params)
             data = response.json()
             
@@ -147,12 +164,9 @@ Umidade: {data['main']['humidity']}%
 
     def criar_lembrete(self, texto, tempo_minutos):
         """Cria um lembrete com notificação"""
-        def notificar():
-            time.sleep(tempo_minutos * 60)
-            pyautogui.alert(texto, "Lembrete")
-        
-        import threading
-        threading.Thread(target=notificar, daemon=True).start()
+        if self.agendador is None:
+            return "Os lembretes ainda não estão disponíveis."
+        self.agendador.agendar(texto, datetime.now() + timedelta(minutes=tempo_minutos))
         return f"Lembrete criado: {texto} (em {tempo_minutos} minutos)"
 
     def executar_comando(self, comando):
@@ -163,26 +177,28 @@ Umidade: {data['main']['humidity']}%
         except Exception as e:
             return f"Erro ao executar comando: {str(e)}"
 
-    def listar_processos(self):
-        """Lista os processos em execução"""
-        processos = []
-        for proc in psutil.process_iter(['pid', 'name', 'memory_percent']):
-            try:
-                processos.append({
-                    'pid': proc.info['pid'],
-                    'nome': proc.info['name'],
-                    'memoria': f"{proc.info['memory_percent']:.1f}%"
-                })
-            except:
-                pass
-        return processos[:10]  # Retorna os 10 primeiros processos
+    def listar_processos(self, n=10, por='memoria'):
+        """Lista os n processos que mais usam memória ou CPU"""
+        if self._ranking is None:
+            self._ranking = RankingProcessos()
+        return [
+            {
+                'pid': proc['pid'],
+                'nome': proc['nome'],
+                'memoria': f"{proc['memoria']:.1f}%",
+                'cpu': f"{proc['cpu']:.1f}%"
+            }
+            for proc in self._ranking.top(n, por)
+        ]
 
     def minimizar_janelas(self):
         """Minimiza todas as janelas"""
+        import pyautogui
         pyautogui.hotkey('win', 'd')
-        return "Minimizando todas as janelas..."
+        return CONFIRMACOES["minimizar"]
 
     def alternar_janela(self):
         """Alterna entre janelas abertas"""
+        import pyautogui
         pyautogui.hotkey('alt', 'tab')
-        return "Alternando janelas..."
+        return CONFIRMACOES["alternar"]
@@ -0,0 +1,222 @@
+import math
+import threading
+import time
+from array import array
+import psutil
+
+METRICAS = ('cpu', 'ram', 'disk')
+
+
+class BufferCircular:
+    """Histórico de tamanho fixo de uma métrica, guardado em arrays de doubles.
+
+    As consultas percorrem o buffer no lugar; o percentil usa uma área de
+    trabalho pré-alocada, então nenhuma consulta aloca memória proporcional
+    ao histórico.
+    """
+
+    def __init__(self, capacidade=3600):
+        self.capacidade = capacidade
+        self._instantes = array('d', bytes(8 * capacidade))
+        self._valores = array('d', bytes(8 * capacidade))
+        self._trabalho = array('d', bytes(8 * capacidade))
+        self._proximo = 0
+        self._tamanho = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._tamanho
+
+    def adicionar(self, instante, valor):
+        with self._lock:
+            self._instantes[self._proximo] = instante
+            self._valores[self._proximo] = valor
+            self._proximo = (self._proximo + 1) % self.capacidade
+            self._tamanho = min(self._tamanho + 1, self.capacidade)
+
+    def estatisticas(self, segundos, agora=None):
+        """min, max, média e número de amostras dos últimos `segundos`, ou None se vazio"""
+        with self._lock:
+            inicio, quantidade = self._janela(segundos, agora)
+            if not quantidade:
+                return None
+            valores, capacidade = self._valores, self.capacidade
+            minimo = maximo = valores[inicio]
+            soma = 0.0
+            for i in range(quantidade):
+                valor = valores[(inicio + i) % capacidade]
+                soma += valor
+                if valor < minimo:
+                    minimo = valor
+                elif valor > maximo:
+                    maximo = valor
+            return {'min': minimo, 'max': maximo, 'media': soma / quantidade, 'amostras': quantidade}
+
+    def percentil(self, p, segundos, agora=None):
+        """Percentil p (0 a 100) dos últimos `segundos`, pelo método do posto mais próximo"""
+        with self._lock:
+            inicio, quantidade = self._janela(segundos, agora)
+            if not quantidade:
+                return None
+            trabalho, valores, capacidade = self._trabalho, self._valores, self.capacidade
+            for i in range(quantidade):
+                trabalho[i] = valores[(inicio + i) % capacidade]
+            posto = min(quantidade - 1, max(0, math.ceil(p / 100 * quantidade) - 1))
+            return self._selecionar(trabalho, quantidade, posto)
+
+    def _janela(self, segundos, agora):
+        """Índice da amostra mais antiga dentro da janela e quantas amostras ela tem"""
+        if not self._tamanho:
+            return 0, 0
+        limite = (time.monotonic() if agora is None else agora) - segundos
+        mais_antiga = (self._proximo - self._tamanho) % self.capacidade
+        # Os instantes crescem em ordem circular: busca binária pela primeira amostra na janela
+        baixo, alto = 0, self._tamanho
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            if self._instantes[(mais_antiga + meio) % self.capacidade] < limite:
+                baixo = meio + 1
+            else:
+                alto = meio
+        return (mais_antiga + baixo) % self.capacidade, self._tamanho - baixo
+
+    @staticmethod
+    def _selecionar(valores, quantidade, k):
+        """k-ésimo menor valor (quickselect no lugar, sobre os primeiros `quantidade` itens)"""
+        esquerda, direita = 0, quantidade - 1
+        while esquerda < direita:
+            pivo = valores[(esquerda + direita) // 2]
+            i, j = esquerda, direita
+            while i <= j:
+                while valores[i] < pivo:
+                    i += 1
+                while valores[j] > pivo:
+                    j -= 1
+                if i <= j:
+                    valores[i], valores[j] = valores[j], valores[i]
+                    i += 1
+                    j -= 1
+            if k <= j:
+                direita = j
+            elif k >= i:
+                esquerda = i
+            else:
+                break
+        return valores[k]
+
+
+class ServicoMetricas:
+    """Amostra CPU, RAM e disco numa única thread para todo o processo.
+
+    O intervalo começa em `intervalo_min` e cresce até `intervalo_max`
+    enquanto os valores ficam estáveis. Os assinantes só são chamados quando
+    alguma métrica muda pelo menos `limiar` pontos percentuais desde a última
+    notificação. Como só este serviço chama `psutil.cpu_percent()`, a linha de
+    base da CPU não é zerada por outros leitores.
+    """
+
+    def __init__(self, intervalo_min=1.0, intervalo_max=5.0, limiar=1.0, capacidade=3600):
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        self.limiar = limiar
+        self.historico = {nome: BufferCircular(capacidade) for nome in METRICAS}
+        self.intervalo = intervalo_min
+        self._assinantes = []
+        self._ultima = None
+        self._notificada = None
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is not None:
+                return self
+            psutil.cpu_percent()  # Linha de base para a primeira leitura
+            self._thread = threading.Thread(target=self._executar, name="metricas", daemon=True)
+            self._thread.start()
+        return self
+
+    def encerrar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def assinar(self, callback):
+        """Registra callback(info); ele é chamado na thread do serviço"""
+        with self._lock:
+            self._assinantes.append(callback)
+            atual = self._ultima
+        if atual is not None:
+            callback(dict(atual))
+
+    def cancelar_assinatura(self, callback):
+        with self._lock:
+            if callback in self._assinantes:
+                self._assinantes.remove(callback)
+
+    def atual(self):
+        """Última amostra; amostra na hora se o serviço ainda não leu nada"""
+        with self._lock:
+            if self._ultima is not None:
+                return dict(self._ultima)
+        return self._amostrar()
+
+    def estatisticas(self, metrica, minutos=5):
+        return self.historico[metrica].estatisticas(minutos * 60)
+
+    def percentil(self, metrica, p, minutos=5):
+        return self.historico[metrica].percentil(p, minutos * 60)
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                info = self._amostrar()
+            except Exception as e:
+                print(f"Erro no monitoramento: {e}")
+                self.intervalo = self.intervalo_max
+                continue
+            agora = time.monotonic()
+            for nome in METRICAS:
+                self.historico[nome].adicionar(agora, info[nome])
+
+            with self._lock:
+                self._ultima = info
+                mudou = self._notificada is None or any(
+                    abs(info[nome] - self._notificada[nome]) >= self.limiar for nome in METRICAS
+                )
+                if mudou:
+                    self._notificada = info
+                assinantes = list(self._assinantes) if mudou else []
+
+            # Valores estáveis: amostra com menos frequência; mudança: volta ao mínimo
+            if mudou:
+                self.intervalo = self.intervalo_min
+            else:
+                self.intervalo = min(self.intervalo * 1.5, self.intervalo_max)
+            for callback in assinantes:
+                try:
+                    callback(dict(info))
+                except Exception as e:
+                    print(f"Erro ao notificar métricas: {e}")
+
+    @staticmethod
+    def _amostrar():
+        return {
+            'cpu': psutil.cpu_percent(),
+            'ram': psutil.virtual_memory().percent,
+            'disk': psutil.disk_usage('/').percent
+        }
+
+
+_servico = None
+_servico_lock = threading.Lock()
+
+
+def obter_servico_metricas():
+    """Serviço de métricas compartilhado, iniciado no primeiro uso"""
+    global _servico
+    with _servico_lock:
+        if _servico is None:
+            _servico = ServicoMetricas().iniciar()
+        return _servico
@@ -0,0 +1,232 @@
+import json
+import os
+import threading
+import time
+from array import array
+from collections import deque
+from contextlib import nullcontext
+
+# Precisão dos histogramas: 64 subfaixas por potência de 2 (erro relativo < 1,6%)
+_BITS_SUBFAIXA = 6
+_SUBFAIXAS = 1 << _BITS_SUBFAIXA
+# Valores em microssegundos até 2^36 µs (~19 h); acima disso caem na última faixa
+_MAX_EXPOENTE = 36 - _BITS_SUBFAIXA
+
+
+class HistogramaLatencia:
+    """Histograma de latências no estilo HDR: memória fixa e percentis em O(faixas).
+
+    Abaixo de 128 µs cada microssegundo tem a sua faixa; acima, cada potência
+    de 2 é dividida em 64 subfaixas, então o erro relativo de um percentil
+    fica abaixo de 1,6% em qualquer escala. Registrar é O(1), sem alocação.
+    """
+
+    TAMANHO = 2 * _SUBFAIXAS + _MAX_EXPOENTE * _SUBFAIXAS
+
+    def __init__(self):
+        self._contagens = array('Q', bytes(8 * self.TAMANHO))
+        self._lock = threading.Lock()
+        self.contagem = 0
+        self.soma = 0
+        self.minimo = None
+        self.maximo = 0
+
+    @staticmethod
+    def _indice(micros):
+        if micros < 2 * _SUBFAIXAS:
+            return micros
+        expoente = min(micros.bit_length() - _BITS_SUBFAIXA - 1, _MAX_EXPOENTE)
+        mantissa = min(micros >> expoente, 2 * _SUBFAIXAS - 1)
+        return _SUBFAIXAS + expoente * _SUBFAIXAS + (mantissa - _SUBFAIXAS)
+
+    @staticmethod
+    def _valor(indice):
+        """Valor representativo (meio da faixa), em microssegundos"""
+        if indice < 2 * _SUBFAIXAS:
+            return indice
+        expoente, resto = divmod(indice - _SUBFAIXAS, _SUBFAIXAS)
+        return ((_SUBFAIXAS + resto) << expoente) + (1 << expoente) // 2
+
+    def registrar(self, segundos):
+        micros = max(0, int(segundos * 1_000_000))
+        indice = self._indice(micros)
+        with self._lock:
+            self._contagens[indice] += 1
+            self.contagem += 1
+            self.soma += micros
+            if self.minimo is None or micros < self.minimo:
+                self.minimo = micros
+            if micros > self.maximo:
+                self.maximo = micros
+
+    def percentil(self, p):
+        """Latência (em segundos) abaixo da qual estão p% dos registros, ou None"""
+        return self.percentis((p,))[0]
+
+    def percentis(self, ps):
+        """Vários percentis (em segundos) numa única passada pelas faixas"""
+        with self._lock:
+            if not self.contagem:
+                return tuple(None for _ in ps)
+            alvos = sorted((max(1, -(-self.contagem * p // 100)), posicao) for posicao, p in enumerate(ps))
+            resultado = [self.maximo / 1_000_000] * len(ps)
+            # Só as faixas entre o mínimo e o máximo vistos podem ter registros
+            primeira = self._indice(self.minimo)
+            faixas = self._contagens[primeira:self._indice(self.maximo) + 1]
+            proximo = 0
+            acumulado = 0
+            for deslocamento, quantidade in enumerate(faixas):
+                if not quantidade:
+                    continue
+                acumulado += quantidade
+                while proximo < len(alvos) and acumulado >= alvos[proximo][0]:
+                    # O valor real nunca passa do máximo visto
+                    valor = min(self._valor(primeira + deslocamento), self.maximo)
+                    resultado[alvos[proximo][1]] = valor / 1_000_000
+                    proximo += 1
+                if proximo == len(alvos):
+                    break
+            return tuple(resultado)
+
+    def resumo(self):
+        p50, p95, p99 = self.percentis((50, 95, 99))
+        with self._lock:
+            if not self.contagem:
+                return {'contagem': 0}
+            return {
+                'contagem': self.contagem,
+                'media_ms': self.soma / self.contagem / 1000,
+                'min_ms': self.minimo / 1000,
+                'p50_ms': p50 * 1000,
+                'p95_ms': p95 * 1000,
+                'p99_ms': p99 * 1000,
+                'max_ms': self.maximo / 1000
+            }
+
+    def limpar(self):
+        with self._lock:
+            for indice in range(self.TAMANHO):
+                self._contagens[indice] = 0
+            self.contagem = self.soma = self.maximo = 0
+            self.minimo = None
+
+
+class _Trecho:
+    # Classe em vez de @contextmanager: entrar e sair custa bem menos que um gerador
+    __slots__ = ('rastreador', 'nome', 'args', 'inicio')
+
+    def __init__(self, rastreador, nome, args):
+        self.rastreador = rastreador
+        self.nome = nome
+        self.args = args
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.rastreador.registrar(self.nome, self.inicio, time.perf_counter(), self.args)
+        return False
+
+
+class Rastreador:
+    """Trechos (spans) cronometrados de cada etapa de uma mensagem.
+
+    Cada trecho alimenta o histograma da sua etapa e entra num buffer circular
+    com os mais recentes, que pode ser exportado como JSON ou no formato do
+    Chrome (chrome://tracing, Perfetto). Com o rastreamento desligado,
+    `trecho` devolve um contexto vazio compartilhado.
+    """
+
+    def __init__(self, ativo=True, max_trechos=20000):
+        self.ativo = ativo
+        self._histogramas = {}
+        self._trechos = deque(maxlen=max_trechos)
+        self._lock = threading.Lock()
+        self._nulo = nullcontext()
+
+    def trecho(self, nome, **args):
+        """Cronometra um bloco: `with rastreador.trecho("etapa"):`"""
+        if not self.ativo:
+            return self._nulo
+        return _Trecho(self, nome, args)
+
+    def registrar(self, nome, inicio, fim, args=None):
+        """Registra um trecho medido fora de um `with` (ex.: entre dois sinais)"""
+        if not self.ativo:
+            return
+        histograma = self._histogramas.get(nome)
+        if histograma is None:
+            with self._lock:
+                histograma = self._histogramas.setdefault(nome, HistogramaLatencia())
+        histograma.registrar(fim - inicio)
+        thread = threading.current_thread()
+        # deque.append é atômico; não precisa do lock
+        self._trechos.append((nome, inicio, fim - inicio, thread.ident, thread.name, args or None))
+
+    def percentis(self, nome, ps=(50, 95)):
+        """Percentis (em segundos) de uma etapa; None se ela ainda não foi medida"""
+        histograma = self._histogramas.get(nome)
+        if histograma is None or not histograma.contagem:
+            return None
+        return histograma.percentis(ps)
+
+    def etapas(self):
+        with self._lock:
+            return sorted(self._histogramas)
+
+    def resumo(self):
+        """{etapa: contagem, média, mínimo, p50, p95, p99 e máximo em ms}"""
+        with self._lock:
+            histogramas = dict(self._histogramas)
+        return {nome: histograma.resumo() for nome, histograma in sorted(histogramas.items())}
+
+    def trechos(self):
+        return list(self._trechos)
+
+    def limpar(self):
+        with self._lock:
+            self._histogramas.clear()
+        self._trechos.clear()
+
+    def exportar_json(self, caminho):
+        """Grava o resumo dos histogramas e os trechos recentes"""
+        dados = {
+            'etapas': self.resumo(),
+            'trechos': [
+                {'nome': nome, 'inicio_ms': inicio * 1000, 'duracao_ms': duracao * 1000,
+                 'thread': nome_thread, 'args': args}
+                for nome, inicio, duracao, _, nome_thread, args in self.trechos()
+            ]
+        }
+        self._gravar(caminho, dados)
+        return caminho
+
+    def exportar_chrome(self, caminho):
+        """Grava os trechos recentes no formato Trace Event (abre em chrome://tracing ou no Perfetto)"""
+        pid = os.getpid()
+        eventos = []
+        threads = {}
+        for nome, inicio, duracao, ident, nome_thread, args in self.trechos():
+            threads[ident] = nome_thread
+            evento = {'name': nome, 'cat': nome.split('/')[0], 'ph': 'X', 'pid': pid, 'tid': ident,
+                      'ts': inicio * 1_000_000, 'dur': duracao * 1_000_000}
+            if args:
+                evento['args'] = args
+            eventos.append(evento)
+        for ident, nome_thread in threads.items():
+            eventos.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': ident,
+                            'args': {'name': nome_thread}})
+        self._gravar(caminho, {'traceEvents': eventos, 'displayTimeUnit': 'ms'})
+        return caminho
+
+    @staticmethod
+    def _gravar(caminho, dados):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(dados, arquivo, ensure_ascii=False, default=str)
+
+
+rastreador = Rastreador(ativo=os.getenv("ED_RASTREAMENTO", "1") != "0")
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import wave
+
+try:
+    import winsound
+except ImportError:
+    winsound = None
+
+
+class CacheAudio:
+    """Cache em disco de frases já sintetizadas.
+
+    Cada frase é renderizada uma vez com `save_to_file` e guardada em
+    voz/<sha256>.wav, com a chave formada pelo texto, id da voz, velocidade e
+    volume. O total em disco respeita um orçamento de bytes, removendo os
+    arquivos usados há mais tempo (a data de modificação marca o último uso).
+    """
+
+    def __init__(self, cache_dir='cache', orcamento_bytes=20 * 1024 * 1024):
+        self.dir_audio = os.path.join(cache_dir, 'voz')
+        os.makedirs(self.dir_audio, exist_ok=True)
+        self.orcamento_bytes = orcamento_bytes
+        self._lock = threading.Lock()
+        self._arquivos = {}
+        self.carregar_indice()
+
+    def carregar_indice(self):
+        """Lista os áudios já renderizados em disco"""
+        for nome in os.listdir(self.dir_audio):
+            caminho = os.path.join(self.dir_audio, nome)
+            if nome.endswith('.tmp'):
+                # Sobra de uma renderização interrompida
+                self._remover_arquivo(caminho)
+            elif nome.endswith('.wav'):
+                try:
+                    self._arquivos[nome[:-4]] = (os.path.getsize(caminho), os.path.getmtime(caminho))
+                except OSError:
+                    pass
+
+    @staticmethod
+    def chave(texto, voz, velocidade, volume):
+        dados = json.dumps([texto, voz, velocidade, volume], ensure_ascii=False)
+        return hashlib.sha256(dados.encode('utf-8')).hexdigest()
+
+    def contem(self, chave):
+        with self._lock:
+            return chave in self._arquivos
+
+    def obter(self, chave):
+        """Retorna o caminho do áudio da chave, ou None se não estiver no cache"""
+        with self._lock:
+            entrada = self._arquivos.get(chave)
+            if entrada is None:
+                return None
+            agora = time.time()
+            self._arquivos[chave] = (entrada[0], agora)
+        caminho = self._caminho(chave)
+        try:
+            os.utime(caminho, (agora, agora))
+        except OSError:
+            with self._lock:
+                self._arquivos.pop(chave, None)
+            return None
+        return caminho
+
+    def renderizar(self, engine, texto, chave):
+        """Sintetiza o texto para o cache; deve rodar na thread dona do engine"""
+        descritor, temporario = tempfile.mkstemp(dir=self.dir_audio, suffix='.tmp')
+        os.close(descritor)
+        try:
+            engine.save_to_file(texto, temporario)
+            engine.runAndWait()
+            tamanho = os.path.getsize(temporario)
+            if not tamanho:
+                raise OSError("arquivo de áudio vazio")
+            os.replace(temporario, self._caminho(chave))
+        except Exception:
+            self._remover_arquivo(temporario)
+            raise
+        with self._lock:
+            self._arquivos[chave] = (tamanho, time.time())
+        self._aplicar_orcamento()
+        return self._caminho(chave)
+
+    def tamanho_total(self):
+        with self._lock:
+            return sum(tamanho for tamanho, _ in self._arquivos.values())
+
+    def limpar(self):
+        with self._lock:
+            chaves = list(self._arquivos)
+            self._arquivos.clear()
+        for chave in chaves:
+            self._remover_arquivo(self._caminho(chave))
+
+    def _aplicar_orcamento(self):
+        """Remove os áudios usados há mais tempo até caber no orçamento"""
+        with self._lock:
+            total = sum(tamanho for tamanho, _ in self._arquivos.values())
+            if total <= self.orcamento_bytes:
+                return
+            removidas = []
+            for chave in sorted(self._arquivos, key=lambda c: self._arquivos[c][1]):
+                if total <= self.orcamento_bytes:
+                    break
+                total -= self._arquivos.pop(chave)[0]
+                removidas.append(chave)
+        for chave in removidas:
+            self._remover_arquivo(self._caminho(chave))
+
+    def _caminho(self, chave):
+        return os.path.join(self.dir_audio, chave + '.wav')
+
+    @staticmethod
+    def _remover_arquivo(caminho):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+
+def reproducao_disponivel():
+    """Tocar arquivos direto só é possível onde há winsound (Windows)"""
+    return winsound is not None
+
+
+def duracao_wav(caminho):
+    """Duração do arquivo WAV em segundos, ou None se não der para ler"""
+    try:
+        with wave.open(caminho, 'rb') as arquivo:
+            return arquivo.getnframes() / float(arquivo.getframerate())
+    except (OSError, EOFError, wave.Error, ZeroDivisionError):
+        return None
+
+
+def tocar_wav(caminho):
+    """Começa a tocar o arquivo sem bloquear"""
+    winsound.PlaySound(caminho, winsound.SND_FILENAME | winsound.SND_ASYNC | winsound.SND_NODEFAULT)
+
+
+def parar_reproducao():
+    if winsound is not None:
+        winsound.PlaySound(None, 0)
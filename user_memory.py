@@ -1,17 +1,30 @@
 import json
 import os
-from datetime import datetime, time
-import sqlite3
+import heapq
+import itertools
+from datetime import datetime, time, timedelta
+import threading
+from types import MappingProxyType
+from database import obter_gerenciador
+from recurrence import ExpansorRecorrencias, interpretar_data_hora, interpretar_dias
 
 class MemoriaUsuario:
     def __init__(self, db_path='assistente.db'):
         self.db_path = db_path
+        self.db = obter_gerenciador(db_path)
+        # Versão do perfil: muda a cada escrita que o afeta
+        self.versao = 0
+        self._perfil = None
+        self._lock_perfil = threading.Lock()
+        # Versão dos horários: invalida o expansor de recorrências
+        self.versao_horarios = 0
+        self._recorrencias = (None, None)
         self.setup_database()
         self.carregar_memoria()
         
     def setup_database(self):
         """Configura o banco de dados para armazenar memórias e horários"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.db.conexao()
         cursor = conn.cursor()
         
         # Tabela de informações do usuário
@@ -35,6 +48,11 @@ class MemoriaUsuario:
                 notificar BOOLEAN
             )
         ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_horarios_data_hora ON horarios (data_hora)")
+        # Índice parcial só com as regras recorrentes, lidas inteiras a cada consulta
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_horarios_recorrentes ON horarios (data_hora) WHERE recorrente"
+        )
         
         # Tabela de tópicos de interesse
         cursor.execute('''
@@ -58,12 +76,10 @@ class MemoriaUsuario:
         ''')
         
         conn.commit()
-        conn.close()
     
     def carregar_memoria(self):
         """Carrega as informações básicas do usuário"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.db.conexao().cursor()
         
         cursor.execute("SELECT chave, valor FROM usuario_info")
         self.info = dict(cursor.fetchall())
@@ -76,84 +92,150 @@ class MemoriaUsuario:
                 "horario_trabalho_fim": "18:00",
                 "ultima_interacao": None
             }
-        
-        conn.close()
     
     def atualizar_info(self, chave, valor):
         """Atualiza uma informação do usuário"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+        self.info[chave] = valor
+        self.db.escrever("""
             INSERT OR REPLACE INTO usuario_info (chave, valor, ultima_atualizacao)
             VALUES (?, ?, ?)
         """, (chave, valor, datetime.now()))
-        
-        self.info[chave] = valor
-        conn.commit()
-        conn.close()
+        self._invalidar_perfil()
     
     def adicionar_horario(self, titulo, descricao, data_hora, recorrente=False, dias_semana=None, notificar=True):
-        """Adiciona um novo horário ou compromisso"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO horarios (titulo, descricao, data_hora, recorrente, dias_semana, notificar)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (titulo, descricao, data_hora, recorrente, dias_semana, notificar))
-        
-        conn.commit()
-        conn.close()
+        """Adiciona um novo horário ou compromisso e retorna o id"""
+        if isinstance(data_hora, datetime):
+            data_hora = data_hora.isoformat(' ', 'seconds')
+        with self.db.transacao() as conn:
+            cursor = conn.execute("""
+                INSERT INTO horarios (titulo, descricao, data_hora, recorrente, dias_semana, notificar)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (titulo, descricao, data_hora, recorrente, dias_semana, notificar))
+            id_horario = cursor.lastrowid
+        self.versao_horarios += 1
+        return id_horario
+
+    def remover_horario(self, id_horario):
+        self.db.escrever("DELETE FROM horarios WHERE id = ?", (id_horario,))
+        self.versao_horarios += 1
+
+    def marcar_notificado(self, id_horario):
+        """Desliga a notificação de um horário único que já foi avisado"""
+        self.db.escrever("UPDATE horarios SET notificar = 0 WHERE id = ?", (id_horario,))
+
+    def listar_horarios(self, apenas_notificar=True, lote=1000):
+        """Gera (id, titulo, descricao, data_hora, recorrente, dias_semana) dos horários"""
+        filtro = "WHERE notificar" if apenas_notificar else ""
+        self.db.aguardar_escritas()
+        cursor = self.db.conexao().execute(f"""
+            SELECT id, titulo, descricao, data_hora, recorrente, dias_semana
+            FROM horarios {filtro}
+        """)
+        while True:
+            linhas = cursor.fetchmany(lote)
+            if not linhas:
+                return
+            yield from linhas
     
-    def obter_proximos_compromissos(self, limite=5):
-        """Obtém os próximos compromissos"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT titulo, descricao, data_hora 
-            FROM horarios 
-            WHERE data_hora >= datetime('now')
+    def obter_proximos_compromissos(self, limite=5, dias=None):
+        """Obtém os próximos compromissos, incluindo as ocorrências dos recorrentes.
+
+        Os horários únicos vêm do índice em data_hora já ordenados; as regras
+        recorrentes geram suas ocorrências sob demanda (ExpansorRecorrencias) e
+        um heap intercala as duas sequências, então só são calculadas as
+        ocorrências que entram no resultado. Com `dias`, a janela termina
+        `dias` dias depois de agora. Retorna tuplas (titulo, descricao, data_hora).
+        """
+        agora = datetime.now()
+        ate = agora + timedelta(days=dias) if dias is not None else None
+        self.db.aguardar_escritas()
+        conn = self.db.conexao()
+
+        # Hora local, no mesmo formato gravado em adicionar_horario
+        # (datetime('now') do SQLite é UTC)
+        filtro_ate = "AND data_hora <= ?" if ate else ""
+        parametros = [agora.isoformat(' ', 'seconds')] + ([ate.isoformat(' ', 'seconds')] if ate else [])
+        unicos = conn.execute(f"""
+            SELECT titulo, descricao, data_hora
+            FROM horarios
+            WHERE data_hora >= ? {filtro_ate} AND NOT recorrente
             ORDER BY data_hora
             LIMIT ?
-        """, (limite,))
-        
-        compromissos = cursor.fetchall()
-        conn.close()
-        return compromissos
-    
+        """, parametros + [limite])
+        recorrentes = (
+            (quando, titulo, descricao)
+            for quando, (titulo, descricao) in self._expansor_recorrencias().ocorrencias(agora, ate)
+        )
+        proximos = heapq.merge(self._eventos_unicos(unicos), recorrentes, key=lambda evento: evento[0])
+        return [
+            (titulo, descricao, quando.isoformat(' ', 'seconds'))
+            for quando, titulo, descricao in itertools.islice(proximos, limite)
+        ]
+
+    def _expansor_recorrencias(self):
+        """Regras recorrentes já preparadas; refeitas só quando os horários mudam"""
+        with self._lock_perfil:
+            versao, expansor = self._recorrencias
+            if versao == self.versao_horarios:
+                return expansor
+            versao = self.versao_horarios
+        regras = []
+        for titulo, descricao, data_hora, dias_semana in self.db.conexao().execute("""
+            SELECT titulo, descricao, data_hora, dias_semana
+            FROM horarios
+            WHERE recorrente
+        """):
+            try:
+                regras.append((interpretar_data_hora(data_hora), interpretar_dias(dias_semana), (titulo, descricao)))
+            except (TypeError, ValueError):
+                continue
+        expansor = ExpansorRecorrencias(regras)
+        with self._lock_perfil:
+            self._recorrencias = (versao, expansor)
+        return expansor
+
+    @staticmethod
+    def _eventos_unicos(linhas):
+        for titulo, descricao, data_hora in linhas:
+            try:
+                yield interpretar_data_hora(data_hora), titulo, descricao
+            except (TypeError, ValueError):
+                continue
+
     def adicionar_interesse(self, topico, nivel_interesse=1):
         """Registra um novo tópico de interesse"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+        self.db.escrever("""
             INSERT OR REPLACE INTO interesses (topico, nivel_interesse, ultima_interacao)
             VALUES (?, ?, ?)
         """, (topico, nivel_interesse, datetime.now()))
-        
-        conn.commit()
-        conn.close()
+        self._invalidar_perfil()
     
     def atualizar_conhecimento_programacao(self, linguagem, framework=None, nivel_experiencia=1):
         """Atualiza o conhecimento de programação do usuário"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+        self.db.escrever("""
             INSERT OR REPLACE INTO conhecimento_programacao 
             (linguagem, framework, nivel_experiencia, ultima_interacao)
             VALUES (?, ?, ?, ?)
         """, (linguagem, framework, nivel_experiencia, datetime.now()))
-        
-        conn.commit()
-        conn.close()
+        self._invalidar_perfil()
+
+    def _invalidar_perfil(self):
+        with self._lock_perfil:
+            self.versao += 1
     
     def obter_perfil_completo(self):
-        """Retorna um perfil completo do usuário"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Retorna um perfil completo (e imutável) do usuário.
+
+        O resultado é reaproveitado enquanto nenhuma escrita mudar a versão.
+        """
+        perfil = self._perfil
+        if perfil is not None and perfil["versao"] == self.versao:
+            return perfil
+
+        versao = self.versao
+        # Garante que as escritas ainda na fila já estejam visíveis
+        self.db.aguardar_escritas()
+        cursor = self.db.conexao().cursor()
         
         # Obtém interesses
         cursor.execute("SELECT topico FROM interesses ORDER BY nivel_interesse DESC LIMIT 5")
@@ -163,13 +245,14 @@ class MemoriaUsuario:
         cursor.execute("SELECT linguagem, framework FROM conhecimento_programacao")
         programacao = cursor.fetchall()
         
-        conn.close()
-        
-        return {
-            "info_pessoal": self.info,
-            "interesses": interesses,
-            "conhecimento_programacao": programacao
-        }
+        perfil = MappingProxyType({
+            "versao": versao,
+            "info_pessoal": MappingProxyType(dict(self.info)),
+            "interesses": tuple(interesses),
+            "conhecimento_programacao": tuple(programacao)
+        })
+        self._perfil = perfil
+        return perfil
     
     def processar_mensagem(self, texto):
         """Processa uma mensagem para extrair informações relevantes"""
@@ -0,0 +1,81 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from http_cache import CacheHTTP
+from http_client import TIMEOUT_PADRAO, criar_sessao
+
+
+class ServicoWikipedia:
+    """Busca título, resumo e URL na Wikipedia com uma única requisição.
+
+    Usa a API do MediaWiki (generator=search + extracts + info), com o idioma
+    escolhido por chamada em vez do estado global da biblioteca wikipedia.
+    Os resultados são memorizados por idioma.
+    """
+
+    def __init__(self, cache_dir=os.path.join('cache', 'wikipedia'), sentencas=3, max_memo=256):
+        self.sentencas = sentencas
+        self.max_memo = max_memo
+        self.http = CacheHTTP(cache_dir, sessao=criar_sessao(), timeout=TIMEOUT_PADRAO)
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def consultar(self, query, lang='pt'):
+        """Retorna {'titulo', 'resumo', 'url'} do melhor resultado, ou None"""
+        if not re.fullmatch(r'[a-z]{2,3}(-[a-z]+)?', lang):
+            raise ValueError(f"Idioma inválido: {lang}")
+        termo = " ".join(query.lower().split())
+        with self._lock:
+            memo = self._memo.setdefault(lang, OrderedDict())
+            if termo in memo:
+                memo.move_to_end(termo)
+                return memo[termo]
+
+        resultado = self._buscar(query, lang)
+
+        with self._lock:
+            memo[termo] = resultado
+            if len(memo) > self.max_memo:
+                memo.popitem(last=False)
+        return resultado
+
+    def _buscar(self, query, lang):
+        params = {
+            'action': 'query',
+            'format': 'json',
+            'formatversion': 2,
+            'generator': 'search',
+            'gsrsearch': query,
+            'gsrlimit': 1,
+            'prop': 'extracts|info',
+            'inprop': 'url',
+            'exintro': 1,
+            'explaintext': 1,
+            'exsentences': self.sentencas,
+            'redirects': 1
+        }
+        texto = self.http.obter(f"https://{lang}.wikipedia.org/w/api.php", params=params)
+        paginas = json.loads(texto).get('query', {}).get('pages', [])
+        if not paginas:
+            return None
+        pagina = min(paginas, key=lambda p: p.get('index', 0))
+        return {
+            'titulo': pagina['title'],
+            'resumo': pagina.get('extract', ''),
+            'url': pagina['fullurl']
+        }
+
+
+_servico = None
+_lock_servico = threading.Lock()
+
+
+def obter_servico_wikipedia():
+    """Retorna o serviço compartilhado pelo assistente"""
+    global _servico
+    with _lock_servico:
+        if _servico is None:
+            _servico = ServicoWikipedia()
+        return _servico
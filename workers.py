@@ -0,0 +1,99 @@
+import itertools
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class TarefaCancelada(Exception):
+    """Levantada dentro de uma tarefa que foi cancelada"""
+
+
+class Tarefa(QRunnable):
+    """Executa uma função em uma thread do pool e devolve o resultado por sinais"""
+
+    def __init__(self, id_tarefa, funcao, executor):
+        super().__init__()
+        self.id = id_tarefa
+        self.funcao = funcao
+        self.executor = executor
+        self.cancelada = threading.Event()
+
+    def cancelar(self):
+        self.cancelada.set()
+
+    def verificar_cancelamento(self):
+        """Interrompe a tarefa se ela foi cancelada"""
+        if self.cancelada.is_set():
+            raise TarefaCancelada()
+
+    def emitir_trecho(self, texto):
+        """Envia um resultado parcial para a interface"""
+        self.verificar_cancelamento()
+        self.executor.trecho.emit(self.id, texto)
+
+    def run(self):
+        try:
+            if self.cancelada.is_set():
+                return
+            resultado = self.funcao(self)
+            if not self.cancelada.is_set():
+                self.executor.concluida.emit(self.id, resultado)
+        except TarefaCancelada:
+            pass
+        except Exception as e:
+            if not self.cancelada.is_set():
+                self.executor.erro.emit(self.id, str(e))
+        finally:
+            self.executor._remover(self)
+
+
+class ExecutorRequisicoes(QObject):
+    """Pool limitado de tarefas fora da thread da interface"""
+
+    trecho = pyqtSignal(int, str)
+    concluida = pyqtSignal(int, object)
+    erro = pyqtSignal(int, str)
+
+    def __init__(self, max_tarefas=2, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_tarefas)
+        self._ids = itertools.count(1)
+        self._ativas = {}
+        self._lock = threading.Lock()
+
+    def submeter(self, funcao, cancelar_anteriores=True):
+        """Agenda funcao(tarefa) no pool e retorna o id da tarefa"""
+        if cancelar_anteriores:
+            self.cancelar_todas()
+        tarefa = Tarefa(next(self._ids), funcao, self)
+        with self._lock:
+            self._ativas[tarefa.id] = tarefa
+        self.pool.start(tarefa)
+        return tarefa.id
+
+    def cancelar(self, id_tarefa):
+        """Cancela uma tarefa; se ainda estiver na fila, ela nem chega a rodar"""
+        with self._lock:
+            tarefa = self._ativas.pop(id_tarefa, None)
+        if tarefa:
+            tarefa.cancelar()
+            self.pool.tryTake(tarefa)
+
+    def cancelar_todas(self):
+        with self._lock:
+            ids = list(self._ativas)
+        for id_tarefa in ids:
+            self.cancelar(id_tarefa)
+
+    def tarefas_ativas(self):
+        with self._lock:
+            return len(self._ativas)
+
+    def encerrar(self, timeout_ms=2000):
+        """Cancela tudo e aguarda as threads do pool terminarem"""
+        self.cancelar_todas()
+        self.pool.waitForDone(timeout_ms)
+
+    def _remover(self, tarefa):
+        with self._lock:
+            self._ativas.pop(tarefa.id, None)